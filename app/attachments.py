@@ -0,0 +1,391 @@
+# app/attachments.py - streaming ingestion of data-URI attachments
+import base64
+import binascii
+import csv
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from urllib.parse import unquote_to_bytes
+from app.utils import Config
+
+CHUNK_CHARS = 64 * 1024  # a multiple of 4, so every base64 chunk decodes on its own
+HEAD_BYTES = 64 * 1024
+READ_CHUNK = 3 * 64 * 1024  # a multiple of 3, so re-encoded chunks concatenate without padding
+SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+)
+EXTENSION_TYPES = {
+    "csv": "text/csv", "json": "application/json", "md": "text/markdown", "txt": "text/plain",
+    "svg": "image/svg+xml", "html": "text/html", "js": "text/javascript", "css": "text/css",
+}
+
+
+class AttachmentError(ValueError):
+    """Raised when an attachment is malformed or over the size limits"""
+
+
+def _format_size(size: int) -> str:
+    for unit in ("bytes", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size} {unit}" if unit == "bytes" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def sniff_type(name: str, declared: str, head: bytes) -> str:
+    """Media type from magic bytes, then the file extension, then the declared type"""
+    for magic, mime in MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    extension = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if extension in EXTENSION_TYPES:
+        return EXTENSION_TYPES[extension]
+    try:
+        text = head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # The head may end mid-character; anything earlier is a real binary file
+        if e.start < len(head) - 3:
+            return declared if declared and not declared.startswith("text/") else "application/octet-stream"
+        text = head[:e.start].decode("utf-8")
+    stripped = text.lstrip()
+    if stripped[:1] in ("{", "["):
+        return "application/json"
+    if declared and declared != "text/plain":
+        return declared
+    lines = stripped.splitlines()[:5]
+    if len(lines) > 1 and lines[0].count(",") and all(line.count(",") == lines[0].count(",") for line in lines[1:-1]):
+        return "text/csv"
+    return "text/plain"
+
+
+def safe_name(name: str, index: int) -> str:
+    name = SAFE_NAME.sub("-", os.path.basename(name or "")).strip(".-")
+    return name or f"attachment-{index + 1}"
+
+
+def client_attachments(attachments) -> list:
+    """A request's attachments as the client may send them: only `name` and `url` of each.
+
+    Anything else (a `path` in particular) is for spool entries the server
+    writes itself, and is dropped rather than trusted.
+    """
+    if not isinstance(attachments, list):
+        return []
+    return [
+        {key: attachment[key] for key in ("name", "url") if isinstance(attachment.get(key), str)}
+        for attachment in attachments if isinstance(attachment, dict)
+    ]
+
+
+def spool_path(path, directories: tuple) -> str:
+    """`path` resolved, if it names a spool file (attachment-*) directly in one of `directories`, else None"""
+    if not isinstance(path, str):
+        return None
+    real = os.path.realpath(path)
+    if not os.path.basename(real).startswith("attachment-"):
+        return None
+    if os.path.dirname(real) not in {os.path.realpath(directory) for directory in directories}:
+        return None
+    return real
+
+
+def _spool_dirs() -> tuple:
+    """Where this module writes spool files: queued jobs' and request-time ones"""
+    return Config.JOB_ATTACHMENT_DIR, Config.ATTACHMENT_SPOOL_DIR or tempfile.gettempdir()
+
+
+def estimated_size(url: str) -> int:
+    """Decoded size of a data URI, estimated from its length without decoding"""
+    comma = url.find(",")
+    if comma < 0:
+        return len(url)
+    payload = len(url) - comma - 1
+    return payload * 3 // 4 if url[:comma].endswith(";base64") else payload
+
+
+def check_sizes(attachments: list):
+    """Reject requests whose attachments are obviously over the caps, before queueing them"""
+    total = 0
+    for attachment in attachments:
+        size = estimated_size(attachment.get("url", ""))
+        if size > Config.ATTACHMENT_MAX_BYTES:
+            raise AttachmentError(f"Attachment {attachment.get('name')!r} is larger than {_format_size(Config.ATTACHMENT_MAX_BYTES)}")
+        total += size
+    if total > Config.ATTACHMENT_MAX_TOTAL_BYTES:
+        raise AttachmentError(f"Attachments are larger than {_format_size(Config.ATTACHMENT_MAX_TOTAL_BYTES)} in total")
+
+
+class Attachment:
+    """A decoded attachment spooled to disk: only the first HEAD_BYTES stay in memory"""
+
+    def __init__(self, name: str, path: str, size: int, head: bytes, declared_type: str):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.head = head
+        self.declared_type = declared_type
+        self.mime = sniff_type(name, declared_type, head)
+        self._git_sha = None
+        self._summary = None
+
+    @classmethod
+    def reopen(cls, entry: dict) -> "Attachment":
+        """An attachment spooled earlier, from the entry `spooled()` returned (only files in JOB_ATTACHMENT_DIR)"""
+        if spool_path(entry.get("path"), (Config.JOB_ATTACHMENT_DIR,)) is None:
+            raise AttachmentError(f"{entry.get('name')}: not a spool file in {Config.JOB_ATTACHMENT_DIR}")
+        with open(entry["path"], "rb") as f:
+            head = f.read(HEAD_BYTES)
+        return cls(entry["name"], entry["path"], entry["size"], head, entry.get("type", ""))
+
+    def spooled(self) -> dict:
+        """What a queued job stores instead of the data: the spool file and what `reopen` needs"""
+        return {"name": self.name, "path": self.path, "size": self.size, "type": self.declared_type}
+
+    def read_chunks(self, chunk_size: int = READ_CHUNK):
+        with open(self.path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    @property
+    def git_sha(self) -> str:
+        """SHA git assigns to this file as a blob, hashed in chunks (on first use: ingestion does it off the event loop)"""
+        if self._git_sha is None:
+            digest = hashlib.sha1(b"blob %d\0" % self.size)
+            for chunk in self.read_chunks():
+                digest.update(chunk)
+            self._git_sha = digest.hexdigest()
+        return self._git_sha
+
+    async def blob_body(self):
+        """JSON body of a Git blob upload, base64-encoded chunk by chunk"""
+        yield b'{"encoding": "base64", "content": "'
+        for chunk in self.read_chunks():
+            yield base64.b64encode(chunk)
+        yield b'"}'
+
+    def summary(self) -> str:
+        """Compact description for the LLM prompt: type, size, and a schema or sample"""
+        if self._summary is None:
+            self._summary = self._describe()
+        return self._summary
+
+    def _describe(self) -> str:
+        line = f"- {self.name} ({self.mime}, {_format_size(self.size)})"
+        try:
+            if self.mime == "text/csv":
+                return line + self._csv_summary()
+            if self.mime == "application/json":
+                return line + self._json_summary()
+            if self.mime.startswith("image/"):
+                dimensions = self._image_dimensions()
+                return line + (f"\n  {dimensions[0]}x{dimensions[1]} pixels" if dimensions else "")
+            if self.mime.startswith("text/"):
+                return line + f"\n  starts with: {self._text_head(300)!r}"
+        except (ValueError, csv.Error) as e:
+            return line + f"\n  could not be summarized: {e}"
+        return line
+
+    def _text_head(self, limit: int) -> str:
+        return self.head.decode("utf-8", errors="ignore")[:limit]
+
+    def _csv_summary(self) -> str:
+        rows, last = 0, b"\n"
+        for chunk in self.read_chunks():
+            rows += chunk.count(b"\n")
+            last = chunk[-1:]
+        rows += last != b"\n"
+        text = self._text_head(len(self.head))
+        if self.size > len(self.head):
+            text = text[:text.rfind("\n") + 1]
+        records = list(csv.reader(text.splitlines()[:4]))
+        if not records:
+            return ""
+        summary = f"\n  {max(rows - 1, 0)} data rows; columns: {', '.join(records[0])}"
+        for record in records[1:]:
+            summary += f"\n  sample: {', '.join(record)[:200]}"
+        return summary
+
+    def _json_summary(self) -> str:
+        if self.size > Config.ATTACHMENT_PARSE_LIMIT:
+            return f"\n  too large to parse; starts with: {self._text_head(200)!r}"
+        with open(self.path, "rb") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            summary = f"\n  array of {len(data)} items"
+            if data and isinstance(data[0], dict):
+                summary += f"; item keys: {', '.join(map(str, data[0].keys()))}"
+            return summary + (f"\n  first item: {json.dumps(data[0])[:200]}" if data else "")
+        if isinstance(data, dict):
+            return f"\n  object with keys: {', '.join(map(str, list(data.keys())[:30]))}"
+        return f"\n  value: {json.dumps(data)[:200]}"
+
+    def _image_dimensions(self):
+        head = self.head
+        if self.mime == "image/png" and len(head) >= 24:
+            return int.from_bytes(head[16:20], "big"), int.from_bytes(head[20:24], "big")
+        if self.mime == "image/gif" and len(head) >= 10:
+            return int.from_bytes(head[6:8], "little"), int.from_bytes(head[8:10], "little")
+        return None
+
+    def close(self):
+        path = spool_path(self.path, _spool_dirs())
+        if path is None:
+            print(f"⚠️  Not deleting {self.path}: not a spool file")
+            return
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def decode_data_uri(name: str, url: str, max_bytes: int, directory: str = None) -> Attachment:
+    """Decode a data URI chunk by chunk into a spool file, failing as soon as it exceeds max_bytes"""
+    if not url.startswith("data:"):
+        raise AttachmentError(f"{name}: only data: URIs are supported")
+    comma = url.find(",", 0, 1024)
+    if comma < 0:
+        raise AttachmentError(f"{name}: malformed data URI")
+    header = url[5:comma]
+    is_base64 = header.endswith(";base64")
+    declared = header.split(";")[0]
+
+    fd, path = tempfile.mkstemp(prefix="attachment-", dir=directory or Config.ATTACHMENT_SPOOL_DIR)
+    size, head, carry = 0, bytearray(), ""
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for start in range(comma + 1, len(url) + CHUNK_CHARS, CHUNK_CHARS):
+                text = carry + url[start:start + CHUNK_CHARS]
+                last = start + CHUNK_CHARS >= len(url)
+                if is_base64:
+                    text = "".join(text.split())
+                    usable = len(text) if last else len(text) - len(text) % 4
+                    text, carry = text[:usable], text[usable:]
+                    try:
+                        data = base64.b64decode(text + "=" * (-len(text) % 4), validate=True)
+                    except binascii.Error as e:
+                        raise AttachmentError(f"{name}: invalid base64 data ({e})")
+                else:
+                    # Don't split a %XX escape across chunks
+                    cut = -1 if last else text.find("%", len(text) - 2)
+                    text, carry = (text[:cut], text[cut:]) if cut >= 0 else (text, "")
+                    data = unquote_to_bytes(text)
+
+                size += len(data)
+                if size > max_bytes:
+                    raise AttachmentError(f"{name} is larger than {_format_size(max_bytes)}")
+                if len(head) < HEAD_BYTES:
+                    head += data[:HEAD_BYTES - len(head)]
+                out.write(data)
+                if last:
+                    break
+    except BaseException:
+        os.unlink(path)
+        raise
+    return Attachment(name, path, size, bytes(head), declared)
+
+
+def ingest_attachments(attachments: list, directory: str = None, summarize: bool = True) -> list:
+    """Decode every attachment of a request, enforcing the per-file and per-request caps.
+
+    Attachments that are malformed or over the limits are skipped with a
+    warning; the app is still built from the rest. Only `url` is decoded:
+    spool entries are reopened with `reopen_spooled`, never from request data.
+    """
+    decoded, total, names = [], 0, set()
+    for index, attachment in enumerate(attachments or []):
+        name = safe_name(attachment.get("name", ""), index)
+        if name in names:
+            name = f"{index + 1}-{name}"
+        budget = min(Config.ATTACHMENT_MAX_BYTES, Config.ATTACHMENT_MAX_TOTAL_BYTES - total)
+        try:
+            item = decode_data_uri(name, attachment.get("url", ""), budget, directory)
+        except AttachmentError as e:
+            print(f"⚠️  Skipping attachment: {e}")
+            continue
+        total += item.size
+        names.add(name)
+        decoded.append(item)
+        if summarize:
+            _read_through(item)
+        print(f"📎 Attachment {name}: {item.mime}, {_format_size(item.size)}")
+    return decoded
+
+
+def reopen_spooled(entries: list) -> list:
+    """Attachments of a queued job from the entries `spool_attachments` stored; missing files are skipped"""
+    reopened = []
+    for entry in entries or []:
+        try:
+            item = Attachment.reopen(entry)
+        except AttachmentError as e:
+            print(f"⚠️  Skipping attachment: {e}")
+            continue
+        except OSError as e:
+            print(f"⚠️  Skipping attachment {entry.get('name')}: spool file is gone ({e})")
+            continue
+        reopened.append(item)
+        _read_through(item)
+        print(f"📎 Attachment {item.name}: {item.mime}, {_format_size(item.size)}")
+    return reopened
+
+
+def _read_through(item: Attachment):
+    # Both read the whole spool file; done here, off the event loop, so publishing doesn't block on a hash
+    item.summary()
+    item.git_sha
+
+
+def spool_attachments(attachments: list) -> list:
+    """Decode a request's attachments into JOB_ATTACHMENT_DIR before it is queued.
+
+    Returns the entries the job payload keeps, in a field clients can't
+    set, in place of the data URIs; the job reopens them and deletes the
+    files once it is done or failed.
+    """
+    os.makedirs(Config.JOB_ATTACHMENT_DIR, exist_ok=True)
+    return [item.spooled() for item in ingest_attachments(attachments, Config.JOB_ATTACHMENT_DIR, summarize=False)]
+
+
+def discard_spooled(entries: list):
+    """Delete the spool files of a job payload's attachments (only files in JOB_ATTACHMENT_DIR)"""
+    for entry in entries or []:
+        path = spool_path(entry.get("path"), (Config.JOB_ATTACHMENT_DIR,))
+        if path is None:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def sweep_spool(directory: str, max_age: float) -> int:
+    """Delete spool files older than max_age, left by jobs that never ran to the end"""
+    removed, cutoff = 0, time.time() - max_age
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            if name.startswith("attachment-") and os.stat(path).st_mtime < cutoff:
+                os.unlink(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def close_attachments(attachments: list):
+    for attachment in attachments:
+        attachment.close()
@@ -1,25 +1,30 @@
 import hashlib
 from app.utils import Config
+from app.shared_state import shared_state
 
-# Simple in-memory store for development
+# Simple store for development, visible to every worker process when STATE_BACKEND is shared
 # In production, this would query a database
-SECRET_STORE = {}
+SECRET_STORE = shared_state.namespace("secrets")
 
 def register_secret(email: str, secret: str):
     """Register a secret for a student (simulate Google Form submission)"""
-    SECRET_STORE[email] = secret
+    SECRET_STORE.set(email, secret)
 
 def verify_secret(email: str, secret: str) -> bool:
     """
     Verify if the provided secret matches what was submitted
+    (reads the shared state, which may be SQLite: call it through run_blocking on the event loop)
     """
     # For development, accept any secret if none registered
-    if email not in SECRET_STORE:
+    stored = SECRET_STORE.get(email)
+    if stored is None:
         print(f"⚠️  No secret registered for {email}, accepting for development")
-        SECRET_STORE[email] = "dev-secret"
+        # Another worker may register the same email at the same moment: first one wins
+        SECRET_STORE.add(email, "dev-secret")
+        stored = SECRET_STORE.get(email)
     
-    return secret == SECRET_STORE.get(email)
+    return secret == stored
 
 # Pre-register some test secrets
 register_secret("student@example.com", "test123")
-register_secret("test@test.com", "test123")
\ No newline at end of file
+register_secret("test@test.com", "test123")
\ No newline at end of file
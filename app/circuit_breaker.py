@@ -0,0 +1,143 @@
+# app/circuit_breaker.py - per-dependency circuit breakers with half-open probing
+import time
+from contextlib import contextmanager
+from app.utils import Config
+from app import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the breaker opens and calls
+    are rejected without touching the dependency. Once `reset_timeout` has
+    passed it goes half-open and lets `half_open_probes` calls through: a
+    success closes it, a failure reopens it with the timeout doubled (up to
+    BREAKER_MAX_RESET_TIMEOUT). `is_failure(exc)` decides which exceptions
+    count against the dependency; anything else means it answered.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None,
+                 half_open_probes: int = 1, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.BREAKER_FAILURE_THRESHOLD
+        self.base_reset_timeout = reset_timeout or Config.BREAKER_RESET_TIMEOUT
+        self.reset_timeout = self.base_reset_timeout
+        self.half_open_probes = half_open_probes
+        self.is_failure = is_failure or (lambda exc: True)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.trips = 0
+        self.rejected = 0
+
+    def _refresh(self, now: float):
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self.probes = 0
+            metrics.breaker_events.inc((self.name, "half_open"))
+            print(f"🔌 {self.name} circuit half-open, probing")
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (doesn't take a probe slot)"""
+        self._refresh(time.monotonic())
+        return self.state == CLOSED or (self.state == HALF_OPEN and self.probes < self.half_open_probes)
+
+    def allow(self) -> bool:
+        """Admit a call; in half-open state this takes one of the probe slots"""
+        if not self.available():
+            self.rejected += 1
+            metrics.breaker_events.inc((self.name, "rejected"))
+            return False
+        if self.state == HALF_OPEN:
+            self.probes += 1
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until a call could be admitted again"""
+        if self.state == OPEN:
+            return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+        return 0.0 if self.available() else Config.BREAKER_PROBE_WAIT
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"✅ {self.name} circuit closed again")
+            metrics.breaker_events.inc((self.name, "closed"))
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.reset_timeout = min(self.reset_timeout * 2, Config.BREAKER_MAX_RESET_TIMEOUT)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """A call ended without a verdict (e.g. cancelled): give back its probe slot"""
+        if self.state == HALF_OPEN and self.probes:
+            self.probes -= 1
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        metrics.breaker_events.inc((self.name, "opened"))
+        print(f"🔌 {self.name} circuit open after {self.failures} failures, retrying in {self.reset_timeout:.0f}s")
+
+    @contextmanager
+    def guard(self):
+        """Run a call through the breaker; raises CircuitOpenError if it is open"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+    def snapshot(self) -> dict:
+        self._refresh(time.monotonic())
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+breakers = {}
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Process-wide breaker for a dependency, created on first use"""
+    breaker = breakers.get(name)
+    if breaker is None:
+        breaker = breakers[name] = CircuitBreaker(name, **kwargs)
+    return breaker
+
+
+def snapshot() -> dict:
+    return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
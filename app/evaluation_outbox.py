@@ -0,0 +1,301 @@
+# app/evaluation_outbox.py - durable delivery of evaluation callbacks
+import asyncio
+import ipaddress
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from app.circuit_breaker import get_breaker
+from app.http_clients import http_clients
+from app.shared_state import WORKER_ID, worker_alive
+from app.utils import Config, run_blocking
+
+HOST_NAME = re.compile(r"^[a-z0-9_]([a-z0-9_-]*[a-z0-9_])?(\.[a-z0-9_]([a-z0-9_-]*[a-z0-9_])?)*\.?$")
+
+
+def evaluation_host(url: str):
+    """host[:port] of an http(s) evaluation URL, or None if it isn't one with a valid host.
+
+    Names the per-host delivery limit and circuit breaker (and so a metric
+    label), so it is built from the parsed host and port only, never the raw URL.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except (TypeError, ValueError):
+        return None
+    host = parts.hostname
+    if parts.scheme not in ("http", "https") or not host:
+        return None
+    try:
+        address = ipaddress.ip_address(host)
+        host = f"[{address.compressed}]" if address.version == 6 else address.compressed
+    except ValueError:
+        if not HOST_NAME.match(host):
+            return None
+    return f"{host}:{port}" if port else host
+
+
+async def send_evaluation(url: str, payload: dict):
+    """POST one payload. Returns (delivered, detail, retry_after seconds or None, HTTP status or None)."""
+    try:
+        response = await http_clients.evaluation.post(url, json=payload, headers={"Content-Type": "application/json"})
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}", None, None
+    if 200 <= response.status_code < 300:
+        return True, str(response.status_code), None, response.status_code
+    try:
+        retry_after = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        retry_after = None
+    return False, f"HTTP {response.status_code}: {response.text[:200]}", retry_after, response.status_code
+
+
+class EvaluationOutbox:
+    """SQLite outbox for evaluation callbacks, drained by one delivery worker.
+
+    A payload is written to the outbox before any send is attempted, so a
+    build is done once its callback is queued. The worker claims due
+    payloads in batches, keeps at most EVALUATION_CONCURRENCY sends in flight
+    (OUTBOX_PER_HOST per evaluation host) and retries failures with jittered
+    exponential backoff. Each host has its own circuit breaker: while it is
+    open, due payloads are pushed back without a send or a counted attempt.
+    Anything unsent at shutdown is retried after restart. Worker processes
+    sharing the database each run a delivery worker: claims are atomic and
+    marked with the worker's id, so a restart only resends what a dead
+    worker was sending. The concurrency limits apply per process.
+    """
+
+    def __init__(self, db_path: str = None, concurrency: int = None, per_host: int = None,
+                 max_attempts: int = None, on_result=None):
+        self.db_path = db_path or Config.JOB_DB_PATH
+        self.concurrency = concurrency or Config.EVALUATION_CONCURRENCY
+        self.per_host = per_host or Config.OUTBOX_PER_HOST
+        self.max_attempts = max_attempts or Config.OUTBOX_MAX_ATTEMPTS
+        self.on_result = on_result
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._worker = None
+        self._sending = set()
+        self._host_load = Counter()
+
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                host TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                owner TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        if "owner" not in [row[1] for row in self._db.execute("PRAGMA table_info(outbox)")]:
+            # Databases from before several worker processes could share the outbox
+            self._db.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+
+    # --- storage (synchronous, always called through run_blocking) ---
+
+    def _insert(self, url: str, payload: dict, hold: float = None) -> int:
+        with self._lock:
+            now = time.time()
+            return self._db.execute(
+                "INSERT INTO outbox (url, host, payload, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, evaluation_host(url) or "invalid", json.dumps(payload), now + (hold or 0), now, now)
+            ).lastrowid
+
+    def _release(self, outbox_id: int) -> bool:
+        """Make a held payload due now; False if it already went out (or is being sent)"""
+        with self._lock:
+            now = time.time()
+            return self._db.execute(
+                "UPDATE outbox SET next_attempt_at = ?, updated_at = ? WHERE id = ? AND status = 'pending' AND attempts = 0",
+                (now, now, outbox_id)
+            ).rowcount > 0
+
+    def _claim_due(self, limit: int, host_load: dict) -> list:
+        """Mark up to `limit` due payloads as sending, skipping hosts already at their limit"""
+        with self._lock:
+            # IMMEDIATE: no other worker process can claim the same rows in between
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, url, host, payload, attempts FROM outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at LIMIT ?",
+                    (time.time(), limit * 10)
+                ).fetchall()
+                load = dict(host_load)
+                claimed = []
+                for row in rows:
+                    if len(claimed) == limit:
+                        break
+                    if load.get(row[2], 0) < self.per_host:
+                        load[row[2]] = load.get(row[2], 0) + 1
+                        claimed.append(row)
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'sending', owner = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    [(WORKER_ID, time.time(), row[0]) for row in claimed]
+                )
+            finally:
+                self._db.execute("COMMIT")
+            return [(id_, url, host, json.loads(payload), attempts + 1) for id_, url, host, payload, attempts in claimed]
+
+    def _settle(self, outbox_id: int, status: str, error: str = None, next_attempt_at: float = None):
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, next_attempt_at or now, now, outbox_id)
+            )
+
+    def _defer(self, outbox_id: int, next_attempt_at: float):
+        """Back to pending without counting the attempt that was never made"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = attempts - 1, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (next_attempt_at, time.time(), outbox_id)
+            )
+
+    def _next_due(self):
+        with self._lock:
+            return self._db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def _recover(self) -> int:
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "DELETE FROM outbox WHERE status = 'delivered' AND updated_at < ?", (now - Config.OUTBOX_RETENTION,)
+            )
+            # Only what a worker process that is gone was sending; live sibling workers settle their own
+            owners = [row[0] for row in self._db.execute("SELECT DISTINCT owner FROM outbox WHERE status = 'sending'")]
+            return sum(
+                self._db.execute(
+                    "UPDATE outbox SET status = 'pending', owner = NULL, updated_at = ? WHERE status = 'sending' AND owner IS ?",
+                    (now, owner)
+                ).rowcount
+                for owner in owners if not worker_alive(owner)
+            )
+
+    def _release_owned(self) -> int:
+        """Back to pending: what this process was sending when it stopped"""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE outbox SET status = 'pending', owner = NULL, updated_at = ? WHERE status = 'sending' AND owner = ?",
+                (time.time(), WORKER_ID)
+            ).rowcount
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("pending", "sending", "delivered", "failed")}
+
+    # --- async API ---
+
+    async def enqueue(self, url: str, payload: dict, hold: float = None) -> int:
+        """Persist a callback payload and wake the delivery worker.
+
+        `hold` delays the first send by that many seconds unless release() is
+        called sooner; the hold survives restarts like any other retry time.
+        """
+        outbox_id = await run_blocking(self._insert, url, payload, hold)
+        self._wakeup.set()
+        return outbox_id
+
+    async def release(self, outbox_id: int) -> bool:
+        """Send a held payload now"""
+        released = await run_blocking(self._release, outbox_id)
+        if released:
+            self._wakeup.set()
+        return released
+
+    def backoff(self, attempts: int, retry_after: float = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        ceiling = min(Config.OUTBOX_BACKOFF_MAX, Config.OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+        return max(random.uniform(0, ceiling), min(retry_after or 0, Config.OUTBOX_BACKOFF_MAX))
+
+    async def start(self):
+        resumed = await run_blocking(self._recover)
+        if resumed:
+            print(f"🔁 Resuming {resumed} interrupted evaluation callback(s)")
+        self._wakeup.set()
+        self._worker = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        tasks = [self._worker, *self._sending] if self._worker else list(self._sending)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._worker = None
+        await run_blocking(self._release_owned)
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            claimed_at = time.time()
+            free = self.concurrency - len(self._sending)
+            if free > 0:
+                for outbox_id, url, host, payload, attempts in await run_blocking(self._claim_due, free, self._host_load):
+                    self._host_load[host] += 1
+                    task = asyncio.create_task(self._deliver(outbox_id, url, host, payload, attempts))
+                    self._sending.add(task)
+                    task.add_done_callback(self._sending.discard)
+
+            # Payloads that were already due but not claimed are waiting for a free slot,
+            # and a finished delivery sets the wakeup; otherwise sleep until the next retry
+            next_due = await run_blocking(self._next_due)
+            timeout = None if next_due is None or next_due <= claimed_at else max(0.0, next_due - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, outbox_id: int, url: str, host: str, payload: dict, attempts: int):
+        breaker = get_breaker(f"evaluation:{host}")
+        try:
+            if not breaker.allow():
+                await run_blocking(self._defer, outbox_id, time.time() + max(breaker.retry_after(), Config.BREAKER_PROBE_WAIT))
+                return
+            try:
+                delivered, detail, retry_after, status = await send_evaluation(url, payload)
+            except BaseException:
+                breaker.release()
+                raise
+            # Connection errors, 5xx and 429 mean the host is struggling; other answers mean it is up
+            if delivered or (status is not None and status < 500 and status != 429):
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            if delivered:
+                print(f"✅ Evaluation callback delivered for {payload.get('task')} (attempt {attempts})")
+                await run_blocking(self._settle, outbox_id, "delivered")
+            elif attempts >= self.max_attempts:
+                print(f"💥 Giving up on evaluation callback for {payload.get('task')} after {attempts} attempts: {detail}")
+                await run_blocking(self._settle, outbox_id, "failed", detail)
+            else:
+                delay = self.backoff(attempts, retry_after)
+                print(f"⏳ Evaluation callback for {payload.get('task')} failed ({detail}), retrying in {delay:.1f}s")
+                await run_blocking(self._settle, outbox_id, "pending", detail, time.time() + delay)
+                return
+            if self.on_result:
+                self.on_result(payload, delivered)
+        finally:
+            self._host_load[host] -= 1
+            self._wakeup.set()
@@ -0,0 +1,128 @@
+import asyncio
+import httpx
+from app.circuit_breaker import CircuitOpenError, get_breaker
+from app.github_ratelimit import RateLimitScheduler
+from app.http_clients import new_client
+from app.utils import Config
+
+
+class GitHubAPIError(Exception):
+    """Raised when the GitHub REST API returns an error response"""
+
+    def __init__(self, status: int, data: dict):
+        self.status = status
+        self.data = data or {}
+        super().__init__(f"{status}: {self.data.get('message', 'GitHub API error')}")
+
+
+class AsyncGitHubClient:
+    """Minimal async client for the parts of the GitHub REST API we use.
+
+    `token` may be a list of tokens; every request goes through the
+    rate-limit scheduler, which picks the token and waits out limits, and
+    through the "github" circuit breaker: transport errors and 5xx responses
+    count as failures, and while it is open requests fail fast with
+    CircuitOpenError.
+    """
+
+    def __init__(self, token, base_url: str = None, transport: httpx.AsyncBaseTransport = None):
+        self.base_url = (base_url or Config.GITHUB_API_URL).rstrip("/")
+        # Kept so clients for related hosts (Pages sites) can share a stub transport
+        self.transport = transport
+        self.scheduler = RateLimitScheduler([token] if isinstance(token, str) else list(token))
+        self._client = new_client(
+            Config.GITHUB_TIMEOUT,
+            transport=transport,
+            base_url=self.base_url,
+            headers={
+                "Accept": "application/vnd.github+json",
+                "User-Agent": "llm-code-deployment",
+            },
+        )
+        self.request_count = 0
+
+    async def send(self, method: str, path: str, json: dict = None, params: dict = None, body=None,
+                   headers: dict = None) -> httpx.Response:
+        """Send a request and return the response; error statuses raise GitHubAPIError.
+
+        `body` streams a pre-encoded JSON body instead of `json`: a callable
+        returning an async iterator of bytes, called again on every retry.
+        """
+        breaker = get_breaker("github")
+        for attempt in range(Config.GITHUB_RATELIMIT_RETRIES + 1):
+            budget = await self.scheduler.token_for_request()
+            if not breaker.allow():
+                self.scheduler.forget(budget)
+                raise CircuitOpenError(breaker.name, breaker.retry_after())
+            self.request_count += 1
+            request_headers = {**(headers or {}), "Authorization": f"token {budget.token}"}
+            if body is not None:
+                request_headers["Content-Type"] = "application/json"
+            try:
+                response = await self._client.request(
+                    method, path, json=json, params=params, headers=request_headers,
+                    content=body() if body is not None else None
+                )
+            except BaseException as e:
+                self.scheduler.forget(budget)
+                if isinstance(e, (httpx.TransportError, asyncio.TimeoutError)):
+                    breaker.record_failure()
+                else:
+                    breaker.release()
+                raise
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            limited = response.status_code in (403, 429)
+            wait = await self.scheduler.observe(budget, response.status_code, response.headers, response.text if limited else "")
+            if not wait or attempt == Config.GITHUB_RATELIMIT_RETRIES or wait > self.scheduler.max_wait:
+                break
+            print(f"⏳ GitHub rate limited on {method} {path}, retrying in {wait:.0f}s")
+            await asyncio.sleep(wait)
+
+        if response.status_code >= 400:
+            try:
+                data = response.json()
+            except ValueError:
+                data = {"message": response.text}
+            raise GitHubAPIError(response.status_code, data)
+        return response
+
+    async def request(self, method: str, path: str, json: dict = None, params: dict = None, body=None):
+        """Send a request and return the decoded JSON body (None for empty bodies)"""
+        response = await self.send(method, path, json=json, params=params, body=body)
+        if not response.content:
+            return None
+        return response.json()
+
+    async def get(self, path: str, params: dict = None):
+        return await self.request("GET", path, params=params)
+
+    async def get_if_changed(self, path: str, etag: str = None):
+        """Conditional GET: (None, etag) if the resource still matches `etag`, else (body, new ETag).
+
+        GitHub doesn't count 304 Not Modified answers against the rate limit.
+        """
+        response = await self.send("GET", path, headers={"If-None-Match": etag} if etag else None)
+        if response.status_code == 304:
+            return None, etag
+        return response.json(), response.headers.get("ETag")
+
+    async def post(self, path: str, json: dict = None):
+        return await self.request("POST", path, json=json)
+
+    async def post_stream(self, path: str, body):
+        return await self.request("POST", path, body=body)
+
+    async def put(self, path: str, json: dict = None):
+        return await self.request("PUT", path, json=json)
+
+    async def patch(self, path: str, json: dict = None):
+        return await self.request("PATCH", path, json=json)
+
+    async def delete(self, path: str):
+        return await self.request("DELETE", path)
+
+    async def aclose(self):
+        await self._client.aclose()
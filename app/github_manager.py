@@ -1,38 +1,93 @@
-from github import Github, GithubException
+import asyncio
 import base64
-import time
+import hashlib
+from app.attachments import Attachment
+from app.github_client import AsyncGitHubClient, GitHubAPIError
 from app.utils import Config
+from app.metrics import stage
+from app.pages_tracker import PagesTracker
+from app.repo_registry import REPO_DESCRIPTION, RepoRegistry
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA git assigns to a blob with this content"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _as_bytes(content) -> bytes:
+    return content.encode() if isinstance(content, str) else content
+
+
+def _blob_sha(content) -> str:
+    return content.git_sha if isinstance(content, Attachment) else git_blob_sha(_as_bytes(content))
+
+
+def _size(content) -> int:
+    return content.size if isinstance(content, Attachment) else len(_as_bytes(content))
+
 
 class GitHubManager:
-    def __init__(self):
-        if not Config.GITHUB_TOKEN:
+    def __init__(self, client: AsyncGitHubClient = None):
+        if not Config.GITHUB_TOKENS and client is None:
             raise ValueError("GitHub token not configured. Set GITHUB_TOKEN in .env file")
         
-        self.g = Github(Config.GITHUB_TOKEN)
-        self.user = self.g.get_user()
-        print(f"✅ GitHub authenticated as: {self.user.login}")
+        self.client = client or AsyncGitHubClient(Config.GITHUB_TOKENS)
+        self.login = None
+        # (repo_path, branch) -> (commit_sha, tree_sha) of the last commit we wrote. Other worker
+        # processes push too, so with WEB_CONCURRENCY > 1 the head is always looked up (the tree is still reused)
+        self._heads = {}
+        self.trust_heads = Config.WEB_CONCURRENCY <= 1
+        self.repos = RepoRegistry(self.client)
+        self.pages = PagesTracker(self.client)
 
-    def repo_exists(self, task_id: str) -> bool:
+    async def authenticate(self) -> str:
+        """Resolve the authenticated user's login (cached after the first call)"""
+        if self.login is None:
+            user = await self.client.get("/user")
+            self.login = user["login"]
+            print(f"✅ GitHub authenticated as: {self.login}")
+        return self.login
+
+    def reserve_budget(self, calls: int = None):
+        """Hold GitHub request budget for one build (async context manager); waits if none is left"""
+        return self.client.scheduler.reserve(calls or Config.GITHUB_BUILD_BUDGET)
+
+    async def _get_repo(self, repo_name: str) -> dict:
+        login = await self.authenticate()
+        return await self.repos.get(login, repo_name)
+
+    async def resolve_repo(self, task_id: str):
+        """(repo name, repo or None if it doesn't exist yet) for a task"""
+        login = await self.authenticate()
+        return await self.repos.resolve(login, task_id)
+
+    async def repo_exists(self, task_id: str) -> bool:
         """Check if a repository already exists for this task"""
-        repo_name = f"task-{task_id.replace(' ', '-').replace('_', '-').lower()[:30]}"
-        repo_name = ''.join(c for c in repo_name if c.isalnum() or c in ['-', '_'])
-        
         try:
-            repo = self.user.get_repo(repo_name)
-            return True
-        except:
+            repo_name, repo = await self.resolve_repo(task_id)
+            return repo is not None
+        except Exception:
             return False
 
-    def get_repo_url(self, task_id: str) -> str:
+    async def get_repo_url(self, task_id: str) -> str:
         """Get the repository URL for a task"""
-        repo_name = f"task-{task_id.replace(' ', '-').replace('_', '-').lower()[:30]}"
-        repo_name = ''.join(c for c in repo_name if c.isalnum() or c in ['-', '_'])
+        repo_name, repo = await self.resolve_repo(task_id)
+        return repo["html_url"] if repo else f"https://github.com/{self.login}/{repo_name}"
+    
+    async def get_files(self, repo_url: str, paths: list) -> dict:
+        """Current content of text files on the default branch; missing files are left out"""
+        login = await self.authenticate()
+        repo_name = repo_url.split('/')[-1]
         
-        try:
-            repo = self.user.get_repo(repo_name)
-            return repo.html_url
-        except:
-            return f"https://github.com/{self.user.login}/task-{task_id.replace(' ', '-').lower()[:30]}"
+        async def fetch(path: str):
+            try:
+                data = await self.client.get(f"/repos/{login}/{repo_name}/contents/{path}")
+            except GitHubAPIError as e:
+                if e.status == 404:
+                    return path, None
+                raise
+            return path, base64.b64decode(data["content"]).decode()
+        
+        return {path: content for path, content in await asyncio.gather(*[fetch(p) for p in paths]) if content is not None}
     
     def _get_mit_license(self) -> str:
         """Return MIT License content"""
@@ -94,63 +149,175 @@ MIT License - see LICENSE file for details.
 
 *Automatically generated by LLM Code Deployment System*"""
     
-    def create_repo_from_code(self, task_id: str, code_files: dict, brief: str) -> dict:
-        """Create GitHub repo with generated code and return repo info"""
-        
-        # Clean repo name (GitHub has restrictions)
-        repo_name = f"task-{task_id.replace(' ', '-').replace('_', '-').lower()[:30]}"
-        repo_name = ''.join(c for c in repo_name if c.isalnum() or c in ['-', '_'])
-        
-        print(f"🔄 Creating repository: {repo_name}")
-        
-        try:
-            # Check if repo already exists
+    async def _resolve_head(self, repo_path: str, branch: str) -> str:
+        """Head commit of a branch: the SHA we last wrote there, otherwise one ref lookup"""
+        if self.trust_heads and (repo_path, branch) in self._heads:
+            return self._heads[(repo_path, branch)][0]
+        ref = await self.client.get(f"{repo_path}/git/ref/heads/{branch}")
+        return ref["object"]["sha"]
+
+    async def _resolve_head_tree(self, repo_path: str, branch: str, head_sha: str) -> str:
+        tracked = self._heads.get((repo_path, branch))
+        if tracked and tracked[0] == head_sha:
+            return tracked[1]
+        commit = await self.client.get(f"{repo_path}/git/commits/{head_sha}")
+        return commit["tree"]["sha"]
+
+    async def _publish_files(self, repo_path: str, branch: str, files: dict, message: str, base_tree: bool = True) -> str:
+        """Publish files as a single commit via the Git Data API and return its SHA.
+
+        Small text files are inlined into the tree request; binary or large
+        files are uploaded as blobs in parallel. Then one tree, one commit
+        and a fast-forward of the branch ref.
+        """
+        upload_limit = asyncio.Semaphore(Config.GITHUB_BLOB_CONCURRENCY)
+
+        async def upload(path: str, content) -> dict:
+            if isinstance(content, str) and len(content) <= Config.GITHUB_INLINE_LIMIT:
+                return {"path": path, "mode": "100644", "type": "blob", "content": content}
+            async with upload_limit:
+                if isinstance(content, Attachment):
+                    # Streamed from the spool file, never fully in memory
+                    blob = await self.client.post_stream(f"{repo_path}/git/blobs", content.blob_body)
+                else:
+                    blob = await self.client.post(f"{repo_path}/git/blobs", json={
+                        "content": base64.b64encode(_as_bytes(content)).decode(),
+                        "encoding": "base64"
+                    })
+            return {"path": path, "mode": "100644", "type": "blob", "sha": blob["sha"]}
+
+        entries, parent_sha = await asyncio.gather(
+            asyncio.gather(*[upload(path, content) for path, content in files.items()]),
+            self._resolve_head(repo_path, branch)
+        )
+
+        for attempt in range(2):
+            tree_body = {"tree": list(entries)}
+            if base_tree:
+                tree_body["base_tree"] = await self._resolve_head_tree(repo_path, branch, parent_sha)
+            tree = await self.client.post(f"{repo_path}/git/trees", json=tree_body)
+
+            commit = await self.client.post(f"{repo_path}/git/commits", json={
+                "message": message,
+                "tree": tree["sha"],
+                "parents": [parent_sha]
+            })
             try:
-                existing_repo = self.user.get_repo(repo_name)
+                await self.client.patch(f"{repo_path}/git/refs/heads/{branch}", json={"sha": commit["sha"]})
+            except GitHubAPIError as e:
+                # Our tracked head is stale (someone else pushed); re-resolve once and rebuild
+                if e.status != 422 or attempt:
+                    raise
+                self._heads.pop((repo_path, branch), None)
+                parent_sha = await self._resolve_head(repo_path, branch)
+                continue
+
+            self._heads[(repo_path, branch)] = (commit["sha"], tree["sha"])
+            return commit["sha"]
+
+    async def _changed_files(self, repo_path: str, branch: str, files: dict):
+        """Drop files whose content already matches the branch head.
+
+        Fetches the head tree once and compares git blob SHAs computed
+        locally. Returns the changed files and what skipping the rest saved.
+        """
+        head_sha = await self._resolve_head(repo_path, branch)
+        tree_tracked = self._heads.get((repo_path, branch), (None,))[0] == head_sha
+        tree = await self.client.get(f"{repo_path}/git/trees/{head_sha}", params={"recursive": "1"})
+        self._heads[(repo_path, branch)] = (head_sha, tree["sha"])
+        if tree.get("truncated"):
+            return files, {"files": len(files), "changed": len(files), "bytes_saved": 0, "calls_saved": 0}
+
+        existing = {entry["path"]: entry["sha"] for entry in tree["tree"] if entry["type"] == "blob"}
+        changed, bytes_saved, uploads_saved = {}, 0, 0
+        for path, content in files.items():
+            if existing.get(path) == _blob_sha(content):
+                bytes_saved += _size(content)
+                uploads_saved += not (isinstance(content, str) and len(content) <= Config.GITHUB_INLINE_LIMIT)
+            else:
+                changed[path] = content
+
+        # Skipped blob uploads, plus tree/commit/ref on a no-op; the tree fetch
+        # costs one call but replaces the commit lookup when the head was untracked
+        calls_saved = uploads_saved + (0 if changed else 3) - (1 if tree_tracked else 0)
+        return changed, {"files": len(files), "changed": len(changed), "bytes_saved": bytes_saved, "calls_saved": calls_saved}
+
+    def _publishable(self, code_files: dict) -> dict:
+        return {
+            filename: content for filename, content in code_files.items()
+            if (content.strip() if isinstance(content, str) else content) and filename not in ["README.md", "LICENSE"]
+        }
+
+    async def provision_repo(self, task_id: str) -> dict:
+        """Create the repository and enable Pages; nothing here depends on the generated code.
+
+        Returns the target for publish_repo(): `created` is False when the
+        repository already existed and was left as it is.
+        """
+        try:
+            login = await self.authenticate()
+
+            # Check if repo already exists (its name is the task's, or a fallback if another task has that one)
+            repo_name, existing_repo = await self.resolve_repo(task_id)
+            if existing_repo:
                 print(f"⚠️  Repository {repo_name} already exists, updating instead")
-                return self.update_repo(existing_repo.html_url, code_files, brief, "Initial commit")
-            except:
-                pass  # Repo doesn't exist, continue with creation
-            
-            # Create new repository
-            repo = self.user.create_repo(
-                name=repo_name,
-                description=f"Auto-generated app for task: {task_id}",
-                private=False,
-                auto_init=False
-            )
-            print(f"✅ Repository created: {repo.html_url}")
-            
-            # Add MIT License
-            repo.create_file("LICENSE", "Add MIT License", self._get_mit_license())
-            print("✅ LICENSE added")
-            
-            # Add generated README
-            readme_content = self._generate_readme(brief, task_id)
-            repo.create_file("README.md", "Add README.md", readme_content)
-            print("✅ README.md added")
-            
-            # Add other code files
-            for filename, content in code_files.items():
-                if content and content.strip() and filename not in ["README.md", "LICENSE"]:
-                    repo.create_file(filename, f"Add {filename}", content)
-                    print(f"✅ {filename} added")
-            
-            # Enable GitHub Pages (deploy from root directory)
-            repo.edit(has_pages=True, pages_build_type="gh-pages")
-            print("✅ GitHub Pages enabled")
-            
-            # Wait a moment for Pages to initialize
-            time.sleep(2)
-            
-            # Get the latest commit SHA
-            commits = list(repo.get_commits())
-            latest_commit = commits[0] if commits else None
+                return {"repo_url": existing_repo["html_url"], "repo_name": repo_name, "created": False}
+            
+            print(f"🔄 Creating repository: {repo_name}")
+            with stage("repo_create"):
+                # Create new repository (auto_init gives us a branch to commit on top of)
+                repo = await self.client.post("/user/repos", json={
+                    "name": repo_name,
+                    "description": f"{REPO_DESCRIPTION}{task_id}",
+                    "private": False,
+                    "auto_init": True
+                })
+                print(f"✅ Repository created: {repo['html_url']}")
+            
+            repo_path = f"/repos/{login}/{repo_name}"
+            branch = repo.get("default_branch", "main")
+            with stage("pages_enable"):
+                # Publish the default branch from its root; the deployment is followed by watch_pages()
+                pages_url = await self.pages.enable(repo_path, branch)
+                print("✅ GitHub Pages enabled")
+            # Later lookups in this build (and the next round) are answered from the registry
+            await self.repos.put(login, repo_name, {**repo, "has_pages": True})
+            
+            return {
+                "repo_url": repo["html_url"],
+                "repo_name": repo_name,
+                "repo_path": repo_path,
+                "branch": branch,
+                "pages_url": pages_url or f"https://{login}.github.io/{repo_name}/",
+                "created": True
+            }
+            
+        except GitHubAPIError as e:
+            error_msg = f"GitHub API error: {e.data.get('message', str(e))}"
+            print(f"💥 {error_msg}")
+            raise Exception(error_msg)
+    
+    async def publish_repo(self, target: dict, code_files: dict, brief: str, commit_message: str = "Initial commit") -> dict:
+        """Commit the app to a repository from provision_repo() and return repo info"""
+        if not target["created"]:
+            return await self.update_repo(target["repo_url"], code_files, brief, commit_message)
+        try:
+            with stage("repo_publish"):
+                # LICENSE, README and code files go out as one commit
+                files = {
+                    "LICENSE": self._get_mit_license(),
+                    "README.md": self._generate_readme(brief, target["repo_name"]),
+                    **self._publishable(code_files)
+                }
+                commit_sha = await self._publish_files(
+                    target["repo_path"], target["branch"], files, commit_message, base_tree=False
+                )
+                print(f"✅ {len(files)} files committed: {', '.join(files)}")
             
             repo_info = {
-                "repo_url": repo.html_url,
-                "commit_sha": latest_commit.sha if latest_commit else "unknown",
-                "pages_url": f"https://{self.user.login}.github.io/{repo_name}/"
+                "repo_url": target["repo_url"],
+                "commit_sha": commit_sha,
+                "pages_url": target["pages_url"]
             }
             
             print(f"🎉 Repository setup complete:")
@@ -160,50 +327,52 @@ MIT License - see LICENSE file for details.
             
             return repo_info
             
-        except GithubException as e:
+        except GitHubAPIError as e:
             error_msg = f"GitHub API error: {e.data.get('message', str(e))}"
             print(f"💥 {error_msg}")
             raise Exception(error_msg)
     
-    def update_repo(self, repo_url: str, code_files: dict, brief: str, commit_message: str = "Update application") -> dict:
+    async def create_repo_from_code(self, task_id: str, code_files: dict, brief: str) -> dict:
+        """Create GitHub repo with generated code and return repo info"""
+        return await self.publish_repo(await self.provision_repo(task_id), code_files, brief)
+    
+    async def update_repo(self, repo_url: str, code_files: dict, brief: str, commit_message: str = "Update application") -> dict:
         """Update existing repository with new code"""
         try:
             # Extract repo name from URL
             repo_name = repo_url.split('/')[-1]
-            repo = self.user.get_repo(repo_name)
+            repo = await self._get_repo(repo_name)
+            repo_path = f"/repos/{self.login}/{repo_name}"
             
             print(f"🔄 Updating repository: {repo_name}")
             
-            # Update README
-            readme_content = self._generate_readme(brief, repo_name)
-            try:
-                file_contents = repo.get_contents("README.md")
-                repo.update_file("README.md", f"{commit_message} - Update README", readme_content, file_contents.sha)
-            except:
-                repo.create_file("README.md", f"{commit_message} - Add README", readme_content)
-            print("✅ README.md updated")
-            
-            # Update other files
-            for filename, new_content in code_files.items():
-                if filename not in ["README.md", "LICENSE"] and new_content.strip():
-                    try:
-                        # Try to update existing file
-                        file_contents = repo.get_contents(filename)
-                        repo.update_file(filename, f"{commit_message} - Update {filename}", new_content, file_contents.sha)
-                        print(f"✅ {filename} updated")
-                    except:
-                        # Create new file
-                        repo.create_file(filename, f"{commit_message} - Add {filename}", new_content)
-                        print(f"✅ {filename} created")
-            
-            # Get latest commit
-            commits = list(repo.get_commits())
-            latest_commit = commits[0] if commits else None
+            # README and code files go out as one commit on top of the current tree
+            files = {
+                "README.md": self._generate_readme(brief, repo_name),
+                **self._publishable(code_files)
+            }
+            branch = repo.get("default_branch", "main")
+            with stage("repo_update"):
+                # Only files whose blob SHA differs from the current tree are uploaded
+                changed, publish_stats = await self._changed_files(repo_path, branch, files)
+                if changed:
+                    commit_sha = await self._publish_files(repo_path, branch, changed, commit_message)
+                    print(f"✅ {len(changed)}/{len(files)} files changed: {', '.join(changed)}")
+                else:
+                    commit_sha = await self._resolve_head(repo_path, branch)
+                    print(f"✅ No changes in {len(files)} files, keeping commit {commit_sha[:8]}")
+            
+            if not repo.get("has_pages"):
+                with stage("pages_enable"):
+                    await self.pages.enable(repo_path, branch)
+                    print("✅ GitHub Pages enabled")
+                await self.repos.put(self.login, repo_name, {**repo, "has_pages": True})
             
             repo_info = {
-                "repo_url": repo.html_url,
-                "commit_sha": latest_commit.sha if latest_commit else "unknown",
-                "pages_url": f"https://{self.user.login}.github.io/{repo_name}/"
+                "repo_url": repo["html_url"],
+                "commit_sha": commit_sha,
+                "pages_url": f"https://{self.login}.github.io/{repo_name}/",
+                "publish": publish_stats
             }
             
             print(f"🎉 Repository update complete:")
@@ -211,22 +380,46 @@ MIT License - see LICENSE file for details.
             
             return repo_info
             
-        except GithubException as e:
+        except GitHubAPIError as e:
             error_msg = f"GitHub API error: {e.data.get('message', str(e))}"
             print(f"💥 {error_msg}")
             raise Exception(error_msg)
     
-    def test_connection(self) -> bool:
+    async def delete_repo(self, task_id: str) -> bool:
+        """Delete a task's repository; False if it didn't exist"""
+        login = await self.authenticate()
+        repo_name, repo = await self.resolve_repo(task_id)
+        if repo is None:
+            return False
+        repo_path = f"/repos/{login}/{repo_name}"
+        try:
+            await self.client.delete(repo_path)
+        except GitHubAPIError as e:
+            if e.status != 404:
+                raise
+        finally:
+            await self.repos.invalidate(login, repo_name)
+            self._heads = {key: head for key, head in self._heads.items() if key[0] != repo_path}
+        print(f"🗑️  Repository deleted: {repo_name}")
+        return True
+    
+    def watch_pages(self, repo_info: dict, on_done=None) -> dict:
+        """Follow the Pages deployment of a build's commit in the background; see PagesTracker.track"""
+        repo_path = f"/repos/{self.login}/{repo_info['repo_url'].split('/')[-1]}"
+        return self.pages.track(repo_path, repo_info["commit_sha"], repo_info["pages_url"], on_done)
+    
+    async def test_connection(self) -> bool:
         """Test GitHub connection and permissions"""
         try:
-            user = self.g.get_user()
-            print(f"✅ GitHub connection successful: {user.login}")
+            user = await self.client.get("/user")
+            print(f"✅ GitHub connection successful: {user['login']}")
             
             # Test repo creation permission by checking rate limit
-            rate_limit = self.g.get_rate_limit()
-            print(f"✅ Rate limit: {rate_limit.core.remaining}/{rate_limit.core.limit}")
+            rate_limit = await self.client.get("/rate_limit")
+            core = rate_limit["resources"]["core"]
+            print(f"✅ Rate limit: {core['remaining']}/{core['limit']}")
             
             return True
         except Exception as e:
             print(f"💥 GitHub connection failed: {e}")
-            return False
\ No newline at end of file
+            return False
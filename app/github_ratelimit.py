@@ -0,0 +1,183 @@
+# app/github_ratelimit.py - GitHub rate-limit tracking and per-build request budgets
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from app import metrics
+from app.utils import Config
+
+DEFAULT_LIMIT = 5000
+DEFAULT_SECONDARY_WAIT = 60.0
+
+current_reservation = ContextVar("current_reservation", default=None)
+
+
+class GitHubRateLimited(Exception):
+    """Raised when a request would have to wait longer than GITHUB_RATELIMIT_MAX_WAIT"""
+
+
+class TokenBudget:
+    """What we know about one token's core rate limit, from X-RateLimit-* headers"""
+
+    def __init__(self, token: str):
+        self.token = token
+        self.limit = DEFAULT_LIMIT
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.reserved = 0
+        self.requests = 0
+
+    def available(self, now: float) -> int:
+        """Calls we can still start on this token without hitting the limit"""
+        if now < self.blocked_until:
+            return 0
+        remaining = self.remaining if self.remaining is not None and now < self.reset_at else self.limit
+        return remaining - self.reserved
+
+    def ready_at(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until
+        return self.reset_at if self.remaining is not None and now < self.reset_at else now
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "token": f"...{self.token[-4:]}" if self.token else None,
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_in": max(0.0, round(self.reset_at - now, 1)) if self.remaining is not None else None,
+            "reserved": self.reserved,
+            "requests": self.requests,
+        }
+
+
+class Reservation:
+    """Request budget held by one build on one token"""
+
+    def __init__(self, budget: TokenBudget, calls: int):
+        self.budget = budget
+        self.calls = calls
+        self.used = 0
+
+    @property
+    def token(self) -> str:
+        return self.budget.token
+
+
+class RateLimitScheduler:
+    """Hands out GitHub tokens so that builds wait for budget instead of failing.
+
+    Each build reserves an estimated number of calls up front on the
+    least-loaded token; a build that does not fit on any token waits until a
+    limit resets or another build releases its budget, and smaller
+    reservations may be granted ahead of it. Remaining/reset figures come
+    from the X-RateLimit-* headers of every response, and secondary limits
+    (403/429 with Retry-After) block the token for the advertised time.
+    """
+
+    def __init__(self, tokens: list, max_wait: float = None):
+        self.tokens = [TokenBudget(token) for token in tokens]
+        self.max_wait = max_wait if max_wait is not None else Config.GITHUB_RATELIMIT_MAX_WAIT
+        self.waits = 0
+        self.rate_limited = 0
+        self._changed = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _pick(self, calls: int, now: float):
+        fits = [budget for budget in self.tokens if budget.available(now) >= calls]
+        if not fits:
+            return None
+        return max(fits, key=lambda budget: (budget.available(now), -budget.reserved))
+
+    async def _acquire(self, calls: int) -> TokenBudget:
+        started = time.time()
+        deadline = started + self.max_wait
+        async with self._condition():
+            waited = False
+            while True:
+                now = time.time()
+                budget = self._pick(calls, now)
+                if budget is not None:
+                    budget.reserved += calls
+                    if waited:
+                        metrics.observe("github_rate_wait", now - started)
+                    return budget
+                ready = min(budget.ready_at(now) for budget in self.tokens)
+                if ready > deadline:
+                    raise GitHubRateLimited(f"no GitHub token has {calls} calls left before {self.max_wait:.0f}s")
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                    print(f"⏳ GitHub rate limit: waiting up to {max(0.0, ready - now):.0f}s for {calls} calls of budget")
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=max(0.05, ready - now))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _notify(self):
+        async with self._condition():
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def reserve(self, calls: int):
+        """Hold `calls` requests of budget on one token for the duration of the block"""
+        calls = min(calls, max(budget.limit for budget in self.tokens))
+        reservation = Reservation(await self._acquire(calls), calls)
+        token = current_reservation.set(reservation)
+        try:
+            yield reservation
+        finally:
+            current_reservation.reset(token)
+            reservation.budget.reserved -= max(0, reservation.calls - reservation.used)
+            await self._notify()
+
+    async def token_for_request(self):
+        """Token for the next request: the current build's, otherwise a one-call reservation"""
+        reservation = current_reservation.get()
+        if reservation is not None:
+            reservation.used += 1
+            if reservation.used > reservation.calls:
+                reservation.budget.reserved += 1  # over budget: count it until the response comes back
+            return reservation.budget
+        return await self._acquire(1)
+
+    def forget(self, budget: TokenBudget):
+        """Undo `token_for_request` for a request that never got a response"""
+        budget.reserved -= 1
+
+    async def observe(self, budget: TokenBudget, status: int, headers, message: str = "") -> float:
+        """Record a response; returns how long to wait before retrying if it was rate limited"""
+        budget.requests += 1
+        budget.reserved -= 1
+        now = time.time()
+        if "x-ratelimit-remaining" in headers:
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset_at = float(headers.get("x-ratelimit-reset", now + 3600))
+            if budget.remaining is not None and reset_at == budget.reset_at:
+                remaining = min(remaining, budget.remaining)  # responses can arrive out of order
+            budget.limit = int(headers.get("x-ratelimit-limit", budget.limit))
+            budget.remaining = remaining
+            budget.reset_at = reset_at
+
+        wait = 0.0
+        if status in (403, 429):
+            if "retry-after" in headers:
+                wait = float(headers["retry-after"])
+                budget.blocked_until = now + wait
+            elif budget.remaining == 0:
+                wait = max(0.0, budget.reset_at - now)
+            elif status == 429 or "secondary rate limit" in message.lower():
+                wait = DEFAULT_SECONDARY_WAIT
+                budget.blocked_until = now + wait
+            if wait:
+                self.rate_limited += 1
+        await self._notify()
+        return wait
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {"waits": self.waits, "rate_limited": self.rate_limited, "tokens": [budget.snapshot(now) for budget in self.tokens]}
@@ -0,0 +1,62 @@
+# app/http_clients.py - shared keep-alive HTTP clients for outbound calls
+import importlib.util
+import httpx
+from app.utils import Config
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def new_client(timeout: float, transport: httpx.AsyncBaseTransport = None, **kwargs) -> httpx.AsyncClient:
+    """Create an AsyncClient with the pool limits and timeouts from Config"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=Config.HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=Config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=Config.HTTP2_ENABLED and HTTP2_AVAILABLE and transport is None,
+        transport=transport,
+        **kwargs,
+    )
+
+
+class HTTPClients:
+    """Process-wide clients that are not owned by a manager.
+
+    Opened at app startup and closed at shutdown; a client used before
+    startup (or after a restart) is created on first access.
+    """
+
+    def __init__(self):
+        self._evaluation = None
+        self._pages = None
+
+    @property
+    def evaluation(self) -> httpx.AsyncClient:
+        if self._evaluation is None or self._evaluation.is_closed:
+            self._evaluation = new_client(Config.EVALUATION_TIMEOUT, headers={"User-Agent": "llm-code-deployment"})
+        return self._evaluation
+
+    @property
+    def pages(self) -> httpx.AsyncClient:
+        """Checks that published Pages sites respond"""
+        if self._pages is None or self._pages.is_closed:
+            self._pages = new_client(Config.PAGES_CHECK_TIMEOUT, follow_redirects=True, headers={"User-Agent": "llm-code-deployment"})
+        return self._pages
+
+    async def start(self):
+        self.evaluation
+        print(f"✅ HTTP clients ready (pool={Config.HTTP_MAX_CONNECTIONS}, http2={Config.HTTP2_ENABLED and HTTP2_AVAILABLE})")
+
+    async def aclose(self):
+        if self._evaluation is not None:
+            await self._evaluation.aclose()
+            self._evaluation = None
+        if self._pages is not None:
+            await self._pages.aclose()
+            self._pages = None
+
+
+http_clients = HTTPClients()
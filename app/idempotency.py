@@ -0,0 +1,67 @@
+# app/idempotency.py - nonce-based idempotency for /api/build
+import json
+import time
+from app.shared_state import SQLiteState, durable_state
+from app.utils import Config, run_blocking
+
+
+def idempotency_key(request: dict) -> str:
+    return json.dumps([request["email"], request["task"], request["round"], request["nonce"]])
+
+
+class IdempotencyStore:
+    """Persistent record of which (email, task, round, nonce) builds are in flight or done.
+
+    The first request for a key claims it; duplicates that arrive while the
+    build runs attach to that job, and duplicates after completion get the
+    stored result. Records live in the durable shared state (SQLite unless
+    STATE_BACKEND names another shared backend), so they survive restarts
+    and a claim made by one worker process holds for all of them.
+
+    Every record expires: a claim whose job was never attached (the process
+    died between the claim and the enqueue) after IDEMPOTENCY_CLAIM_TTL,
+    records with a job after IDEMPOTENCY_TTL.
+    """
+
+    def __init__(self, db_path: str = None, ttl: float = None, state=None, claim_ttl: float = None):
+        self.ttl = ttl if ttl is not None else Config.IDEMPOTENCY_TTL
+        self.claim_ttl = claim_ttl if claim_ttl is not None else Config.IDEMPOTENCY_CLAIM_TTL
+        state = state or (SQLiteState(db_path) if db_path else durable_state())
+        self._records = state.namespace("idempotency")
+
+    def _claim(self, key: str):
+        """Claim `key` for a new build. Returns None if claimed, else the existing record."""
+        while True:
+            claim = {"status": "in_flight", "job_id": None, "result": None, "created_at": time.time()}
+            if self._records.add(key, claim, ttl=self.claim_ttl):
+                return None
+            record = self._records.get(key)
+            # Otherwise released (or expired) since the add: try again
+            if record is not None:
+                return {"status": record["status"], "job_id": record["job_id"], "result": record["result"]}
+
+    def _update(self, key: str, **fields):
+        record = self._records.get(key)
+        if record is None:
+            return
+        record.update(fields, updated_at=time.time())
+        # Once a job is attached the queue owns the claim (a failed build releases it); until then it is short-lived
+        self._records.set(key, record, ttl=self.ttl if record["job_id"] is not None or record["status"] == "completed" else self.claim_ttl)
+
+    def _release(self, key: str):
+        record = self._records.get(key)
+        if record is not None and record["status"] == "in_flight":
+            self._records.delete(key)
+
+    async def claim(self, key: str):
+        return await run_blocking(self._claim, key)
+
+    async def attach_job(self, key: str, job_id: int):
+        await run_blocking(self._update, key, job_id=job_id)
+
+    async def complete(self, key: str, result: dict):
+        await run_blocking(self._update, key, status="completed", result=result)
+
+    async def release(self, key: str):
+        """Forget an in-flight claim so the same nonce can be retried after a failure"""
+        await run_blocking(self._release, key)
@@ -0,0 +1,252 @@
+# app/job_queue.py - durable build queue with a bounded worker pool
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from app import metrics
+from app.shared_state import WORKER_ID, worker_alive
+from app.utils import Config, run_blocking
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds JOB_QUEUE_MAX pending jobs"""
+
+
+class JobParked(Exception):
+    """Raised by the handler to put its job back in the queue for `delay` seconds.
+
+    Used while a dependency is down: the job is neither failed nor retried
+    straight away, and keeps its place in the queue.
+    """
+
+    def __init__(self, delay: float, reason: str = ""):
+        self.delay = delay
+        super().__init__(reason or f"parked for {delay:.0f}s")
+
+
+class JobQueue:
+    """SQLite-backed job queue drained by a fixed pool of asyncio workers.
+
+    Jobs survive restarts: anything still queued or running when the process
+    stops is picked up again by the next `start()`. Each pipeline stage has
+    its own concurrency cap, exposed through `stage(name)`. Jobs whose handler
+    raises JobParked wait in the queue until their `available_at` time.
+
+    Several worker processes can share the database: a job is claimed inside
+    a write transaction and marked with the claiming worker's id, `start()`
+    only requeues jobs whose worker is gone, and with WEB_CONCURRENCY > 1
+    idle workers poll every JOB_POLL_INTERVAL for jobs enqueued elsewhere.
+    Stage caps apply per process. Finished jobs are deleted after
+    JOB_RETENTION, at start and every PURGE_EVERY finished jobs.
+    """
+
+    PURGE_EVERY = 256
+
+    def __init__(self, handler, db_path: str = None, workers: int = None, max_pending: int = None):
+        self.handler = handler
+        self.db_path = db_path or Config.JOB_DB_PATH
+        self.workers = workers or Config.JOB_WORKERS
+        self.max_pending = max_pending or Config.JOB_QUEUE_MAX
+        self.stage_limits = {
+            "llm": asyncio.Semaphore(Config.LLM_CONCURRENCY),
+            "github": asyncio.Semaphore(Config.GITHUB_CONCURRENCY),
+        }
+        self.poll_interval = Config.JOB_POLL_INTERVAL if Config.WEB_CONCURRENCY > 1 else None
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._finished = 0
+
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task TEXT NOT NULL,
+                round INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                available_at REAL NOT NULL DEFAULT 0,
+                owner TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if "available_at" not in columns:
+            # Databases from before jobs could be parked
+            self._db.execute("ALTER TABLE jobs ADD COLUMN available_at REAL NOT NULL DEFAULT 0")
+        if "owner" not in columns:
+            # ... and before several worker processes could share them
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def stage(self, name: str) -> asyncio.Semaphore:
+        """Concurrency limiter for a pipeline stage ("llm" or "github")"""
+        return self.stage_limits[name]
+
+    # --- storage (synchronous, always called through run_blocking) ---
+
+    def _insert(self, request: dict) -> int:
+        with self._lock:
+            pending = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs pending")
+            now = time.time()
+            cursor = self._db.execute(
+                "INSERT INTO jobs (task, round, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (request["task"], request["round"], json.dumps(request), now, now)
+            )
+            return cursor.lastrowid
+
+    def _claim(self):
+        with self._lock:
+            # IMMEDIATE: another process can't claim the same row between the SELECT and the UPDATE
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, payload, created_at FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY id LIMIT 1",
+                    (time.time(),)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (WORKER_ID, time.time(), row[0])
+                    )
+            finally:
+                self._db.execute("COMMIT")
+            return None if row is None else (row[0], json.loads(row[1]), row[2])
+
+    def _finish(self, job_id: int, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                ("failed" if error else "done", error, time.time(), job_id)
+            )
+            self._finished += 1
+        if self._finished % self.PURGE_EVERY == 0:
+            self._purge()
+
+    def _purge(self) -> int:
+        """Delete done and failed jobs older than JOB_RETENTION"""
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - Config.JOB_RETENTION,)
+            ).rowcount
+
+    def _park(self, job_id: int, delay: float, reason: str):
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, updated_at = ? WHERE id = ?",
+                (reason, now + delay, now, job_id)
+            )
+
+    def _next_available(self):
+        with self._lock:
+            return self._db.execute("SELECT MIN(available_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def _requeue_interrupted(self) -> int:
+        """Requeue running jobs whose worker process is gone (jobs of live sibling workers are left alone)"""
+        with self._lock:
+            owners = [row[0] for row in self._db.execute("SELECT DISTINCT owner FROM jobs WHERE status = 'running'")]
+            dead = [owner for owner in owners if not worker_alive(owner)]
+            return sum(
+                self._db.execute(
+                    "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? WHERE status = 'running' AND owner IS ?",
+                    (time.time(), owner)
+                ).rowcount
+                for owner in dead
+            )
+
+    def _release_owned(self) -> int:
+        """Requeue the jobs this process was running, for its next start() or a sibling worker"""
+        with self._lock:
+            return self._db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), WORKER_ID)
+            ).rowcount
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    # --- async API ---
+
+    async def enqueue(self, request: dict) -> int:
+        """Persist a build request and wake a worker. Raises QueueFullError when full."""
+        job_id = await run_blocking(self._insert, request)
+        self._wakeup.set()
+        return job_id
+
+    async def start(self):
+        await run_blocking(self._purge)
+        resumed = await run_blocking(self._requeue_interrupted)
+        if resumed:
+            print(f"🔁 Resuming {resumed} interrupted job(s)")
+        self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        if self.poll_interval:
+            self._tasks.append(asyncio.create_task(self._reap()))
+        print(f"✅ Job queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await run_blocking(self._release_owned)
+
+    async def _reap(self):
+        """Requeue the jobs of sibling worker processes that died, as their restart would"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            resumed = await run_blocking(self._requeue_interrupted)
+            if resumed:
+                print(f"🔁 Requeued {resumed} job(s) of a worker process that exited")
+                self._wakeup.set()
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await run_blocking(self._claim)
+            if job is None:
+                self._wakeup.clear()
+                # Re-check after clearing so an enqueue racing with us is never missed
+                job = await run_blocking(self._claim)
+                if job is None:
+                    # Parked jobs aren't announced: sleep until the earliest one is due.
+                    # Neither are jobs enqueued by other worker processes: poll for those
+                    available_at = await run_blocking(self._next_available)
+                    timeout = None if available_at is None else max(available_at - time.time(), 0.05)
+                    if self.poll_interval:
+                        timeout = min(timeout or self.poll_interval, self.poll_interval)
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+            job_id, request, created_at = job
+            metrics.observe("queue_wait", time.time() - created_at)
+            try:
+                await self.handler(request)
+                metrics.jobs_total.inc(("ok",))
+                await run_blocking(self._finish, job_id)
+            except asyncio.CancelledError:
+                # Requeued by stop(), or by the next start() if the process dies first
+                raise
+            except JobParked as e:
+                print(f"🅿️  Job {job_id} parked for {e.delay:.0f}s: {e}")
+                metrics.jobs_total.inc(("parked",))
+                await run_blocking(self._park, job_id, e.delay, str(e))
+            except Exception as e:
+                print(f"💥 Job {job_id} failed: {e}")
+                metrics.jobs_total.inc(("failed",))
+                await run_blocking(self._finish, job_id, str(e))
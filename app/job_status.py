@@ -0,0 +1,177 @@
+# app/job_status.py - job status index with live subscriptions
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from app import metrics
+from app.shared_state import MemoryNamespace, shared_state
+from app.utils import Config
+
+TERMINAL_STATES = ("completed", "failed")
+
+current_job = ContextVar("current_job", default=None)
+
+
+class JobStatusIndex:
+    """Latest status of recent build jobs, keyed by (task, round).
+
+    Statuses are kept in this process's memory with a bounded retention
+    window (entry count and age of finished jobs), so updates and the
+    polling and streaming clients of a single process never touch storage.
+    With a shared backend the in-memory index holds the jobs this process
+    queued or runs, and every update is also merged into the shared
+    namespace by a writer thread, in order, so the event loop never waits
+    on the database. Reads that must see other workers' updates (`fetch`)
+    run on the same thread, after the writes already submitted. Subscribers
+    receive every update made in this process as it happens, and with a
+    shared backend also poll for updates made elsewhere.
+    """
+
+    def __init__(self, retention: int = None, ttl: float = None, state=None):
+        self.retention = retention or Config.JOB_STATUS_RETENTION
+        self.ttl = ttl if ttl is not None else Config.JOB_STATUS_TTL
+        state = state or shared_state
+        if state.shared:
+            self._jobs = MemoryNamespace(self.retention)
+            self._shared = state.namespace("job_status", max_entries=self.retention)
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-status")
+        else:
+            self._jobs = state.namespace("job_status", max_entries=self.retention)
+            self._shared = self._writer = None
+        self.poll_interval = Config.STATE_POLL_INTERVAL if state.shared else None
+        self._subscribers = {}
+
+    def get(self, task: str, round_num: int):
+        """Status as this process last saw it (jobs queued or run elsewhere only with `fetch`)"""
+        status = self._jobs.get(_key(task, round_num))
+        return dict(status, stages=list(status["stages"])) if status else None
+
+    async def fetch(self, task: str, round_num: int):
+        """Latest status from any worker; with a shared backend, read after this process's pending writes"""
+        if self._shared is None:
+            return self.get(task, round_num)
+        return await asyncio.wrap_future(self._writer.submit(self._shared.get, _key(task, round_num)))
+
+    async def load(self, task: str, round_num: int):
+        """Bring a job queued by another worker into this process's index before running it"""
+        status = await self.fetch(task, round_num)
+        if status is not None and self._shared is not None:
+            self._jobs.set(_key(task, round_num), status, ttl=self._ttl(status))
+
+    async def flush(self):
+        """Wait until the updates made so far are in the shared namespace"""
+        if self._writer is not None:
+            await asyncio.wrap_future(self._writer.submit(lambda: None))
+
+    def update(self, task: str, round_num: int, event: str = "status", stage_record: dict = None, **fields):
+        key = _key(task, round_num)
+        # Same timestamps in both copies, so readers can tell which one is newer
+        now = time.time()
+        if self._shared is not None:
+            self._writer.submit(self._write_behind, key, task, round_num, event, stage_record, fields, now)
+            if self._jobs.get(key) is None and event != "queued":
+                # Not a job of this process: the shared copy is all there is
+                return
+        status = _apply(self._jobs.get(key), task, round_num, event, stage_record, fields, now)
+        self._jobs.set(key, status, ttl=self._ttl(status))
+        self._publish(key, event, status)
+
+    def _write_behind(self, key: str, task: str, round_num: int, event: str, stage_record: dict, fields: dict, now: float):
+        try:
+            self._shared.merge(key, lambda status: _apply(status, task, round_num, event, stage_record, fields, now), ttl=self._ttl)
+        except Exception as e:
+            print(f"⚠️  Could not write the status of {task} (Round {round_num}) to the shared state: {e}")
+
+    def _ttl(self, status: dict):
+        return self.ttl if status["state"] in TERMINAL_STATES else None
+
+    def record_stage(self, task: str, round_num: int, name: str, phase: str, duration: float = None, outcome: str = None):
+        if self._jobs.get(_key(task, round_num)) is None:
+            return
+        record = None if phase == "start" else {"stage": name, "duration": round(duration, 4), "outcome": outcome}
+        self.update(task, round_num, event="stage", stage_record=record, stage=name)
+
+    def _publish(self, key: str, event: str, status: dict):
+        message = {"event": event, "data": dict(status, stages=list(status["stages"]))}
+        for queue in self._subscribers.get(key, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, task: str, round_num: int, keepalive: float = 15.0):
+        """Yield server-sent event frames for a job until it reaches a terminal state"""
+        key = _key(task, round_num)
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            current = await self.fetch(task, round_num)
+            if current:
+                yield _sse("snapshot", current)
+                if current["state"] in TERMINAL_STATES:
+                    return
+            seen = current["updated_at"] if current else None
+            quiet_since = time.monotonic()
+            while True:
+                wait = keepalive - (time.monotonic() - quiet_since)
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=min(wait, self.poll_interval or wait))
+                except asyncio.TimeoutError:
+                    # Updates made by another worker process only show up in the shared state
+                    current = self.poll_interval and await self.fetch(task, round_num)
+                    if current and current["updated_at"] != seen:
+                        message = {"event": "status", "data": current}
+                    elif time.monotonic() - quiet_since >= keepalive:
+                        quiet_since = time.monotonic()
+                        yield ": keepalive\n\n"
+                        continue
+                    else:
+                        continue
+                if message["data"]["updated_at"] == seen:
+                    continue
+                seen = message["data"]["updated_at"]
+                quiet_since = time.monotonic()
+                yield _sse(message["event"], message["data"])
+                if message["data"]["state"] in TERMINAL_STATES:
+                    return
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+
+
+def _key(task: str, round_num: int) -> str:
+    return json.dumps([task, round_num])
+
+
+def _apply(status: dict, task: str, round_num: int, event: str, stage_record: dict, fields: dict, now: float) -> dict:
+    """`status` (or a new one) with an update applied; the same for the local index and the shared copy"""
+    fields = dict(fields)
+    if event == "queued" and status is not None and status["state"] not in TERMINAL_STATES:
+        # A worker may already have picked the job up before the enqueue call returned
+        fields.pop("state", None)
+    elif status is None or event == "queued":
+        status = {
+            "task": task, "round": round_num, "job_id": None, "state": "queued", "stage": None,
+            "stages": [], "repo_url": None, "commit_sha": None, "pages_url": None, "pages": None,
+            "publish": None, "llm_usage": None, "evaluation_delivered": None, "error": None, "created_at": now,
+        }
+    status = dict(status, stages=list(status["stages"]), **fields)
+    if stage_record:
+        status["stages"].append(stage_record)
+    status["updated_at"] = now
+    return status
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+job_status = JobStatusIndex()
+
+
+def _on_stage(name: str, phase: str, duration: float = None, outcome: str = None):
+    job = current_job.get()
+    if job is not None:
+        job_status.record_stage(job[0], job[1], name, phase, duration, outcome)
+
+
+metrics.add_stage_listener(_on_stage)
@@ -0,0 +1,161 @@
+# app/llm_cache.py - content-addressed cache for LLM generations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from app.utils import Config, run_blocking
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so cosmetic prompt differences map to the same key"""
+    return " ".join(text.split())
+
+
+def cache_key(system_prompt: str, user_prompt: str, model: str, temperature: float) -> str:
+    material = json.dumps({
+        "system": _normalize(system_prompt),
+        "user": _normalize(user_prompt),
+        "model": model,
+        "temperature": temperature,
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier cache: an in-memory LRU in front of a TTL'd, size-capped directory of JSON files.
+
+    The directory size is tracked as files are written, so a write only scans
+    the directory when the cap is exceeded (evicting down to SWEEP_TARGET of
+    it) or every SWEEP_EVERY writes to drop expired files.
+    """
+
+    SWEEP_EVERY = 256
+    SWEEP_TARGET = 0.9
+
+    def __init__(self, directory: str = None, memory_entries: int = None, ttl: float = None, max_bytes: int = None):
+        self.directory = directory or Config.LLM_CACHE_DIR
+        self.memory_entries = memory_entries if memory_entries is not None else Config.LLM_CACHE_MEMORY_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.LLM_CACHE_TTL
+        self.max_bytes = max_bytes if max_bytes is not None else Config.LLM_CACHE_MAX_BYTES
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # Unknown until the first sweep
+        self._writes_since_sweep = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "sweeps": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key: str, value: dict, stored_at: float):
+        with self._lock:
+            self._memory[key] = (value, stored_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry["stored_at"] > self.ttl:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _write_disk(self, key: str, value: dict, stored_at: float):
+        # One temporary file per writing thread: concurrent misses on a key each rename their own
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": stored_at, "value": value}, f)
+        size = os.path.getsize(tmp_path)
+        try:
+            replaced = os.path.getsize(self._path(key))
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, self._path(key))
+        with self._disk_lock:
+            self._writes_since_sweep += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes += size - replaced
+            sweep = (self._disk_bytes is None or self._disk_bytes > self.max_bytes
+                     or self._writes_since_sweep >= self.SWEEP_EVERY)
+        if sweep:
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones until the directory fits SWEEP_TARGET of max_bytes"""
+        with self._disk_lock:
+            self._writes_since_sweep = 0
+        self.counters["sweeps"] += 1
+        entries, total, now = [], 0, time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                self._remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * self.SWEEP_TARGET:
+                    break
+                self._remove(path)
+                total -= size
+        with self._disk_lock:
+            # Other processes sharing the directory write too: each sweep resyncs
+            self._disk_bytes = total
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            self.counters["evictions"] += 1
+        except OSError:
+            pass
+
+    async def get(self, key: str):
+        """Cached generation for `key`, or None"""
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit and time.time() - hit[1] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return hit[0]
+
+        entry = await run_blocking(self._read_disk, key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["disk_hits"] += 1
+        self._remember(key, entry["value"], entry["stored_at"])
+        return entry["value"]
+
+    async def set(self, key: str, value: dict):
+        stored_at = time.time()
+        self._remember(key, value, stored_at)
+        await run_blocking(self._write_disk, key, value, stored_at)
+        self.counters["writes"] += 1
+
+    def stats(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
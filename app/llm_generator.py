@@ -1,20 +1,45 @@
-import openai
 import json
 import base64
 import re
+import time
 from app.utils import Config
+from app.metrics import revision_outcomes, stage
+from app.llm_stream import MalformedStreamError, StreamingFilesParser, stream_metrics
+from app.llm_cache import LLMResponseCache, cache_key
+from app.llm_router import ModelRouter, load_backends
+from app.attachments import Attachment
+from app.llm_patch import PatchError, apply_patch, parse_search_replace, validate_patch
+from app.circuit_breaker import CircuitOpenError, get_breaker
+from app.token_budget import completion_budget, count_tokens, fit_sections, message_tokens, prompt_budget, token_usage
+
+
+def _llm_failure(exc: Exception) -> bool:
+    """Whether an error means the LLM is unavailable, rather than that it answered badly"""
+    return not isinstance(exc, (ValueError, MalformedStreamError, PatchError))
+
+
+def llm_breaker():
+    return get_breaker("llm", is_failure=_llm_failure)
+
 
 class LLMCodeGenerator:
-    def __init__(self):
-        if not Config.OPENAI_API_KEY:
-            raise ValueError("OpenAI API key not configured. Set OPENAI_API_KEY in .env file")
+    def __init__(self, cache: LLMResponseCache = None, router: ModelRouter = None):
+        # Async, OpenAI-compatible router over the configured backends; generation never blocks the event loop
+        self.client = router or ModelRouter(load_backends())
+        names = ", ".join(f"{b.name} ({b.model})" for b in self.client.backends)
+        print(f"✅ LLM router initialized with {len(self.client.backends)} backend(s): {names}")
+        self.cache = cache
+        # Prompts are budgeted for the backend with the smallest context window
+        self.model = self.client.budget_model
+        self.temperature = Config.LLM_TEMPERATURE
 
-        # For openai>=1.0.0 - new client syntax
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-        print("✅ OpenAI client initialized (v1.0+)")
+    async def generate_app(self, brief: str, attachments: list, checks: list, use_cache: bool = True,
+                           fallback: bool = True) -> dict:
+        """Generate complete app code using LLM based on brief and requirements.
 
-    def generate_app(self, brief: str, attachments: list, checks: list) -> dict:
-        """Generate complete app code using LLM based on brief and requirements"""
+        If the LLM fails, a new app from SimpleCodeGenerator is returned, or
+        with `fallback=False` the error is raised for the caller to handle.
+        """
 
         print(f"🧠 Generating code with LLM for: {brief[:100]}...")
         
@@ -43,15 +68,15 @@ Requirements:
 - Include proper error handling
 - Make it actually functional for the described purpose"""
 
-        user_prompt = f"""
+        user_template = """
 CREATE THIS APPLICATION:
 {brief}
 
 REQUIRED CHECKS (MUST PASS):
-{chr(10).join(f"• {check}" for check in checks)}
+{checks}
 
 ATTACHMENTS TO HANDLE:
-{attachment_info}
+{attachments}
 
 SPECIFIC INSTRUCTIONS:
 1. Create a COMPLETE, WORKING application
@@ -65,35 +90,229 @@ SPECIFIC INSTRUCTIONS:
 
 Return ONLY the JSON object with the code files.
 """
+        # Oversized briefs, checks or attachment summaries are trimmed to leave room for the completion
+        sections = fit_sections({
+            "brief": brief,
+            "checks": "\n".join(f"• {check}" for check in checks),
+            "attachments": attachment_info
+        }, self._prompt_room(system_prompt, user_template, Config.LLM_MAX_TOKENS), self.model)
+        user_prompt = user_template.format(**sections)
+
+        key = cache_key(system_prompt, user_prompt, self.model, self.temperature)
+        if self.cache and use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                print("⚡ LLM cache hit, skipping generation")
+                return dict(cached)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
 
         try:
-            # For openai>=1.0.0 - new API syntax
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,
-                max_tokens=4000
-            )
-            
-            generated_code = json.loads(response.choices[0].message.content)
+            prompt_tokens, max_tokens = completion_budget(messages, self.model, Config.LLM_MAX_TOKENS)
+            with llm_breaker().guard(), stage("llm_generation"):
+                if Config.LLM_STREAMING:
+                    generated_code = await self._stream_completion(messages, prompt_tokens, max_tokens)
+                else:
+                    # For openai>=1.0.0 - new API syntax
+                    started = time.perf_counter()
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=self.temperature,
+                        max_tokens=max_tokens
+                    )
+                    self._record_usage(response, prompt_tokens, response.choices[0].message.content, started)
+                    generated_code = json.loads(response.choices[0].message.content)
             print("✅ LLM code generation successful")
             
-            return self._validate_and_clean_code(generated_code, brief)
+            code = self._validate_and_clean_code(generated_code, brief)
+            if self.cache:
+                await self.cache.set(key, code)
+            return code
             
         except Exception as e:
-            print(f"❌ LLM generation failed: {e}")
+            if isinstance(e, CircuitOpenError):
+                print(f"🔌 Skipping the LLM: {e}")
+            else:
+                print(f"❌ LLM generation failed: {e}")
+            if not fallback:
+                raise
             # Fallback to simple generator
             from app.simple_generator import SimpleCodeGenerator
             fallback = SimpleCodeGenerator()
-            return fallback.generate_from_brief(brief)
+            with stage("fallback_generation"):
+                return fallback.generate_from_brief(brief)
     
+    async def revise_app(self, existing_files: dict, brief: str, checks: list,
+                         attachments: list = None, use_cache: bool = True) -> dict:
+        """Revise an existing app by asking for SEARCH/REPLACE patches instead of whole files.
+
+        The patch is applied locally and validated against the checks; only if
+        it doesn't apply (or breaks the app) do we fall back to full regeneration.
+        If the LLM itself is unavailable (transport error, timeout, open circuit),
+        here or during that regeneration, the error is raised: the caller updates
+        the existing files instead of replacing them with an app built from the
+        brief alone.
+        """
+        print(f"🩹 Revising existing app with LLM patch for: {brief[:100]}...")
+        files = {path: content for path, content in existing_files.items()
+                 if path in ("index.html", "script.js", "style.css")}
+
+        system_prompt = """You are an expert web developer revising an existing static web application hosted on GitHub Pages.
+
+IMPORTANT: Do NOT return whole files. Return ONLY edit blocks in this exact format, one per change:
+FILE: <path>
+<<<<<<< SEARCH
+<exact lines copied from the current file>
+=======
+<replacement lines>
+>>>>>>> REPLACE
+
+Rules:
+- The SEARCH section must match the current file exactly and only once; include enough lines to be unique
+- Keep edits small: only touch the lines that need to change
+- An empty SEARCH section appends the replacement to the file (or creates it)
+- Keep the app static (no backend) and keep all existing functionality working
+- Ensure all specified checks will pass"""
+
+        user_template = """
+CURRENT FILES:
+{current}
+
+REQUESTED CHANGE:
+{brief}
+
+REQUIRED CHECKS (MUST PASS):
+{checks}
+
+Return ONLY the SEARCH/REPLACE blocks.
+"""
+        # The current files must go out verbatim for SEARCH blocks to match; only the brief and checks are trimmed
+        current = "\n\n".join(f"FILE: {path}\n```\n{content}\n```" for path, content in files.items())
+        room = self._prompt_room(system_prompt, user_template, Config.LLM_REVISION_MAX_TOKENS) - count_tokens(current, self.model)
+        if room < 0:
+            print("⚠️  Existing app too large to send for a patch, regenerating the whole app")
+            return await self.generate_app(brief, attachments or [], checks, use_cache, fallback=False)
+        sections = fit_sections({"brief": brief, "checks": "\n".join(f"• {check}" for check in checks)}, room, self.model)
+        user_prompt = user_template.format(current=current, **sections)
+
+        key = cache_key(system_prompt, user_prompt, self.model, self.temperature)
+        if self.cache and use_cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                print("⚡ LLM cache hit, skipping revision")
+                return {**existing_files, **cached}
+
+        try:
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            prompt_tokens, max_tokens = completion_budget(messages, self.model, Config.LLM_REVISION_MAX_TOKENS)
+            with llm_breaker().guard(), stage("llm_revision"):
+                started = time.perf_counter()
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=max_tokens
+                )
+                self._record_usage(response, prompt_tokens, response.choices[0].message.content, started)
+                edits = parse_search_replace(response.choices[0].message.content or "")
+                patched = apply_patch(files, edits)
+                problems = validate_patch(files, patched, checks)
+                if problems:
+                    raise PatchError("; ".join(problems))
+        except (PatchError, ValueError) as e:
+            revision_outcomes.inc(("fallback",))
+            print(f"⚠️  LLM patch rejected, regenerating the whole app: {e}")
+            return await self.generate_app(brief, attachments or [], checks, use_cache, fallback=False)
+        except Exception:
+            revision_outcomes.inc(("error",))
+            raise
+
+        revision_outcomes.inc(("patched",))
+        print(f"✅ Applied {len(edits)} LLM edit(s) to the existing app")
+        changed = {path: content for path, content in patched.items() if files.get(path) != content}
+        if self.cache:
+            await self.cache.set(key, changed)
+        return {**existing_files, **patched}
+
+    async def aclose(self):
+        """Close the pooled HTTP clients behind the router's backends"""
+        await self.client.close()
+
+    def _prompt_room(self, system_prompt: str, user_template: str, desired_output: int) -> int:
+        """Tokens left for the variable prompt sections once the fixed text and the completion are budgeted"""
+        fixed = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_template}]
+        return prompt_budget(self.model, desired_output) - message_tokens(fixed, self.model)
+
+    def _record_usage(self, response, prompt_tokens: int, completion: str, started: float):
+        """Account a call with the API's reported usage, or local counts when it reports none"""
+        usage = getattr(response, "usage", None)
+        model = getattr(response, "model", None) or self.model
+        if usage is not None:
+            token_usage.record(model, usage.prompt_tokens, usage.completion_tokens, time.perf_counter() - started)
+        else:
+            token_usage.record(model, prompt_tokens, count_tokens(completion or "", self.model),
+                               time.perf_counter() - started, estimated=True)
+
+    async def _stream_completion(self, messages: list, prompt_tokens: int, max_tokens: int) -> dict:
+        """Stream the completion and parse files as they arrive.
+
+        Generation is cut off at the first structural error and retried up
+        to LLM_STREAM_RETRIES times before giving up.
+        """
+        for attempt in range(Config.LLM_STREAM_RETRIES + 1):
+            parser = StreamingFilesParser()
+            started = time.perf_counter()
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            received, model = [], self.model
+            try:
+                async for chunk in stream:
+                    model = getattr(chunk, "model", None) or model
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        received.append(chunk.choices[0].delta.content)
+                        parser.feed(chunk.choices[0].delta.content)
+                    if parser.done:
+                        break
+                files = parser.finish()
+            except MalformedStreamError as e:
+                stream_metrics.record(started, parser, aborted=True)
+                print(f"⚠️  Malformed LLM stream after {parser.chars_seen} chars (attempt {attempt + 1}): {e}")
+                continue
+            finally:
+                # Stop generation early once we're done or gave up on this attempt
+                await stream.close()
+                # The usage chunk comes after the content, which we stop reading early: count locally
+                token_usage.record(model, prompt_tokens, count_tokens("".join(received), self.model),
+                                   time.perf_counter() - started, estimated=True)
+
+            stream_metrics.record(started, parser, aborted=False)
+            print(f"✅ Streamed {len(files)} files, first after {parser.first_file_at - started:.2f}s")
+            return files
+
+        raise MalformedStreamError(f"no valid output after {Config.LLM_STREAM_RETRIES + 1} streamed attempts")
+
     def _process_attachments(self, attachments: list) -> str:
         """Process attachment information for the LLM"""
         if not attachments:
             return "No attachments provided"
+
+        # Ingested attachments are committed next to index.html; describe their contents
+        if all(isinstance(attachment, Attachment) for attachment in attachments):
+            return ("Files committed next to index.html (load them by these relative paths):\n"
+                    + "\n".join(attachment.summary() for attachment in attachments))
         
         attachment_info = "Available attachments:\n"
         for attachment in attachments:
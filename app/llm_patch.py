@@ -0,0 +1,82 @@
+# app/llm_patch.py - search/replace patches for LLM revisions of existing files
+import re
+
+BLOCK = re.compile(
+    r"^FILE:[ \t]*(?P<path>\S+)[ \t]*\n<<<<<<< SEARCH\n(?P<search>.*?)^=======\n(?P<replace>.*?)^>>>>>>> REPLACE[ \t]*$",
+    re.MULTILINE | re.DOTALL
+)
+QUOTED = re.compile(r"""["'`]([^"'`\s]{3,})["'`]""")
+SELECTOR_ID = re.compile(r"#([A-Za-z][\w-]*)")
+
+
+class PatchError(Exception):
+    """Raised when a patch cannot be parsed or does not apply cleanly"""
+
+
+def parse_search_replace(text: str) -> list:
+    """Parse `FILE:` + SEARCH/REPLACE blocks into (path, search, replace) edits"""
+    edits = [(m["path"], m["search"], m["replace"]) for m in BLOCK.finditer(text)]
+    if not edits:
+        raise PatchError("no SEARCH/REPLACE blocks in the response")
+    return edits
+
+
+def _locate(content: str, search: str):
+    """Span of `search` in `content`: exact first, then ignoring trailing whitespace per line"""
+    index = content.find(search)
+    if index >= 0:
+        if content.find(search, index + 1) >= 0:
+            raise PatchError(f"SEARCH text is ambiguous ({content.count(search)} matches)")
+        return index, index + len(search)
+
+    lines = [line.rstrip() for line in search.rstrip("\n").split("\n")]
+    content_lines = content.split("\n")
+    offsets = [0]
+    for line in content_lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+    for start in range(len(content_lines) - len(lines) + 1):
+        if all(content_lines[start + i].rstrip() == lines[i] for i in range(len(lines))):
+            return offsets[start], min(len(content), offsets[start + len(lines)])
+    return None
+
+
+def apply_patch(files: dict, edits: list) -> dict:
+    """Apply edits in order and return the new files. An empty SEARCH appends to (or creates) the file."""
+    patched = dict(files)
+    for path, search, replace in edits:
+        content = patched.get(path, "")
+        if not search.strip():
+            patched[path] = content + ("\n" if content and not content.endswith("\n") else "") + replace
+            continue
+        span = _locate(content, search)
+        if span is None:
+            raise PatchError(f"SEARCH text not found in {path}: {search.strip().splitlines()[0][:80]!r}")
+        patched[path] = content[:span[0]] + replace + content[span[1]:]
+    return patched
+
+
+def validate_patch(original: dict, patched: dict, checks: list) -> list:
+    """Static sanity checks on a patched app; returns a list of problems (empty if it looks fine).
+
+    The HTML must still be a complete document, brace balance of the JS and
+    CSS must not change, and every id/quoted identifier a check refers to
+    must exist somewhere in the files.
+    """
+    problems = []
+    html = patched.get("index.html", "")
+    if "<html" not in html.lower() or "</html>" not in html.lower():
+        problems.append("index.html is no longer a complete HTML document")
+    for path in ("script.js", "style.css"):
+        before, after = original.get(path, ""), patched.get(path, "")
+        for opening, closing in ("{}", "()", "[]"):
+            if before.count(opening) - before.count(closing) != after.count(opening) - after.count(closing):
+                problems.append(f"unbalanced {opening}{closing} in {path}")
+
+    text = "\n".join(content for content in patched.values() if isinstance(content, str))
+    for check in checks:
+        for token in set(SELECTOR_ID.findall(check)) | set(QUOTED.findall(check)):
+            token = token.lstrip("#")
+            if token not in text:
+                problems.append(f"check not satisfied: {check!r} ({token!r} missing)")
+                break
+    return problems
@@ -0,0 +1,330 @@
+# app/llm_router.py - multi-backend LLM routing with latency-based selection and hedged requests
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+from app.utils import Config
+from app import metrics
+from app.http_clients import new_client
+from app.token_budget import count_tokens, message_tokens, model_limits, token_usage
+
+class Backend:
+    """One model on one endpoint, with EWMA latency and error rate"""
+
+    def __init__(self, name: str, model: str, client, timeout: float, alpha: float = None):
+        self.name = name
+        self.model = model
+        self.client = client
+        self.timeout = timeout
+        self.alpha = alpha or Config.LLM_ROUTER_EWMA_ALPHA
+        self.ewma_latency = None
+        self.ewma_error = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.in_flight = 0
+
+    def expected_latency(self) -> float:
+        """Expected time to a successful answer; untried backends go first"""
+        if self.ewma_latency is None:
+            return 0.0
+        return self.ewma_latency / max(1.0 - self.ewma_error, 0.05)
+
+    def observe(self, latency: float = None, error: bool = False):
+        self.requests += 1
+        self.errors += error
+        self.ewma_error += self.alpha * (float(error) - self.ewma_error)
+        if latency is not None:
+            self.ewma_latency = latency if self.ewma_latency is None else self.ewma_latency + self.alpha * (latency - self.ewma_latency)
+
+    def snapshot(self) -> dict:
+        return {
+            "model": self.model,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "ewma_error_rate": round(self.ewma_error, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "wins": self.wins,
+            "in_flight": self.in_flight,
+        }
+
+
+class _PeekedStream:
+    """A completion stream whose first chunk has already been read (to time it)"""
+
+    def __init__(self, stream, iterator, first):
+        self._stream = stream
+        self._iterator = iterator
+        self._first = first
+
+    @classmethod
+    async def open(cls, stream):
+        iterator = stream.__aiter__()
+        try:
+            first = await iterator.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except BaseException:
+            await stream.close()
+            raise
+        return cls(stream, iterator, first)
+
+    async def __aiter__(self):
+        if self._first is not None:
+            yield self._first
+        async for chunk in self._iterator:
+            yield chunk
+
+    async def close(self):
+        await self._stream.close()
+
+
+async def _discard(result):
+    if isinstance(result, _PeekedStream):
+        await result.close()
+
+
+class ModelRouter:
+    """Drop-in for openai.AsyncOpenAI that spreads calls over several backends.
+
+    Each call goes to the backend with the lowest expected latency (EWMA
+    latency inflated by the EWMA error rate). Errors fail over to the next
+    backend straight away, each backend being tried at most once. For a
+    stream with no first chunk after `hedge_delay` seconds, a duplicate goes
+    to the next backend and the first chunk wins. Non-streaming calls aren't
+    hedged: their latency is the whole completion, which a long answer makes
+    slow without anything being wrong. The tokens of a duplicate that lost
+    are still billed, so they are recorded in token_usage (estimated).
+    """
+
+    def __init__(self, backends: list, hedge_delay: float = None):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = backends
+        self.hedge_delay = Config.LLM_HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    @property
+    def budget_model(self) -> str:
+        """Model with the smallest context window: prompts are budgeted so every backend can take them"""
+        return min((b.model for b in self.backends), key=lambda model: model_limits(model)[0])
+
+    def ranked(self) -> list:
+        return sorted(self.backends, key=lambda b: (b.expected_latency(), b.in_flight))
+
+    async def _call(self, backend: Backend, kwargs: dict):
+        async def attempt():
+            result = await backend.client.chat.completions.create(**{**kwargs, "model": backend.model})
+            return await _PeekedStream.open(result) if kwargs.get("stream") else result
+
+        started = time.perf_counter()
+        backend.in_flight += 1
+        try:
+            result = await asyncio.wait_for(attempt(), backend.timeout)
+        except asyncio.CancelledError:
+            raise  # lost a hedge race: neither a sample nor an error
+        except Exception:
+            backend.observe(error=True)
+            metrics.llm_backend_latency.observe((backend.name, "error"), time.perf_counter() - started)
+            raise
+        finally:
+            backend.in_flight -= 1
+        latency = time.perf_counter() - started
+        backend.observe(latency=latency)
+        metrics.llm_backend_latency.observe((backend.name, "ok"), latency)
+        return result
+
+    def _record_loser(self, backend: Backend, kwargs: dict, result=None):
+        """Account the duplicate that lost a hedge race: its prompt was sent (and billed) all the same"""
+        prompt_tokens = message_tokens(kwargs.get("messages", []), backend.model)
+        usage = getattr(result, "usage", None)
+        if usage is not None:
+            token_usage.record(backend.model, usage.prompt_tokens, usage.completion_tokens, 0.0)
+            return
+        completion = ""
+        if result is not None and getattr(result, "choices", None):
+            completion = getattr(result.choices[0].message, "content", "") or ""
+        token_usage.record(backend.model, prompt_tokens, count_tokens(completion, backend.model), 0.0, estimated=True)
+
+    async def create(self, **kwargs):
+        # Hedges and failovers go to other backends only: the same one again would just queue behind itself
+        order = self.ranked()
+        attempts = len(order)
+        tasks, errors = {}, []
+        launched, hedged = 0, False
+
+        def launch(hedge: bool = False):
+            nonlocal launched
+            backend = order[launched]
+            tasks[asyncio.ensure_future(self._call(backend, kwargs))] = (backend, hedge)
+            launched += 1
+
+        launch()
+        try:
+            while True:
+                can_hedge = self.hedge_delay and kwargs.get("stream") and not hedged and launched < attempts
+                done, _ = await asyncio.wait(
+                    tasks, timeout=self.hedge_delay if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    print(f"🏁 No LLM stream chunk after {self.hedge_delay:.1f}s, hedging to {order[launched].name}")
+                    launch(hedge=True)
+                    continue
+
+                winner = None
+                for task in done:
+                    backend, hedge = tasks.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                    elif winner is None:
+                        winner = (task.result(), backend, hedge)
+                    else:
+                        self._record_loser(backend, kwargs, task.result())
+                        await _discard(task.result())
+                if winner:
+                    result, backend, hedge = winner
+                    backend.wins += 1
+                    self.hedge_wins += hedge
+                    return result
+
+                if launched < attempts:
+                    self.failovers += 1
+                    print(f"⚠️  LLM backend failed ({errors[-1]}), failing over to {order[launched].name}")
+                    launch()
+                elif not tasks:
+                    raise errors[-1]
+        finally:
+            # Cancel the losers; one may have finished in the meantime, so close what it opened
+            for task in tasks:
+                task.cancel()
+            losers = list(tasks.values())
+            for (backend, _), result in zip(losers, await asyncio.gather(*tasks, return_exceptions=True)):
+                if isinstance(result, asyncio.CancelledError):
+                    self._record_loser(backend, kwargs)
+                elif not isinstance(result, BaseException):
+                    self._record_loser(backend, kwargs, result)
+                    await _discard(result)
+
+    def snapshot(self) -> dict:
+        return {
+            "hedge_delay": self.hedge_delay,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "backends": {b.name: b.snapshot() for b in self.backends},
+        }
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.client.close()
+
+
+class MockLLMBackend:
+    """Offline stand-in for an OpenAI-compatible endpoint, for benchmarks and local runs.
+
+    Latency is `latency` seconds give or take `jitter`, with probability
+    `tail_rate` of a `tail_latency` stall; `error_rate` of calls fail.
+    Completions are a canned counter app in the JSON file format.
+    """
+
+    def __init__(self, latency: float = 1.0, jitter: float = 0.2, tail_rate: float = 0.0, tail_latency: float = 10.0,
+                 error_rate: float = 0.0, chunks: int = 20, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.chunks = chunks
+        self.calls = 0
+        self._canned = None
+        self._random = random.Random(seed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _content(self) -> str:
+        if self._canned is None:
+            from app.simple_generator import SimpleCodeGenerator
+            self._canned = json.dumps({**SimpleCodeGenerator()._generate_counter(), "style.css": "body { margin: 0; }"})
+        return self._canned
+
+    async def create(self, model: str = "mock", stream: bool = False, **kwargs):
+        self.calls += 1
+        delay = self.tail_latency if self._random.random() < self.tail_rate else self.latency + self._random.uniform(-self.jitter, self.jitter)
+        failed = self._random.random() < self.error_rate
+        content = self._content()
+        usage = SimpleNamespace(prompt_tokens=len(json.dumps(kwargs.get("messages", []))) // 4, completion_tokens=len(content) // 4)
+        if stream:
+            return _MockStream(model, content, max(delay, 0.0), self.chunks, failed, usage)
+        await asyncio.sleep(max(delay, 0.0))
+        if failed:
+            raise RuntimeError("mock backend error")
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(message=message)], usage=usage)
+
+    async def close(self):
+        pass
+
+
+class _MockStream:
+    def __init__(self, model: str, content: str, delay: float, chunks: int, failed: bool, usage):
+        self.model = model
+        self.content = content
+        self.delay = delay
+        self.chunks = chunks
+        self.failed = failed
+        self.usage = usage
+        self.closed = False
+
+    async def __aiter__(self):
+        # Time to first token dominates; the rest arrives at a steady rate
+        await asyncio.sleep(self.delay)
+        if self.failed:
+            raise RuntimeError("mock backend error")
+        size = -(-len(self.content) // self.chunks)
+        for start in range(0, len(self.content), size):
+            if self.closed:
+                return
+            delta = SimpleNamespace(content=self.content[start:start + size])
+            yield SimpleNamespace(model=self.model, choices=[SimpleNamespace(delta=delta)], usage=None)
+            await asyncio.sleep(0.001)
+        yield SimpleNamespace(model=self.model, choices=[], usage=self.usage)
+
+    async def close(self):
+        self.closed = True
+
+
+def load_backends() -> list:
+    """Backends from LLM_BACKENDS (a JSON list), or the single OpenAI backend from OPENAI_API_KEY/LLM_MODEL.
+
+    Each entry: {"name", "model", "provider": "openai"|"mock", "base_url",
+    "api_key_env", "timeout"}; mock entries also take MockLLMBackend's options.
+    """
+    specs = json.loads(Config.LLM_BACKENDS) if Config.LLM_BACKENDS else [{"name": "openai", "model": Config.LLM_MODEL}]
+    backends = []
+    for spec in specs:
+        spec = dict(spec)
+        name = spec.pop("name", None) or spec.get("model", "backend")
+        model = spec.pop("model", Config.LLM_MODEL)
+        timeout = float(spec.pop("timeout", Config.OPENAI_TIMEOUT))
+        if spec.pop("provider", "openai") == "mock":
+            client = MockLLMBackend(**spec)
+        else:
+            key_env = spec.get("api_key_env", "OPENAI_API_KEY")
+            api_key = Config.OPENAI_API_KEY if key_env == "OPENAI_API_KEY" else os.getenv(key_env)
+            if not api_key:
+                raise ValueError(f"API key for LLM backend {name} not configured. Set {key_env} in .env file")
+            import openai  # Deferred: importing it takes longer than the rest of the app together
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=spec.get("base_url"),
+                timeout=timeout,
+                http_client=new_client(timeout)
+            )
+        backends.append(Backend(name, model, client, timeout))
+    return backends
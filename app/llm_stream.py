@@ -0,0 +1,155 @@
+# app/llm_stream.py - incremental parsing of streamed {"filename": "content", ...} completions
+import json
+import time
+from collections import deque
+
+
+class MalformedStreamError(Exception):
+    """Raised as soon as a streamed completion can no longer be a valid files object"""
+
+
+class StreamingFilesParser:
+    """Incremental parser for a flat JSON object whose values are all strings.
+
+    Feed it completion deltas as they arrive; each finished key/value pair is
+    available in `files` immediately, and structural errors raise
+    MalformedStreamError at the offending character instead of at the end.
+    """
+
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.files = {}
+        self.done = False
+        self.chars_seen = 0
+        self.first_file_at = None
+        self._state = "start"
+        self._buffer = []
+        self._escaped = False
+        self._key = None
+        self._fence = ""
+
+    def feed(self, text: str):
+        for char in text:
+            self.chars_seen += 1
+            self._step(char)
+
+    def finish(self) -> dict:
+        """Call at end of stream; raises if the object was never closed (truncated output)"""
+        if not self.done:
+            raise MalformedStreamError(f"stream ended before the JSON object closed ({len(self.files)} files parsed)")
+        return self.files
+
+    def _fail(self, char: str, expected: str):
+        raise MalformedStreamError(f"unexpected {char!r} at offset {self.chars_seen}, expected {expected}")
+
+    def _step(self, char: str):
+        state = self._state
+        if state in ("key", "value"):
+            self._read_string(char)
+        elif state == "start":
+            # Tolerate a leading ```json fence, nothing else before the object
+            if char == "{":
+                self._state = "key_or_end"
+            elif char == "`" or self._fence.startswith("```"):
+                self._fence += char
+                if char == "\n":
+                    self._fence = ""
+            elif char not in self._WHITESPACE:
+                self._fail(char, "'{'")
+        elif state == "done":
+            if char not in self._WHITESPACE + "`":
+                self._fail(char, "end of output")
+        elif char in self._WHITESPACE:
+            return
+        elif state in ("key_or_end", "key_start"):
+            if char == '"':
+                self._state = "key"
+            elif char == "}" and state == "key_or_end":
+                self._close()
+            else:
+                self._fail(char, "a quoted filename")
+        elif state == "colon":
+            if char != ":":
+                self._fail(char, "':'")
+            self._state = "value_start"
+        elif state == "value_start":
+            if char != '"':
+                self._fail(char, "a string value")
+            self._state = "value"
+        elif state == "after_value":
+            if char == ",":
+                self._state = "key_start"
+            elif char == "}":
+                self._close()
+            else:
+                self._fail(char, "',' or '}'")
+
+    def _read_string(self, char: str):
+        if self._escaped:
+            self._escaped = False
+        elif char == "\\":
+            self._escaped = True
+        elif char == '"':
+            try:
+                value = json.loads('"' + "".join(self._buffer) + '"')
+            except ValueError as e:
+                raise MalformedStreamError(f"invalid JSON string: {e}")
+            self._buffer = []
+            if self._state == "key":
+                self._key = value
+                self._state = "colon"
+            else:
+                self.files[self._key] = value
+                if self.first_file_at is None:
+                    self.first_file_at = time.perf_counter()
+                self._state = "after_value"
+            return
+        elif char == "\n":
+            raise MalformedStreamError(f"raw newline inside a JSON string at offset {self.chars_seen}")
+        self._buffer.append(char)
+
+    def _close(self):
+        if not self.files:
+            raise MalformedStreamError("JSON object closed without any files")
+        self.done = True
+        self._state = "done"
+
+
+class StreamMetrics:
+    """Process-wide counters for streamed generations"""
+
+    def __init__(self, window: int = 500):
+        self.streams = 0
+        self.aborted = 0
+        self.wasted_chars = 0
+        self.time_to_first_file = deque(maxlen=window)
+        self.time_to_complete = deque(maxlen=window)
+
+    def record(self, started: float, parser: StreamingFilesParser, aborted: bool):
+        self.streams += 1
+        if aborted:
+            self.aborted += 1
+            self.wasted_chars += parser.chars_seen
+            return
+        if parser.first_file_at is not None:
+            self.time_to_first_file.append(parser.first_file_at - started)
+        self.time_to_complete.append(time.perf_counter() - started)
+
+    @staticmethod
+    def _median(values):
+        if not values:
+            return None
+        return round(sorted(values)[len(values) // 2], 3)
+
+    def snapshot(self) -> dict:
+        return {
+            "streams": self.streams,
+            "aborted": self.aborted,
+            "wasted_chars": self.wasted_chars,
+            "median_time_to_first_file": self._median(self.time_to_first_file),
+            "median_time_to_complete": self._median(self.time_to_complete),
+        }
+
+
+stream_metrics = StreamMetrics()
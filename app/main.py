@@ -1,110 +1,297 @@
 # app/main.py - COMPLETE VERSION WITH ROUND 2 SUPPORT
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-import requests
-import asyncio
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import time
+import httpx
 from app.auth import verify_secret
-from app.utils import Config
-from app.llm_generator import LLMCodeGenerator
+from app.utils import Config, run_blocking
+from app.llm_generator import LLMCodeGenerator, llm_breaker
+from app.llm_patch import validate_patch
+from app.llm_router import ModelRouter
+from app.llm_cache import LLMResponseCache
+from app.llm_stream import stream_metrics
+from app.token_budget import token_usage
+from app import metrics
+from app.metrics import stage
 from app.github_manager import GitHubManager
+from app.github_client import GitHubAPIError
+from app.circuit_breaker import CircuitOpenError, get_breaker
+from app import circuit_breaker
+from app.job_queue import JobParked, JobQueue, QueueFullError
+from app.idempotency import IdempotencyStore, idempotency_key
+from app.job_status import job_status, current_job
+from app.pipeline import Pipeline, Stage
+from app.providers import Provider, ProviderUnavailable
+from app.http_clients import http_clients
+from app.shared_state import WORKER_ID, shared_state
+from app.evaluation_outbox import EvaluationOutbox, evaluation_host
+from app.attachments import (
+    AttachmentError, check_sizes, client_attachments, close_attachments, discard_spooled, ingest_attachments,
+    reopen_spooled, spool_attachments, sweep_spool
+)
 from app.simple_generator import SimpleCodeGenerator
 
 app = FastAPI(title="LLM Code Deployment API")
 
-# Initialize managers
-try:
-    github_mgr = GitHubManager()
-    llm_gen = LLMCodeGenerator()
-    simple_gen = SimpleCodeGenerator()
-    print("✅ All managers initialized: GitHub, LLM, Simple Generator")
-except Exception as e:
-    print(f"⚠️  Initialization warning: {e}")
-    github_mgr = None
-    llm_gen = None
-    simple_gen = SimpleCodeGenerator()
-
-async def submit_to_evaluation(evaluation_url: str, payload: dict, max_retries: int = 5):
-    """Submit results to evaluation URL with exponential backoff"""
-    for attempt in range(max_retries):
+# GitHub and the LLM are initialized in the background once the app is up (see startup)
+llm_cache = LLMResponseCache()
+simple_gen = SimpleCodeGenerator()
+github_mgr = None
+llm_gen = None
+
+async def create_github_manager() -> GitHubManager:
+    """GitHub manager with the login resolved; ValueError if no token is configured"""
+    manager = GitHubManager()
+    try:
+        await manager.authenticate()
+    except BaseException:
+        await manager.client.aclose()
+        raise
+    return manager
+
+async def create_llm_generator() -> LLMCodeGenerator:
+    """LLM generator over the configured backends; ValueError if none has a key.
+    Built in a worker thread: the first OpenAI backend imports the openai package."""
+    return await run_blocking(LLMCodeGenerator, cache=llm_cache)
+
+def bind_github(manager: GitHubManager):
+    global github_mgr
+    github_mgr = manager
+
+def bind_llm(generator: LLMCodeGenerator):
+    global llm_gen
+    llm_gen = generator
+
+github_provider = Provider("GitHub", create_github_manager, bind=bind_github)
+llm_provider = Provider("LLM", create_llm_generator, bind=bind_llm)
+
+@app.on_event("startup")
+async def startup():
+    """Start serving right away; GitHub and the LLM initialize concurrently in the background"""
+    if Config.WEB_CONCURRENCY > 1 and not shared_state.shared:
+        print(f"⚠️  {Config.WEB_CONCURRENCY} worker processes with STATE_BACKEND={shared_state.name}: "
+              "job status, secrets and caches are not shared between them")
+    for provider, instance in ((github_provider, github_mgr), (llm_provider, llm_gen)):
+        if instance is not None:
+            provider.adopt(instance)
+        else:
+            provider.start()
+    await http_clients.start()
+    await outbox.start()
+    await job_queue.start()
+    # Spool files of jobs that were deleted or lost before they finished
+    swept = await run_blocking(sweep_spool, Config.JOB_ATTACHMENT_DIR, Config.JOB_RETENTION)
+    if swept:
+        print(f"🧹 Removed {swept} stale attachment spool file(s)")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await github_provider.aclose()
+    await llm_provider.aclose()
+    await job_queue.stop()
+    await outbox.stop()
+    if github_mgr:
+        await github_mgr.pages.aclose()
+        await github_mgr.client.aclose()
+    if llm_gen:
+        await llm_gen.aclose()
+    await http_clients.aclose()
+
+def record_evaluation_result(payload: dict, delivered: bool):
+    """Outbox callback: reflect the final delivery outcome in the job status"""
+    job_status.update(payload["task"], payload["round"], evaluation_delivered=delivered)
+
+async def fetch_existing_files(repo_url: str) -> dict:
+    """Round 2: the live app files, or {} if they can't be fetched"""
+    try:
+        async with job_queue.stage("github"):
+            with stage("fetch_existing"):
+                return await github_mgr.get_files(repo_url, ["index.html", "style.css", "script.js"])
+    except Exception as e:
+        print(f"⚠️  Could not fetch the existing app, regenerating it: {e}")
+        return {}
+
+async def try_local_update(existing: dict, brief: str, checks: list):
+    """Round 2 fast path: apply a keyword transformer to the live files, or None to use the LLM.
+
+    The result goes through the same static checks as an LLM patch; if the
+    brief's checks name something the transformer didn't add, the LLM does it.
+    """
+    if "index.html" not in existing or not simple_gen.match_update(brief):
+        return None
+    try:
+        with stage("local_update"):
+            updated = await run_blocking(simple_gen.update_existing_app, existing, brief)
+    except Exception as e:
+        print(f"⚠️  Local round 2 update failed, using the LLM: {e}")
+        return None
+    problems = validate_patch(existing, updated, checks)
+    if problems:
+        print(f"⚠️  Local round 2 update doesn't pass the checks, using the LLM: {'; '.join(problems)}")
+        return None
+    return updated
+
+async def fallback_code(brief: str, existing: dict) -> dict:
+    """Simple generator output when the LLM can't be used; round 2 keeps the live app and updates it"""
+    with stage("fallback_generation"):
+        if "index.html" in existing:
+            return await run_blocking(simple_gen.update_existing_app, existing, brief)
+        return await run_blocking(simple_gen.generate_from_brief, brief)
+
+async def generate_code(request_data: dict, attachments: list, existing: dict) -> dict:
+    """Round 2 local update, the LLM, or the simple generator as a fallback"""
+    # Round 2 revisions the keyword transformers recognize skip the LLM entirely;
+    # the rest are sent to the LLM as a patch against the live files
+    checks = request_data.get("checks", [])
+    code_files = await try_local_update(existing, request_data["brief"], checks) if existing else None
+    if code_files is not None:
+        print("⚡ Round 2 update applied locally, no LLM call needed")
+    elif llm_gen and llm_breaker().available():
         try:
-            print(f"📤 Attempt {attempt + 1} to submit to evaluation URL...")
-            response = requests.post(
-                evaluation_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                print(f"✅ Successfully submitted to evaluation URL")
-                return True
-            else:
-                print(f"❌ Evaluation URL returned {response.status_code}: {response.text}")
-                
+            print("🧠 Generating code with LLM...")
+            async with job_queue.stage("llm"):
+                if "index.html" in existing:
+                    code_files = await llm_gen.revise_app(
+                        existing,
+                        request_data["brief"],
+                        checks,
+                        attachments=attachments,
+                        use_cache=not request_data.get("bypass_cache", False)
+                    )
+                else:
+                    code_files = await llm_gen.generate_app(
+                        request_data["brief"],
+                        attachments,
+                        checks,
+                        use_cache=not request_data.get("bypass_cache", False)
+                    )
+            print("✅ LLM code generation completed")
         except Exception as e:
-            print(f"⚠️  Error submitting to evaluation URL (attempt {attempt + 1}): {e}")
-        
-        if attempt < max_retries - 1:
-            wait_time = 2 ** attempt
-            print(f"⏳ Retrying in {wait_time} seconds...")
-            await asyncio.sleep(wait_time)
+            print(f"❌ LLM generation failed, using fallback: {e}")
+            code_files = await fallback_code(request_data["brief"], existing)
+    else:
+        # Not configured, or its circuit is open: don't queue behind the LLM slots just to fail fast
+        print("⚠️  LLM not available, using simple generator")
+        code_files = await fallback_code(request_data["brief"], existing)
     
-    print(f"💥 Failed to submit to evaluation URL after {max_retries} attempts")
-    return False
+    # Generated files win over attachments with the same name
+    return {**{attachment.name: attachment for attachment in attachments}, **code_files}
+
+def retry_github_stage(error: Exception) -> bool:
+    """GitHub 5xx and network errors are retried within the job while the circuit is still closed"""
+    return github_outage_delay(error) is not None and get_breaker("github").available()
+
+def build_stages(request_data: dict, attachments: list) -> list:
+    """The build as a dependency graph, each stage declared after the ones it needs.
+
+    Provisioning (repo creation and Pages) runs alongside attachment ingestion
+    and, in round 1, code generation; round 2 generation needs the live files
+    first. Publishing waits for both the repository and the code. Ingested
+    attachments are added to `attachments` so the job can always close them.
+    """
+    task_id = request_data["task"]
+    round_num = request_data["round"]
+    brief = request_data["brief"]
+
+    async def ingest():
+        # Attachments were spooled at submission; the prompt gets summaries, the repo the raw files
+        if request_data.get("spooled_attachments"):
+            with stage("attachments"):
+                attachments.extend(await run_blocking(reopen_spooled, request_data["spooled_attachments"]))
+        elif request_data.get("attachments"):
+            with stage("attachments"):
+                attachments.extend(await run_blocking(ingest_attachments, request_data["attachments"]))
+        return attachments
+
+    async def provision():
+        async with job_queue.stage("github"):
+            target = await github_mgr.provision_repo(task_id)
+        if round_num == 2 and target["created"]:
+            print(f"⚠️  Round 2: Repository for task {task_id} didn't exist. Created a new one.")
+        return target
+
+    async def existing(provision):
+        return {} if provision["created"] else await fetch_existing_files(provision["repo_url"])
+
+    async def generate(attachments, existing=None):
+        return await generate_code(request_data, attachments, existing or {})
+
+    async def publish(provision, generate):
+        message = "Initial commit" if round_num == 1 else f"Round {round_num} updates - {brief[:50]}..."
+        async with job_queue.stage("github"):
+            return await github_mgr.publish_repo(provision, generate, brief, message)
+
+    stages = [Stage("attachments", ingest)]
+    if not github_mgr:
+        return stages + [Stage("generate", generate, after=("attachments",))]
+    stages.append(Stage("provision", provision, retries=Config.STAGE_RETRIES, retry_if=retry_github_stage))
+    if round_num == 2:
+        stages.append(Stage("existing", existing, after=("provision",)))
+        stages.append(Stage("generate", generate, after=("attachments", "existing")))
+    else:
+        stages.append(Stage("generate", generate, after=("attachments",)))
+    stages.append(Stage("publish", publish, after=("provision", "generate"), retries=Config.STAGE_RETRIES, retry_if=retry_github_stage))
+    return stages
+
+def github_outage_delay(error: Exception):
+    """Seconds to park a job that failed because GitHub is down (open circuit, 5xx or
+    transport error anywhere in the exception chain), or None if it just failed"""
+    breaker = get_breaker("github")
+    while error is not None:
+        if isinstance(error, ProviderUnavailable) and error.name == github_provider.name:
+            return max(error.retry_after, Config.BREAKER_PROBE_WAIT)
+        if isinstance(error, CircuitOpenError) and error.name == breaker.name:
+            return max(error.retry_after, Config.BREAKER_PROBE_WAIT)
+        if isinstance(error, httpx.TransportError) or (isinstance(error, GitHubAPIError) and error.status >= 500):
+            return max(breaker.retry_after(), Config.BREAKER_PROBE_WAIT)
+        error = error.__cause__ or error.__context__
+    return None
+
+def pages_done(task_id: str, round_num: int, outbox_id: int = None):
+    """Pages tracker callback: record the deployment outcome and release the held evaluation callback"""
+    async def done(status: dict):
+        job_status.update(task_id, round_num, pages=status["state"])
+        if outbox_id is not None:
+            await outbox.release(outbox_id)
+    return done
 
 async def process_build_request(request_data: dict):
     """Background task to process the build request"""
+    key = idempotency_key(request_data)
+    task_id = request_data["task"]
+    round_num = request_data["round"]
+    trace = metrics.tracer.start(task_id, round_num)
+    trace_token = metrics.current_trace.set(trace)
+    job_token = current_job.set((task_id, round_num))
+    attachments = []
+    finished = False
     try:
-        task_id = request_data["task"]
-        round_num = request_data["round"]
+        # Queued by another worker process, possibly: its status is in the shared state
+        await job_status.load(task_id, round_num)
+        job_status.update(task_id, round_num, state="running", error=None)
         
         print(f"🚀 Processing request for task: {task_id} (Round {round_num})")
+
+        # Wait for an initialization still in flight; a GitHub that failed to come up parks the job
+        if github_mgr is None and await github_provider.get() is None and github_provider.pending:
+            raise ProviderUnavailable(github_provider.name, github_provider.retry_after())
+        if llm_gen is None:
+            await llm_provider.get()
+
+        # No point generating code that can't be published: wait in the queue until GitHub is back
+        github_breaker = get_breaker("github")
+        if github_mgr and not github_breaker.available():
+            raise CircuitOpenError(github_breaker.name, github_breaker.retry_after())
         
-        # Check if this is Round 2 and repo should exist
-        if round_num == 2 and github_mgr:
-            if not github_mgr.repo_exists(task_id):
-                print(f"⚠️  Round 2: Repository for task {task_id} doesn't exist. Creating new one.")
-                # Fall back to Round 1 behavior
-                request_data["round"] = 1
-        
-        # Generate code using LLM with fallback
-        code_files = {}
-        if llm_gen:
-            try:
-                print("🧠 Generating code with LLM...")
-                code_files = llm_gen.generate_app(
-                    request_data["brief"],
-                    request_data.get("attachments", []),
-                    request_data.get("checks", [])
-                )
-                print("✅ LLM code generation completed")
-            except Exception as e:
-                print(f"❌ LLM generation failed, using fallback: {e}")
-                code_files = simple_gen.generate_from_brief(request_data["brief"])
-        else:
-            print("⚠️  LLM not available, using simple generator")
-            code_files = simple_gen.generate_from_brief(request_data["brief"])
-        
-        # Create/update GitHub repository
-        repo_info = {}
+        # Repo provisioning doesn't need the generated code, so it runs while the code is generated
+        pipeline = Pipeline(build_stages(request_data, attachments))
         if github_mgr:
-            if request_data["round"] == 1:
-                print("🔄 Creating new GitHub repository...")
-                repo_info = github_mgr.create_repo_from_code(
-                    task_id, 
-                    code_files, 
-                    request_data["brief"]
-                )
-            else:  # Round 2
-                print("🔄 Updating existing GitHub repository...")
-                repo_url = github_mgr.get_repo_url(task_id)
-                repo_info = github_mgr.update_repo(
-                    repo_url,
-                    code_files,
-                    request_data["brief"],
-                    f"Round {round_num} updates - {request_data['brief'][:50]}..."
-                )
+            # Budget is reserved up front: a build short of rate limit waits here, not halfway through
+            async with github_mgr.reserve_budget():
+                results = await pipeline.run()
+            repo_info = results["publish"]
         else:
+            await pipeline.run()
             # Mock response if GitHub not available
             repo_info = {
                 "repo_url": f"https://github.com/user/repo-{task_id}",
@@ -123,28 +310,88 @@ async def process_build_request(request_data: dict):
             "pages_url": repo_info["pages_url"]
         }
         
-        success = await submit_to_evaluation(request_data["evaluation_url"], eval_payload)
+        # The commit exists now; duplicates of this nonce get this result instead of a rebuild
+        await idempotency.complete(key, {
+            "repo_url": repo_info["repo_url"],
+            "commit_sha": repo_info["commit_sha"],
+            "pages_url": repo_info["pages_url"]
+        })
+        job_status.update(
+            task_id, round_num,
+            repo_url=repo_info["repo_url"],
+            commit_sha=repo_info["commit_sha"],
+            pages_url=repo_info["pages_url"],
+            publish=repo_info.get("publish")
+        )
+        if "publish" in repo_info:
+            metrics.publish_saved.inc(("bytes",), repo_info["publish"]["bytes_saved"])
+            metrics.publish_saved.inc(("calls",), max(0, repo_info["publish"]["calls_saved"]))
+            if trace:
+                trace.details["publish"] = repo_info["publish"]
         
-        if success:
-            print(f"🎉 Successfully processed Round {round_num} for task: {task_id}")
-            print(f"   📁 Repo: {repo_info['repo_url']}")
-            print(f"   🌐 Live: {repo_info['pages_url']}")
-            print(f"   🔧 Method: {'LLM' if llm_gen and 'llm_gen' in locals() else 'Simple'} Generation")
-            print(f"   📝 Commit: {repo_info['commit_sha'][:8]}...")
-        else:
-            print(f"⚠️  Task processed but evaluation submission failed: {task_id}")
+        # Delivery (with retries) is the outbox's job; the build is done once the payload is queued.
+        # With a real repo the callback is held until the Pages site serves this commit (or the deadline passes)
+        wait_for_site = github_mgr is not None and Config.PAGES_WAIT_FOR_SITE
+        with stage("evaluation_enqueue"):
+            outbox_id = await outbox.enqueue(
+                request_data["evaluation_url"], eval_payload, hold=Config.PAGES_READY_TIMEOUT if wait_for_site else None
+            )
+        if github_mgr:
+            github_mgr.watch_pages(repo_info, on_done=pages_done(task_id, round_num, outbox_id if wait_for_site else None))
+        
+        print(f"🎉 Successfully processed Round {round_num} for task: {task_id}")
+        print(f"   📁 Repo: {repo_info['repo_url']}")
+        print(f"   🌐 Live: {repo_info['pages_url']}")
+        print(f"   🔧 Method: {'LLM' if llm_gen and 'llm_gen' in locals() else 'Simple'} Generation")
+        print(f"   📝 Commit: {repo_info['commit_sha'][:8]}...")
+        job_status.update(task_id, round_num, event="done", state="completed", stage=None)
+        if trace:
+            trace.outcome = "ok"
+            timings = ", ".join(f"{s['stage']}={s['duration']:.2f}s" for s in trace.stages)
+            print(f"⏱️  Stages: {timings}")
+        finished = True
             
     except Exception as e:
+        delay = github_outage_delay(e) if github_mgr or github_provider.pending else None
+        if delay is not None:
+            # Not a failure: the idempotency claim is kept and the queue runs the job again later
+            print(f"🅿️  GitHub unavailable, parking {task_id} (Round {round_num}): {e}")
+            job_status.update(task_id, round_num, state="parked", stage=None, error=str(e))
+            if trace:
+                trace.outcome = "parked"
+            raise JobParked(delay, str(e)) from e
         print(f"💥 Error processing build request: {e}")
+        finished = True
         import traceback
         traceback.print_exc()
+        await idempotency.release(key)
+        job_status.update(task_id, round_num, event="done", state="failed", error=str(e))
+        if trace:
+            trace.outcome = "failed"
+        raise
+    finally:
+        if finished:
+            close_attachments(attachments)
+            discard_spooled(request_data.get("spooled_attachments"))
+        else:
+            # Parked or shut down: the job runs again later from the same spool files
+            kept = {entry.get("path") for entry in request_data.get("spooled_attachments") or []}
+            close_attachments([attachment for attachment in attachments if attachment.path not in kept])
+        current_job.reset(job_token)
+        metrics.current_trace.reset(trace_token)
+
+job_queue = JobQueue(process_build_request)
+idempotency = IdempotencyStore()
+outbox = EvaluationOutbox(on_result=record_evaluation_result)
 
 @app.post("/api/build")
-async def build_endpoint(request: dict, background_tasks: BackgroundTasks):
+async def build_endpoint(request: dict):
     """Main build endpoint - accepts both round 1 and round 2 requests"""
     
     # Verify secret
-    if not verify_secret(request.get("email", ""), request.get("secret", "")):
+    with stage("auth"):
+        authorized = await run_blocking(verify_secret, request.get("email", ""), request.get("secret", ""))
+    if not authorized:
         raise HTTPException(status_code=403, detail="Invalid secret")
     
     # Validate required fields
@@ -156,19 +403,80 @@ async def build_endpoint(request: dict, background_tasks: BackgroundTasks):
     # Validate round number
     if request["round"] not in [1, 2]:
         raise HTTPException(status_code=400, detail="Round must be 1 or 2")
+
+    # The callback host names a circuit breaker and its metrics
+    if evaluation_host(request["evaluation_url"]) is None:
+        raise HTTPException(status_code=400, detail="evaluation_url must be an http(s) URL with a valid host")
+
+    # Clients send name and url only: spool entries (file paths) are never taken from a request
+    request["attachments"] = client_attachments(request.get("attachments"))
+    request.pop("spooled_attachments", None)
+
+    # Reject oversized attachments up front instead of queueing them
+    try:
+        check_sizes(request["attachments"])
+    except AttachmentError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
     print(f"📥 Received Round {request['round']} request: {request['task']}")
     
-    # Start background processing
-    background_tasks.add_task(process_build_request, request)
+    # Same (email, task, round, nonce) as an earlier request: attach to it instead of rebuilding
+    key = idempotency_key(request)
+    existing = await idempotency.claim(key)
+    if existing:
+        print(f"♻️  Duplicate Round {request['round']} request for {request['task']} ({existing['status']})")
+        response = {
+            "status": "completed" if existing["status"] == "completed" else "accepted",
+            "message": f"Round {request['round']} build request was already received",
+            "task": request["task"],
+            "round": request["round"],
+            "job_id": existing["job_id"],
+            "duplicate": True
+        }
+        response.update(existing["result"] or {})
+        return response
+    
+    # Queue for the worker pool; reject with Retry-After when the queue is full.
+    # Attachments are decoded to spool files first so the queued payload holds paths, not base64 data
+    payload = {k: v for k, v in request.items() if k not in ("secret", "attachments")}
+    job_id = None
+    try:
+        if request["attachments"]:
+            with stage("attachments_spool"):
+                payload["spooled_attachments"] = await run_blocking(spool_attachments, request["attachments"])
+        job_id = await job_queue.enqueue(payload)
+        await idempotency.attach_job(key, job_id)
+    except QueueFullError:
+        discard_spooled(payload.get("spooled_attachments"))
+        await idempotency.release(key)
+        raise HTTPException(
+            status_code=429,
+            detail="Build queue is full, retry later",
+            headers={"Retry-After": str(Config.JOB_RETRY_AFTER)}
+        )
+    except BaseException:
+        # Any other failure (or the client going away) must not leave the nonce claimed with no job
+        if job_id is None:
+            discard_spooled(payload.get("spooled_attachments"))
+        await idempotency.release(key)
+        raise
+    job_status.update(request["task"], request["round"], event="queued", job_id=job_id, state="queued")
+    # Other workers answer for the job as soon as the client has its id
+    await job_status.flush()
     
     return {
         "status": "accepted",
         "message": f"Round {request['round']} build request is being processed",
         "task": request["task"],
-        "round": request["round"]
+        "round": request["round"],
+        "job_id": job_id
     }
 
+def llm_router_stats():
+    """Per-backend EWMA latency/error rates and hedging counters, if the LLM goes through the router"""
+    router = getattr(llm_gen, "client", None)
+    return router.snapshot() if isinstance(router, ModelRouter) else None
+
 @app.get("/health")
 async def health_check():
     config_status = "fully_configured" if (Config.GITHUB_TOKEN and Config.OPENAI_API_KEY) else "partial_config"
@@ -177,9 +485,76 @@ async def health_check():
         "service": "student-build-api",
         "environment": "WSL + Windows Desktop",
         "config": config_status,
-        "features": ["round1", "round2", "llm_generation", "github_pages"]
+        "features": ["round1", "round2", "llm_generation", "github_pages"],
+        "worker": {"id": WORKER_ID, "processes": Config.WEB_CONCURRENCY},
+        "state": shared_state.snapshot(),
+        "llm_cache": llm_cache.stats(),
+        "llm_stream": stream_metrics.snapshot(),
+        "llm_usage": token_usage.snapshot(),
+        "llm_router": llm_router_stats(),
+        "providers": {provider.name: provider.snapshot() for provider in (github_provider, llm_provider)},
+        "circuit_breakers": circuit_breaker.snapshot(),
+        "evaluation_outbox": await run_blocking(outbox.stats),
+        "pages": github_mgr.pages.snapshot() if github_mgr else None,
+        "github_repos": await github_mgr.repos.snapshot() if github_mgr else None,
+        "github_rate_limit": github_mgr.client.scheduler.snapshot() if github_mgr else None
     }
 
+@app.get("/health/live")
+async def liveness():
+    """The process is up and serving; says nothing about its dependencies"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once every configured dependency is initialized, 503 while one is starting or retrying"""
+    providers = {provider.name: provider.snapshot() for provider in (github_provider, llm_provider)}
+    ready = not (github_provider.pending or llm_provider.pending)
+    return JSONResponse({"status": "ready" if ready else "starting", "providers": providers}, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus exposition of stage timings, job outcomes and LLM cache/stream/usage counters"""
+    return metrics.render({
+        "llm_cache": llm_cache.stats(),
+        "llm_stream": stream_metrics.snapshot(),
+        "llm_usage": token_usage.snapshot(),
+        "llm_router": llm_router_stats() or {},
+        "evaluation_outbox": await run_blocking(outbox.stats),
+        "pages": github_mgr.pages.snapshot() if github_mgr else {},
+        "github_repos": await github_mgr.repos.snapshot() if github_mgr else {},
+        "github_rate_limit": github_mgr.client.scheduler.snapshot() if github_mgr else {}
+    })
+
+@app.get("/api/traces/{task}")
+async def task_traces(task: str):
+    """Stage-by-stage traces of recent jobs for a task"""
+    if not metrics.tracer.enabled:
+        raise HTTPException(status_code=404, detail="Tracing is disabled (TRACE_ENABLED=false)")
+    traces = metrics.tracer.for_task(task)
+    if not traces:
+        raise HTTPException(status_code=404, detail=f"No traces for task {task}")
+    return {"task": task, "traces": traces}
+
+@app.get("/api/jobs/{task}/{round_num}")
+async def job_status_endpoint(task: str, round_num: int):
+    """Current stage, stage timings, repo/commit/pages info and error of a recent job"""
+    status = await job_status.fetch(task, round_num)
+    if not status:
+        raise HTTPException(status_code=404, detail=f"No recent job for task {task} round {round_num}")
+    return status
+
+@app.get("/api/jobs/{task}/{round_num}/events")
+async def job_events_endpoint(task: str, round_num: int):
+    """Server-sent events: a snapshot, then every stage transition until the job finishes"""
+    if not await job_status.fetch(task, round_num):
+        raise HTTPException(status_code=404, detail=f"No recent job for task {task} round {round_num}")
+    return StreamingResponse(
+        job_status.subscribe(task, round_num),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/")
 async def root():
     return {
@@ -187,6 +562,12 @@ async def root():
         "endpoints": {
             "POST /api/build": "Accept build/revise requests (Round 1 & 2)",
             "GET /health": "Health check with config status",
+            "GET /health/live": "Liveness: the process is serving",
+            "GET /health/ready": "Readiness: GitHub and the LLM are initialized (503 until then)",
+            "GET /metrics": "Prometheus metrics for pipeline stages",
+            "GET /api/traces/{task}": "Per-stage traces of recent jobs for a task",
+            "GET /api/jobs/{task}/{round}": "Status, stage timings and results of a recent job",
+            "GET /api/jobs/{task}/{round}/events": "Server-sent stream of a job's stage transitions",
             "GET /docs": "API documentation"
         },
         "version": "1.0.0",
@@ -0,0 +1,224 @@
+# app/metrics.py - per-stage build timing, Prometheus exposition and per-job traces
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.utils import Config
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    """Label value as the text exposition format requires: backslash, double quote and newline escaped"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Minimal Prometheus histogram with a fixed label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple = STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values: tuple, value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][i] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series["counts"]):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {count}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, le)} {series['count']}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {series['count']}")
+        return lines
+
+
+class Counter:
+    """Minimal Prometheus counter with a fixed label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, label_values: tuple) -> float:
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+stage_duration = Histogram(
+    "build_stage_duration_seconds", "Time spent in each build pipeline stage", ("stage", "outcome")
+)
+jobs_total = Counter("build_jobs_total", "Build jobs finished, by outcome", ("outcome",))
+publish_saved = Counter(
+    "github_publish_saved_total", "Bytes and API calls skipped by diff-based publishing of unchanged files", ("kind",)
+)
+llm_backend_latency = Histogram(
+    "llm_backend_latency_seconds", "Time to a completion (first chunk when streaming), by router backend and outcome",
+    ("backend", "outcome")
+)
+llm_tokens = Counter("llm_tokens_total", "Tokens used by LLM calls, by model and kind (prompt/completion)", ("model", "kind"))
+llm_cost = Counter("llm_cost_usd_total", "Estimated LLM spend in USD, by model", ("model",))
+revision_outcomes = Counter(
+    "llm_revisions_total", "LLM patch revisions of existing apps: patched, fallback (patch rejected) or error", ("outcome",)
+)
+breaker_events = Counter(
+    "circuit_breaker_events_total", "Circuit breaker transitions and rejected calls, by dependency", ("breaker", "event")
+)
+stage_retries = Counter("build_stage_retries_total", "Build pipeline stages retried after a transient failure", ("stage",))
+pages_ready = Histogram(
+    "pages_deploy_seconds", "Time from push until the Pages site responds, by outcome (ready/errored/timeout)",
+    ("outcome",), buckets=(5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+
+class JobTrace:
+    """Timeline of one build job: each stage with its offset, duration and outcome"""
+
+    def __init__(self, task: str, round_num: int):
+        self.task = task
+        self.round = round_num
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = []
+        self.outcome = None
+        self.details = {}
+
+    def add(self, stage: str, started: float, duration: float, outcome: str, error: str = None):
+        record = {
+            "stage": stage,
+            "offset": round(started - self._started, 4),
+            "duration": round(duration, 4),
+            "outcome": outcome,
+        }
+        if error:
+            record["error"] = error
+        self.stages.append(record)
+
+    def to_dict(self) -> dict:
+        return {
+            "task": self.task,
+            "round": self.round,
+            "started_at": self.started_at,
+            "outcome": self.outcome,
+            "stages": list(self.stages),
+            "details": dict(self.details),
+        }
+
+
+class Tracer:
+    """Bounded in-memory store of recent job traces, keyed by (task, round).
+
+    Disabled tracing costs nothing: `start()` returns None and stages only
+    feed the histogram.
+    """
+
+    def __init__(self, enabled: bool = None, retention: int = None):
+        self.enabled = Config.TRACE_ENABLED if enabled is None else enabled
+        self.retention = retention or Config.TRACE_RETENTION
+        self._traces = OrderedDict()
+
+    def start(self, task: str, round_num: int):
+        if not self.enabled:
+            return None
+        trace = JobTrace(task, round_num)
+        self._traces[(task, round_num)] = trace
+        self._traces.move_to_end((task, round_num))
+        while len(self._traces) > self.retention:
+            self._traces.popitem(last=False)
+        return trace
+
+    def for_task(self, task: str) -> list:
+        return [trace.to_dict() for (trace_task, _), trace in self._traces.items() if trace_task == task]
+
+
+tracer = Tracer()
+current_trace = ContextVar("current_trace", default=None)
+_stage_listeners = []
+
+
+def add_stage_listener(callback):
+    """Call `callback(name, phase, duration=None, outcome=None)` on every stage start and finish"""
+    _stage_listeners.append(callback)
+
+
+def _notify(name: str, phase: str, duration: float = None, outcome: str = None):
+    for callback in _stage_listeners:
+        try:
+            callback(name, phase, duration, outcome)
+        except Exception as e:
+            print(f"⚠️  Stage listener failed: {e}")
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage into the histogram and the current job's trace (if any)"""
+    started = time.perf_counter()
+    _notify(name, "start")
+    try:
+        yield
+    except BaseException as e:
+        _finish(name, started, "error", f"{type(e).__name__}: {e}")
+        raise
+    _finish(name, started, "ok")
+
+
+def _finish(name: str, started: float, outcome: str, error: str = None):
+    duration = time.perf_counter() - started
+    stage_duration.observe((name, outcome), duration)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, started, duration, outcome, error)
+    _notify(name, "finish", duration, outcome)
+
+
+def observe(name: str, duration: float, outcome: str = "ok"):
+    """Record a stage whose duration was measured elsewhere (e.g. time spent queued)"""
+    _finish(name, time.perf_counter() - duration, outcome)
+
+
+def render_gauges(prefix: str, values: dict) -> list:
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return lines
+
+
+def render(extra_gauges: dict = None) -> str:
+    lines = stage_duration.render() + jobs_total.render() + publish_saved.render() + revision_outcomes.render()
+    lines += llm_tokens.render() + llm_cost.render() + llm_backend_latency.render() + breaker_events.render()
+    lines += stage_retries.render() + pages_ready.render()
+    for prefix, values in (extra_gauges or {}).items():
+        lines += render_gauges(prefix, values)
+    return "\n".join(lines) + "\n"
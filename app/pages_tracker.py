@@ -0,0 +1,132 @@
+# app/pages_tracker.py - GitHub Pages enablement and background deployment tracking
+import asyncio
+import time
+from collections import OrderedDict
+import httpx
+from app import metrics
+from app.github_client import GitHubAPIError
+from app.http_clients import http_clients, new_client
+from app.utils import Config
+
+
+class PagesTracker:
+    """Enables Pages through the Pages API and follows each deployment in the background.
+
+    `track()` returns straight away: a background task polls the latest Pages
+    build with exponential backoff until it has built the pushed commit, then
+    requests the site until it answers 200. It gives up at
+    PAGES_READY_TIMEOUT. `on_done(status)` is awaited when the deployment is
+    ready, errored or timed out, so a held evaluation callback can be released.
+    """
+
+    def __init__(self, client, site_client: httpx.AsyncClient = None):
+        self.client = client
+        self._site_client = site_client
+        self._tasks = set()
+        self.deployments = OrderedDict()
+        self.outcomes = {"ready": 0, "errored": 0, "timeout": 0}
+        self.polls = 0
+
+    @property
+    def site(self) -> httpx.AsyncClient:
+        """Client for the published sites. A GitHub client on a custom transport (a local stub) serves them too."""
+        if self._site_client is None or self._site_client.is_closed:
+            transport = getattr(self.client, "transport", None)
+            if transport is None:
+                return http_clients.pages
+            self._site_client = new_client(Config.PAGES_CHECK_TIMEOUT, transport=transport, follow_redirects=True)
+        return self._site_client
+
+    async def enable(self, repo_path: str, branch: str) -> str:
+        """Publish `branch` from its root directory; returns the site URL (None if GitHub doesn't say)"""
+        try:
+            pages = await self.client.post(f"{repo_path}/pages", json={"source": {"branch": branch, "path": "/"}})
+        except GitHubAPIError as e:
+            if e.status != 409:
+                raise
+            # Already enabled
+            pages = await self.client.get(f"{repo_path}/pages")
+        return (pages or {}).get("html_url")
+
+    def track(self, repo_path: str, commit_sha: str, pages_url: str, on_done=None) -> dict:
+        """Start following the deployment of `commit_sha` to `pages_url`; returns its live status record"""
+        status = {"pages_url": pages_url, "commit_sha": commit_sha, "state": "building", "seconds": None, "error": None}
+        self.deployments[pages_url] = status
+        self.deployments.move_to_end(pages_url)
+        while len(self.deployments) > Config.JOB_STATUS_RETENTION:
+            self.deployments.popitem(last=False)
+        task = asyncio.create_task(self._follow(repo_path, status, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return status
+
+    async def _follow(self, repo_path: str, status: dict, on_done):
+        started = time.monotonic()
+        deadline = started + Config.PAGES_READY_TIMEOUT
+        delay = Config.PAGES_POLL_INTERVAL
+        built = False
+        try:
+            while True:
+                try:
+                    if not built:
+                        built = await self._build_finished(repo_path, status)
+                    if built and await self._site_responds(status["pages_url"]):
+                        status["state"] = "ready"
+                        break
+                except PagesBuildError as e:
+                    status["state"], status["error"] = "errored", str(e)
+                    break
+                except Exception as e:
+                    # GitHub or the site being briefly unreachable is just another reason to poll again
+                    status["error"] = f"{type(e).__name__}: {e}"
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    status["state"] = "timeout"
+                    break
+                await asyncio.sleep(min(delay, remaining))
+                delay = min(delay * 2, Config.PAGES_POLL_MAX)
+        finally:
+            status["seconds"] = round(time.monotonic() - started, 2)
+        self.outcomes[status["state"]] += 1
+        metrics.pages_ready.observe((status["state"],), status["seconds"])
+        icon = {"ready": "🌐", "errored": "💥", "timeout": "⏰"}[status["state"]]
+        print(f"{icon} Pages {status['state']} after {status['seconds']:.1f}s: {status['pages_url']}")
+        if on_done:
+            await on_done(status)
+
+    async def _build_finished(self, repo_path: str, status: dict) -> bool:
+        self.polls += 1
+        try:
+            build = await self.client.get(f"{repo_path}/pages/builds/latest")
+        except GitHubAPIError as e:
+            if e.status == 404:
+                return False  # No build yet
+            raise
+        if build.get("commit") != status["commit_sha"]:
+            return False  # Still the previous deployment
+        if build.get("status") == "errored":
+            raise PagesBuildError((build.get("error") or {}).get("message") or "Pages build failed")
+        return build.get("status") == "built"
+
+    async def _site_responds(self, pages_url: str) -> bool:
+        response = await self.site.get(pages_url)
+        return response.status_code == 200
+
+    def snapshot(self) -> dict:
+        return {
+            "tracking": len(self._tasks),
+            "polls": self.polls,
+            **self.outcomes,
+        }
+
+    async def aclose(self):
+        """Stop tracking; held callbacks still go out at their deadline"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._site_client is not None:
+            await self._site_client.aclose()
+
+
+class PagesBuildError(Exception):
+    """Raised when GitHub reports the Pages build of the tracked commit as errored"""
@@ -0,0 +1,71 @@
+# app/pipeline.py - build pipeline as a dependency graph of stages
+import asyncio
+from app import metrics
+from app.utils import Config
+
+
+class Stage:
+    """One step of a build: `run` is awaited with the results of the stages it comes `after` as keyword arguments.
+
+    A failure that `retry_if` accepts is retried up to `retries` times with
+    exponential backoff, re-running only this stage: the results it was
+    given are reused.
+    """
+
+    def __init__(self, name: str, run, after: tuple = (), retries: int = 0, retry_if=None):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.retries = retries
+        self.retry_if = retry_if or (lambda error: True)
+
+    async def execute(self, inputs: dict):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self.run(**inputs)
+            except Exception as e:
+                if attempt == self.retries or not self.retry_if(e):
+                    raise
+                delay = Config.STAGE_RETRY_DELAY * 2 ** attempt
+                print(f"🔁 Stage {self.name} failed ({e}), retry {attempt + 1}/{self.retries} in {delay:.1f}s")
+                metrics.stage_retries.inc((self.name,))
+                await asyncio.sleep(delay)
+
+
+class Pipeline:
+    """Runs each stage as soon as the stages it depends on have finished.
+
+    Independent stages run concurrently. The first stage to fail (after its
+    own retries) cancels everything still running and its exception is
+    raised from run(); otherwise run() returns every stage's result by name.
+    """
+
+    def __init__(self, stages: list):
+        self.stages = {}
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown or later stages: {', '.join(missing)}")
+            self.stages[stage.name] = stage
+
+    async def run(self) -> dict:
+        tasks = {}
+
+        async def run_stage(stage: Stage):
+            inputs = {dep: await tasks[dep] for dep in stage.after}
+            return await stage.execute(inputs)
+
+        # Stages are declared after their dependencies, so every task it awaits already exists
+        for name, stage in self.stages.items():
+            tasks[name] = asyncio.create_task(run_stage(stage), name=f"stage:{name}")
+        try:
+            await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+        # A failed stage also fails the stages waiting on it; report the first one in declaration order
+        for task in tasks.values():
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return {name: task.result() for name, task in tasks.items()}
@@ -0,0 +1,119 @@
+# app/providers.py - lazily built dependencies with background re-initialization
+import asyncio
+import time
+from app.utils import Config
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a dependency that is configured hasn't been initialized (yet)"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is not initialized yet, retrying in {retry_after:.1f}s")
+
+
+class Provider:
+    """One dependency (the GitHub manager, the LLM generator) built off the request path.
+
+    `factory` is an async callable returning the instance. start() runs it in
+    the background, so the app serves requests while it initializes; get()
+    waits for an attempt already in flight. A ValueError from the factory
+    means the dependency isn't configured and is final. Any other error is
+    retried in the background with exponential backoff (PROVIDER_RETRY_BASE,
+    doubling up to PROVIDER_RETRY_MAX). `bind` is called with the instance
+    once it is ready; closing the instance is left to its owner.
+    """
+
+    def __init__(self, name: str, factory, bind=None):
+        self.name = name
+        self.factory = factory
+        self.bind = bind
+        self.instance = None
+        self.state = "idle"  # idle, initializing, ready, retrying, disabled
+        self.error = None
+        self.attempts = 0
+        self.ready_after = None
+        self.next_attempt_at = None
+        self._started_at = None
+        self._task = None
+        self._attempt = None
+
+    def adopt(self, instance):
+        """Use an instance built elsewhere instead of the factory"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._attempt is not None and not self._attempt.done():
+            self._attempt.set_result(instance)
+        self.instance = instance
+        self.state = "ready"
+
+    def start(self):
+        if self._task is None and self.state not in ("ready", "disabled"):
+            self._started_at = time.monotonic()
+            self.state = "initializing"
+            self._attempt = asyncio.get_running_loop().create_future()
+            self._task = asyncio.create_task(self._run(), name=f"provider:{self.name}")
+
+    async def _run(self):
+        delay = Config.PROVIDER_RETRY_BASE
+        while True:
+            if self._attempt.done():
+                self._attempt = asyncio.get_running_loop().create_future()
+            self.attempts += 1
+            try:
+                instance = await self.factory()
+            except ValueError as e:
+                self.state, self.error = "disabled", str(e)
+                print(f"⚠️  {self.name} disabled: {e}")
+                self._attempt.set_result(None)
+                return
+            except Exception as e:
+                self.state, self.error = "retrying", f"{type(e).__name__}: {e}"
+                self.next_attempt_at = time.time() + delay
+                print(f"⚠️  {self.name} initialization failed (attempt {self.attempts}), retrying in {delay:.0f}s: {e}")
+                self._attempt.set_result(None)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, Config.PROVIDER_RETRY_MAX)
+                continue
+            self.instance, self.state, self.error, self.next_attempt_at = instance, "ready", None, None
+            self.ready_after = round(time.monotonic() - self._started_at, 3)
+            if self.bind:
+                self.bind(instance)
+            print(f"✅ {self.name} ready after {self.ready_after:.2f}s")
+            self._attempt.set_result(instance)
+            return
+
+    async def get(self):
+        """The instance, waiting for an attempt in flight; None if it isn't available"""
+        if self.instance is not None or self.state == "disabled":
+            return self.instance
+        self.start()
+        # Between attempts this doesn't wait: callers fall back or park instead
+        await asyncio.shield(self._attempt)
+        return self.instance
+
+    @property
+    def pending(self) -> bool:
+        """Configured but not available (yet)"""
+        return self.instance is None and self.state not in ("disabled", "idle")
+
+    def retry_after(self) -> float:
+        return max(0.0, (self.next_attempt_at or time.time()) - time.time())
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "ready_after": self.ready_after,
+            "retry_in": round(self.retry_after(), 1) if self.state == "retrying" else None,
+            "error": self.error,
+        }
+
+    async def aclose(self):
+        """Stop initializing or retrying"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
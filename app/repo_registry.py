@@ -0,0 +1,107 @@
+# app/repo_registry.py - canonical repo names and a revalidating cache of repo lookups
+import hashlib
+import time
+from app.github_client import GitHubAPIError
+from app.shared_state import shared_state
+from app.utils import Config, run_blocking
+
+REPO_DESCRIPTION = "Auto-generated app for task: "
+
+
+def repo_name(task_id: str) -> str:
+    """Canonical repository name for a task (GitHub allows letters, digits, '-' and '_' here)"""
+    name = f"task-{task_id.replace(' ', '-').replace('_', '-').lower()[:30]}"
+    return ''.join(c for c in name if c.isalnum() or c in ['-', '_'])
+
+
+def fallback_repo_name(task_id: str) -> str:
+    """Name for a task whose canonical name is taken by another task's repository"""
+    digest = hashlib.sha1(task_id.encode()).hexdigest()[:8]
+    return f"{repo_name(task_id)[:26]}-{digest}"
+
+
+def repo_task(repo: dict):
+    """Task a repository was generated for (from its description), or None if we didn't create it"""
+    description = repo.get("description") or ""
+    return description[len(REPO_DESCRIPTION):] if description.startswith(REPO_DESCRIPTION) else None
+
+
+class RepoRegistry:
+    """Repositories looked up by name, cached for GITHUB_REPO_CACHE_TTL seconds.
+
+    Within the TTL a lookup is answered from memory. After it, the repository
+    is revalidated with a conditional GET: an unchanged repository costs a
+    304, which GitHub doesn't count against the rate limit. Entries are
+    replaced when we create a repository and dropped when we delete one.
+    With a shared STATE_BACKEND the cache is shared by the worker processes,
+    so round 2 finds the repository that another worker created in round 1;
+    entries are then read and written through run_blocking.
+    """
+
+    def __init__(self, client, ttl: float = None, max_entries: int = 1024, state=None):
+        self.client = client
+        self.ttl = Config.GITHUB_REPO_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries
+        self._entries = (state or shared_state).namespace("github_repos", max_entries=max_entries)
+        self.stats = {"hits": 0, "revalidated": 0, "fetched": 0, "collisions": 0}
+
+    async def get(self, login: str, name: str) -> dict:
+        """The repository; raises GitHubAPIError (404) if it doesn't exist"""
+        path = f"/repos/{login}/{name}"
+        entry = await run_blocking(self._entries.get, path)
+        if entry and time.time() - entry["checked_at"] < self.ttl:
+            self.stats["hits"] += 1
+            return entry["repo"]
+        try:
+            repo, etag = await self.client.get_if_changed(path, entry["etag"] if entry else None)
+        except GitHubAPIError as e:
+            if e.status == 404:
+                await run_blocking(self._entries.delete, path)
+            raise
+        if repo is None:
+            self.stats["revalidated"] += 1
+            entry["checked_at"] = time.time()
+            await run_blocking(self._entries.set, path, entry)
+            return entry["repo"]
+        self.stats["fetched"] += 1
+        await self._store(path, repo, etag)
+        return repo
+
+    async def find(self, login: str, name: str):
+        """The repository, or None if it doesn't exist"""
+        try:
+            return await self.get(login, name)
+        except GitHubAPIError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    async def resolve(self, login: str, task_id: str):
+        """(name, repo) for a task's repository; repo is None if it doesn't exist yet.
+
+        The canonical name can be shared by different task ids (it is
+        lowercased, sanitized and truncated). When the repository under it
+        was created for another task, this task gets fallback_repo_name().
+        """
+        name = repo_name(task_id)
+        repo = await self.find(login, name)
+        owner = repo_task(repo) if repo else None
+        if owner is None or owner == task_id:
+            return name, repo
+        self.stats["collisions"] += 1
+        name = fallback_repo_name(task_id)
+        print(f"⚠️  Repository name {repo_name(task_id)} belongs to task {owner}, using {name}")
+        return name, await self.find(login, name)
+
+    async def put(self, login: str, name: str, repo: dict):
+        """Record a repository we just created or changed; it is revalidated in full after the TTL"""
+        await self._store(f"/repos/{login}/{name}", repo, None)
+
+    async def invalidate(self, login: str, name: str):
+        await run_blocking(self._entries.delete, f"/repos/{login}/{name}")
+
+    async def _store(self, path: str, repo: dict, etag: str):
+        await run_blocking(self._entries.set, path, {"repo": repo, "etag": etag, "checked_at": time.time()})
+
+    async def snapshot(self) -> dict:
+        return {"cached": await run_blocking(len, self._entries), **self.stats}
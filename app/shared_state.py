@@ -0,0 +1,295 @@
+# app/shared_state.py - key/value state shared by the worker processes of one deployment
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.utils import Config
+
+# Identifies this process in rows it owns (running jobs, callbacks being sent)
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+def worker_alive(worker_id: str) -> bool:
+    """Whether the process that wrote `worker_id` is still running (processes on this host only)"""
+    if not worker_id:
+        return False
+    if worker_id == WORKER_ID:
+        return True
+    try:
+        pid = int(worker_id.split("-")[0])
+    except ValueError:
+        return False
+    if pid == os.getpid():
+        # An earlier incarnation of this process (same pid after a container restart)
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MemoryNamespace:
+    """Entries in a dict of this process, optionally bounded (least recently written goes first)"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else default
+
+    def _store(self, key: str, value, ttl: float):
+        self._entries[key] = (value, time.time() + ttl if ttl is not None else None)
+        self._entries.move_to_end(key)
+        while self.max_entries and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key: str, value, ttl: float = None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        with self._lock:
+            if self._live(key):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def merge(self, key: str, update, ttl=None):
+        """Replace `key` with update(current value or None); `ttl` may be a function of the new value"""
+        with self._lock:
+            entry = self._live(key)
+            value = update(entry[0] if entry else None)
+            self._store(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            for key in [key for key in self._entries if self._live(key) is None]:
+                self._entries.pop(key, None)
+            return len(self._entries)
+
+
+class MemoryState:
+    """Single-process state: every namespace is a private dict of the component that asked for it"""
+
+    name = "memory"
+    shared = False
+
+    def namespace(self, name: str, max_entries: int = None) -> MemoryNamespace:
+        return MemoryNamespace(max_entries)
+
+    def snapshot(self) -> dict:
+        return {"backend": self.name, "shared": self.shared}
+
+
+class SQLiteNamespace:
+    """Entries of one namespace in the `state` table; values are stored as JSON"""
+
+    TRIM_EVERY = 64
+
+    def __init__(self, state: "SQLiteState", name: str, max_entries: int = None):
+        self.state = state
+        self.name = name
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def get(self, key: str, default=None):
+        with self.state.connection() as db:
+            row = db.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (self.name, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value, ttl: float = None):
+        now = time.time()
+        with self.state.connection() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            )
+        self._wrote()
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        """Set `key` unless it is already set; atomic across processes"""
+        now = time.time()
+        with self.state.transaction() as db:
+            db.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ? AND expires_at <= ?", (self.name, key, now)
+            )
+            added = db.execute(
+                "INSERT OR IGNORE INTO state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            ).rowcount > 0
+        if added:
+            self._wrote()
+        return added
+
+    def merge(self, key: str, update, ttl=None):
+        """Replace `key` with update(current value or None) in one transaction; atomic across processes"""
+        now = time.time()
+        with self.state.transaction() as db:
+            row = db.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (self.name, key, now)
+            ).fetchone()
+            value = update(json.loads(row[0]) if row else None)
+            ttl = ttl(value) if callable(ttl) else ttl
+            db.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), now + ttl if ttl is not None else None, now)
+            )
+        self._wrote()
+        return value
+
+    def delete(self, key: str):
+        with self.state.connection() as db:
+            db.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (self.name, key))
+
+    def __len__(self) -> int:
+        with self.state.connection() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (self.name, time.time())
+            ).fetchone()[0]
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % self.TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        """Drop expired entries and, past max_entries, the least recently written ones"""
+        with self.state.connection() as db:
+            db.execute("DELETE FROM state WHERE namespace = ? AND expires_at <= ?", (self.name, time.time()))
+            if self.max_entries:
+                db.execute(
+                    "DELETE FROM state WHERE namespace = ? AND key IN "
+                    "(SELECT key FROM state WHERE namespace = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (self.name, self.name, self.max_entries)
+                )
+
+
+class SQLiteState:
+    """State in one SQLite file (WAL), shared by every worker process on the host.
+
+    Every call blocks on the file (and on other processes' write
+    transactions), so code on the event loop goes through run_blocking or
+    writes behind from a thread (see JobStatusIndex). Commits skip the fsync
+    (synchronous=NORMAL): a power loss can drop the last writes, not corrupt
+    the file. Each process opens its own connection, also after a fork.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.STATE_DB_PATH
+        self._lock = threading.Lock()
+        self._db = None
+        self._pid = None
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS state (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        db.execute("CREATE INDEX IF NOT EXISTS state_updated ON state (namespace, updated_at)")
+        return db
+
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            if self._db is None or self._pid != os.getpid():
+                self._db, self._pid = self._open(), os.getpid()
+            yield self._db
+
+    @contextmanager
+    def transaction(self):
+        """Connection inside BEGIN IMMEDIATE: other processes' writes wait until it commits"""
+        with self.connection() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def namespace(self, name: str, max_entries: int = None) -> SQLiteNamespace:
+        return SQLiteNamespace(self, name, max_entries)
+
+    def snapshot(self) -> dict:
+        return {"backend": self.name, "shared": self.shared, "path": self.path}
+
+
+BACKENDS = {"memory": MemoryState, "sqlite": SQLiteState}
+
+
+def register_backend(name: str, factory):
+    """Make `factory` (a class like SQLiteState) selectable with STATE_BACKEND=<name>"""
+    BACKENDS[name] = factory
+
+
+def create_state(kind: str = None):
+    """Backend named by STATE_BACKEND: a registered name or "package.module:Class".
+
+    A backend has `name`, `shared` (visible to other processes and kept
+    across restarts), `snapshot()` and `namespace(name, max_entries)`, whose
+    namespaces have get/set/add/merge/delete with an optional ttl per entry and len().
+    """
+    kind = kind or Config.STATE_BACKEND
+    if kind in BACKENDS:
+        return BACKENDS[kind]()
+    if ":" in kind:
+        module, _, attribute = kind.partition(":")
+        return getattr(importlib.import_module(module), attribute)()
+    raise ValueError(f"Unknown STATE_BACKEND {kind!r}, expected one of {', '.join(BACKENDS)} or module:Class")
+
+
+shared_state = create_state()
+_durable_state = None
+
+
+def durable_state():
+    """For records that must survive restarts: the configured backend if it is shared, else SQLite at STATE_DB_PATH"""
+    global _durable_state
+    if shared_state.shared:
+        return shared_state
+    if _durable_state is None:
+        _durable_state = SQLiteState()
+    return _durable_state
@@ -1,31 +1,20 @@
 # app/simple_generator.py
-class SimpleCodeGenerator:
-    """Simple code generator for testing GitHub integration"""
-    
-    def generate_from_brief(self, brief: str) -> dict:
-        """Generate basic code files from brief"""
-        
-        # Simple template based on brief content
-        if "calculator" in brief.lower():
-            return self._generate_calculator()
-        elif "counter" in brief.lower():
-            return self._generate_counter()
-        else:
-            return self._generate_basic_app(brief)
-    
-    def _generate_basic_app(self, brief: str) -> dict:
-        return {
-            "index.html": f"""<!DOCTYPE html>
+import re
+from app.templates import Template, TemplateRegistry, inject
+
+# Round 1 apps, compiled once at import; the basic app's brief and title are escaped into the page
+BASIC_APP = {
+    "index.html": """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Generated App</title>
+    <title>{{ title }}</title>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
     <style>
-        body {{ font-family: Arial, sans-serif; margin: 0; padding: 20px; background: #f5f5f5; }}
-        .container {{ max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-        .feature {{ margin: 20px 0; padding: 15px; background: #f8f9fa; border-radius: 5px; }}
+        body { font-family: Arial, sans-serif; margin: 0; padding: 20px; background: #f5f5f5; }
+        .container { max-width: 800px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        .feature { margin: 20px 0; padding: 15px; background: #f8f9fa; border-radius: 5px; }
     </style>
 </head>
 <body>
@@ -33,7 +22,7 @@ class SimpleCodeGenerator:
         <h1 class="text-center mb-4">🚀 Generated Application</h1>
         <div class="feature">
             <h3>About This App</h3>
-            <p>{brief}</p>
+            <p>{{ brief }}</p>
         </div>
         <div class="feature">
             <h3>Features</h3>
@@ -53,7 +42,7 @@ class SimpleCodeGenerator:
     <script src="script.js"></script>
 </body>
 </html>""",
-            "script.js": """function showMessage() {
+    "script.js": """function showMessage() {
     const messages = [
         "Hello! This app is working!",
         "GitHub integration successful!",
@@ -65,7 +54,7 @@ class SimpleCodeGenerator:
 }
 
 console.log("Application loaded successfully!");""",
-            "style.css": """.feature {
+    "style.css": """.feature {
     border-left: 4px solid #007bff;
 }
 
@@ -78,12 +67,11 @@ console.log("Application loaded successfully!");""",
 
 .container {
     margin-top: 20px;
-}"""
-        }
-    
-    def _generate_calculator(self) -> dict:
-        return {
-            "index.html": """<!DOCTYPE html>
+}""",
+}
+
+CALCULATOR_APP = {
+    "index.html": """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -125,7 +113,7 @@ console.log("Application loaded successfully!");""",
     <script src="script.js"></script>
 </body>
 </html>""",
-            "script.js": """let currentDisplay = '0';
+    "script.js": """let currentDisplay = '0';
 let shouldResetDisplay = false;
 
 function updateDisplay() {
@@ -157,12 +145,11 @@ function calculate() {
     updateDisplay();
 }
 
-updateDisplay();"""
-        }
-    
-    def _generate_counter(self) -> dict:
-        return {
-            "index.html": """<!DOCTYPE html>
+updateDisplay();""",
+}
+
+COUNTER_APP = {
+    "index.html": """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -192,7 +179,7 @@ updateDisplay();"""
     <script src="script.js"></script>
 </body>
 </html>""",
-            "script.js": """let count = 0;
+    "script.js": """let count = 0;
 
 function updateDisplay() {
     document.getElementById('count').textContent = count;
@@ -219,46 +206,24 @@ function incrementBy(value) {
     updateDisplay();
 }
 
-updateDisplay();"""
-        }
-    
-    def update_existing_app(self, existing_code: dict, update_brief: str) -> dict:
-        """Update existing app code based on round 2 brief"""
-        
-        # Detect what kind of update is requested
-        brief_lower = update_brief.lower()
-        
-        # Check for common update patterns
-        if any(keyword in brief_lower for keyword in ['dark mode', 'dark', 'theme']):
-            return self._add_dark_mode(existing_code)
-        elif any(keyword in brief_lower for keyword in ['search', 'filter']):
-            return self._add_search_functionality(existing_code)
-        elif any(keyword in brief_lower for keyword in ['favorite', 'bookmark', 'save']):
-            return self._add_favorites(existing_code)
-        elif any(keyword in brief_lower for keyword in ['chart', 'graph', 'visualization']):
-            return self._add_charts(existing_code)
-        else:
-            # Generic update - enhance existing features
-            return self._enhance_existing(existing_code, update_brief)
+updateDisplay();""",
+}
 
-    def _add_dark_mode(self, existing_code: dict) -> dict:
-        """Add dark mode toggle to existing app"""
-        html = existing_code.get("index.html", "")
-        css = existing_code.get("style.css", "")
-        js = existing_code.get("script.js", "")
-        
-        # Add dark mode toggle button to HTML
-        if '<body>' in html:
-            dark_toggle = '''
+app_templates = TemplateRegistry()
+app_templates.register("basic", BASIC_APP, {"title": "text", "brief": "text"})
+app_templates.register("calculator", CALCULATOR_APP)
+app_templates.register("counter", COUNTER_APP)
+
+# Round 2 snippets: HTML for named anchors (see app.templates.inject), CSS and JS appended to the files
+
+DARK_MODE = {
+    "html": {"body_start": '''
     <!-- Dark Mode Toggle -->
     <div class="dark-mode-toggle">
         <button id="darkModeToggle" class="btn btn-outline-secondary">🌙 Dark Mode</button>
     </div>
-    '''
-            html = html.replace('<body>', '<body>\n' + dark_toggle)
-        
-        # Add dark mode CSS
-        dark_css = '''
+    '''},
+    "css": '''
     /* Dark Mode Styles */
     body.dark-mode {
         background-color: #1a1a1a;
@@ -282,11 +247,8 @@ updateDisplay();"""
         right: 20px;
         z-index: 1000;
     }
-    '''
-        css += dark_css
-        
-        # Add dark mode JavaScript
-        dark_js = '''
+    ''',
+    "js": '''
     // Dark Mode Functionality
     function toggleDarkMode() {
         document.body.classList.toggle('dark-mode');
@@ -313,24 +275,11 @@ updateDisplay();"""
             if (darkModeToggle) darkModeToggle.textContent = '☀️ Light Mode';
         }
     });
-    '''
-        js += dark_js
-        
-        return {
-            "index.html": html,
-            "style.css": css,
-            "script.js": js
-        }
+    ''',
+}
 
-    def _add_search_functionality(self, existing_code: dict) -> dict:
-        """Add search functionality to existing app"""
-        html = existing_code.get("index.html", "")
-        css = existing_code.get("style.css", "")
-        js = existing_code.get("script.js", "")
-        
-        # Add search bar to HTML
-        if '<body>' in html:
-            search_bar = '''
+SEARCH = {
+    "html": {"body_start": '''
     <!-- Search Functionality -->
     <div class="search-container mb-4">
         <div class="input-group">
@@ -339,11 +288,8 @@ updateDisplay();"""
         </div>
         <div id="searchResults" class="mt-3"></div>
     </div>
-    '''
-            html = html.replace('<body>', '<body>\n' + search_bar)
-        
-        # Add search CSS
-        search_css = '''
+    '''},
+    "css": '''
     /* Search Styles */
     .search-container {
         max-width: 600px;
@@ -362,11 +308,8 @@ updateDisplay();"""
         background-color: yellow;
         font-weight: bold;
     }
-    '''
-        css += search_css
-        
-        # Add search JavaScript
-        search_js = '''
+    ''',
+    "js": '''
     // Search Functionality
     function performSearch() {
         const searchTerm = document.getElementById('searchInput').value.toLowerCase();
@@ -423,34 +366,18 @@ updateDisplay();"""
             });
         }
     });
-    '''
-        js += search_js
-        
-        return {
-            "index.html": html,
-            "style.css": css,
-            "script.js": js
-        }
+    ''',
+}
 
-    def _add_favorites(self, existing_code: dict) -> dict:
-        """Add favorites functionality to existing app"""
-        html = existing_code.get("index.html", "")
-        css = existing_code.get("style.css", "")
-        js = existing_code.get("script.js", "")
-        
-        # Add favorites section to HTML
-        if '<body>' in html:
-            favorites_section = '''
+FAVORITES = {
+    "html": {"body_end": '''
     <!-- Favorites Section -->
     <div class="favorites-section mt-4">
         <h3>⭐ Favorites</h3>
         <div id="favoritesList" class="favorites-list"></div>
     </div>
-    '''
-            html = html.replace('</body>', favorites_section + '\n</body>')
-        
-        # Add favorites CSS
-        favorites_css = '''
+    '''},
+    "css": '''
     /* Favorites Styles */
     .favorites-section {
         background: #fff3cd;
@@ -483,11 +410,8 @@ updateDisplay();"""
         border-radius: 3px;
         cursor: pointer;
     }
-    '''
-        css += favorites_css
-        
-        # Add favorites JavaScript
-        favorites_js = '''
+    ''',
+    "js": '''
     // Favorites Functionality
     class FavoritesManager {
         constructor() {
@@ -552,34 +476,88 @@ updateDisplay();"""
             mainContent.insertBefore(favoriteBtn, mainContent.firstChild);
         }
     });
-    '''
-        js += favorites_js
-        
-        return {
-            "index.html": html,
-            "style.css": css,
-            "script.js": js
+    ''',
+}
+
+CHARTS = {
+    "html": {"body_end": '''
+    <!-- Chart Section -->
+    <div class="chart-section mt-4">
+        <h3>📊 Chart</h3>
+        <div class="chart-wrapper">
+            <canvas id="chartCanvas"></canvas>
+        </div>
+    </div>
+    '''},
+    "css": '''
+    /* Chart Styles */
+    .chart-section {
+        background: white;
+        padding: 20px;
+        border-radius: 8px;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    }
+
+    .chart-wrapper {
+        position: relative;
+        height: 320px;
+    }
+    ''',
+    "js": '''
+    // Chart Functionality
+    function collectChartData() {
+        // Use the first table with a numeric column, otherwise sample data
+        const table = document.querySelector('table');
+        if (table) {
+            const rows = Array.from(table.querySelectorAll('tbody tr, tr')).filter(row => row.querySelectorAll('td').length > 1);
+            const labels = [];
+            const values = [];
+            rows.forEach(row => {
+                const cells = row.querySelectorAll('td');
+                const value = parseFloat(cells[1].textContent.replace(/[^0-9.-]/g, ''));
+                if (!isNaN(value)) {
+                    labels.push(cells[0].textContent.trim());
+                    values.push(value);
+                }
+            });
+            if (values.length) {
+                return { labels, values };
+            }
         }
+        return { labels: ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'], values: [12, 19, 3, 5, 2, 3] };
+    }
 
-    def _enhance_existing(self, existing_code: dict, update_brief: str) -> dict:
-        """Generic enhancement of existing app"""
-        html = existing_code.get("index.html", "")
-        css = existing_code.get("style.css", "")
-        js = existing_code.get("script.js", "")
-        
-        # Add enhancement notice
-        enhancement_html = f'''
+    function renderChart() {
+        const canvas = document.getElementById('chartCanvas');
+        if (!canvas || typeof Chart === 'undefined') {
+            return;
+        }
+        const data = collectChartData();
+        new Chart(canvas, {
+            type: 'bar',
+            data: {
+                labels: data.labels,
+                datasets: [{ label: 'Values', data: data.values, backgroundColor: 'rgba(13, 110, 253, 0.6)' }]
+            },
+            options: { responsive: true, maintainAspectRatio: false }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', renderChart);
+    ''',
+}
+
+CHART_CDN = '    <script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>\n'
+
+ENHANCEMENT_NOTICE = Template('''
     <!-- Enhancement Update -->
     <div class="enhancement-notice alert alert-info">
         <h4>🚀 App Enhanced!</h4>
-        <p><strong>Update:</strong> {update_brief}</p>
+        <p><strong>Update:</strong> {{ update }}</p>
     </div>
-    '''
-        if '<body>' in html:
-            html = html.replace('<body>', '<body>\n' + enhancement_html)
-        
-        # Enhanced CSS
-        enhanced_css = '''
+    ''', {"update": "text"})
+
+ENHANCED_CSS = '''
     /* Enhanced Styles */
     .enhancement-notice {
         border-left: 4px solid #17a2b8;
@@ -595,10 +573,113 @@ updateDisplay();"""
         100% { transform: scale(1); }
     }
     '''
-        css += enhanced_css
+
+STYLE_LINK = '    <link rel="stylesheet" href="style.css">\n'
+SCRIPT_LINK = '    <script src="script.js"></script>\n'
+
+
+class SimpleCodeGenerator:
+    """Simple code generator for testing GitHub integration"""
+    
+    # Round 2 keyword transformers: (method, brief phrases matched as whole words, element id that marks it as applied)
+    UPDATE_TRANSFORMERS = (
+        ("_add_dark_mode", (r"dark(?:[ -]?mode)?", r"(?:color |colour )?themes?", r"night mode"), "darkModeToggle"),
+        ("_add_search_functionality", (r"search(?:es|ing|able)?", r"filter(?:s|ed|ing)?"), "searchInput"),
+        ("_add_favorites", (r"favou?rites?", r"bookmark(?:s|ed|ing)?", r"save (?:it|them|items?) for later"), "favoritesList"),
+        ("_add_charts", (r"charts?", r"graphs?", r"visuali[sz]ations?"), "chartCanvas"),
+    )
+    # A phrase right after one of these ("no search", "without a chart") is not asked for
+    NEGATIONS = r"(?:no|not|without|never|don't|do not|nothing)"
+    
+    def generate_from_brief(self, brief: str) -> dict:
+        """Generate basic code files from brief"""
         
+        # Simple template based on brief content
+        if "calculator" in brief.lower():
+            return self._generate_calculator()
+        elif "counter" in brief.lower():
+            return self._generate_counter()
+        else:
+            return self._generate_basic_app(brief)
+    
+    def _generate_basic_app(self, brief: str, title: str = "Generated App") -> dict:
+        return app_templates.render("basic", brief=brief, title=title)
+    
+    def _generate_calculator(self) -> dict:
+        return app_templates.render("calculator")
+    
+    def _generate_counter(self) -> dict:
+        return app_templates.render("counter")
+    
+    def match_update(self, update_brief: str):
+        """The keyword transformer for a round 2 brief as (method name, marker id), or None"""
+        brief_lower = update_brief.lower()
+        for method, phrases, marker in self.UPDATE_TRANSFORMERS:
+            for phrase in phrases:
+                for found in re.finditer(rf"\b{phrase}\b", brief_lower):
+                    if not re.search(rf"\b{self.NEGATIONS}(?: an?| the| any)?\s+$", brief_lower[:found.start()]):
+                        return method, marker
+        return None
+
+    def update_existing_app(self, existing_code: dict, update_brief: str) -> dict:
+        """Update existing app code based on round 2 brief"""
+        
+        # Detect what kind of update is requested
+        match = self.match_update(update_brief)
+        if match is None:
+            # Generic update - enhance existing features
+            updated = self._enhance_existing(existing_code, update_brief)
+        elif f'id="{match[1]}"' in existing_code.get("index.html", ""):
+            # Already applied in an earlier revision; leave the app unchanged
+            return dict(existing_code)
+        else:
+            updated = getattr(self, match[0])(existing_code)
+        
+        return {**existing_code, **updated}
+
+    def _apply(self, existing_code: dict, html: dict, css: str = "", js: str = "") -> dict:
+        """Inject HTML snippets at their anchors and append CSS/JS, in one pass over index.html.
+
+        The same pass links style.css and script.js, where the CSS and JS go,
+        if index.html doesn't load them yet.
+        """
+        page = existing_code.get("index.html", "")
+        anchors = {
+            "body_start": "\n" + html["body_start"] if "body_start" in html else "",
+            "head_end": html.get("head_end", ""),
+            "body_end": html["body_end"] + "\n" if "body_end" in html else "",
+        }
+        if 'href="style.css"' not in page:
+            anchors["head_end"] += STYLE_LINK
+        if 'src="script.js"' not in page:
+            anchors["body_end"] += SCRIPT_LINK
         return {
-            "index.html": html,
-            "style.css": css,
-            "script.js": js
-        }
\ No newline at end of file
+            "index.html": inject(page, anchors),
+            "style.css": existing_code.get("style.css", "") + css,
+            "script.js": existing_code.get("script.js", "") + js
+        }
+
+    def _add_dark_mode(self, existing_code: dict) -> dict:
+        """Add dark mode toggle to existing app"""
+        return self._apply(existing_code, **DARK_MODE)
+
+    def _add_search_functionality(self, existing_code: dict) -> dict:
+        """Add search functionality to existing app"""
+        return self._apply(existing_code, **SEARCH)
+
+    def _add_favorites(self, existing_code: dict) -> dict:
+        """Add favorites functionality to existing app"""
+        return self._apply(existing_code, **FAVORITES)
+
+    def _add_charts(self, existing_code: dict) -> dict:
+        """Add a Chart.js chart, fed from the page's first table when it has numbers"""
+        html = dict(CHARTS["html"])
+        # Load Chart.js from the CDN
+        if 'chart.js' not in existing_code.get("index.html", "").lower():
+            html["head_end"] = CHART_CDN
+        return self._apply(existing_code, html, CHARTS["css"], CHARTS["js"])
+
+    def _enhance_existing(self, existing_code: dict, update_brief: str) -> dict:
+        """Generic enhancement of existing app"""
+        notice = ENHANCEMENT_NOTICE.render({"update": update_brief})
+        return self._apply(existing_code, {"body_start": notice}, ENHANCED_CSS)
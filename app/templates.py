@@ -0,0 +1,95 @@
+# app/templates.py - compiled app templates and single-pass snippet injection
+import html
+import json
+import re
+
+SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Slot types: how a value is escaped for where the template puts it
+ESCAPERS = {
+    "text": lambda value: html.escape(str(value), quote=False),
+    "attr": lambda value: html.escape(str(value), quote=True),
+    # A JSON string literal that can't close the surrounding <script> element
+    "js": lambda value: json.dumps(str(value)).replace("<", "\\u003c"),
+    "raw": str,
+}
+
+# Named anchors snippets can be injected at: (tag to find, insert after the tag instead of before it)
+ANCHORS = {
+    "body_start": ("<body", True),
+    "head_end": ("</head>", False),
+    "body_end": ("</body>", False),
+}
+
+
+class Template:
+    """A source text with `{{ name }}` slots, split into literals and slots once.
+
+    Every slot must be declared with a type from ESCAPERS; rendering is a
+    single join of the literals and the escaped values.
+    """
+
+    def __init__(self, source: str, slots: dict = None):
+        slots = slots or {}
+        pieces = SLOT.split(source)
+        self.literals = pieces[0::2]
+        self.names = pieces[1::2]
+        undeclared = sorted(set(self.names) - set(slots))
+        if undeclared:
+            raise ValueError(f"Template uses undeclared slots: {', '.join(undeclared)}")
+        self.escapers = [ESCAPERS[slots[name]] for name in self.names]
+
+    def render(self, values: dict) -> str:
+        if not self.names:
+            return self.literals[0]
+        parts = [self.literals[0]]
+        for name, escape, literal in zip(self.names, self.escapers, self.literals[1:]):
+            parts.append(escape(values[name]))
+            parts.append(literal)
+        return "".join(parts)
+
+
+class TemplateRegistry:
+    """Named multi-file app templates, compiled when registered"""
+
+    def __init__(self):
+        self._apps = {}
+
+    def register(self, name: str, files: dict, slots: dict = None):
+        self._apps[name] = {path: Template(source, slots) for path, source in files.items()}
+
+    def render(self, name: str, **values) -> dict:
+        return {path: template.render(values) for path, template in self._apps[name].items()}
+
+
+def inject(document: str, snippets: dict) -> str:
+    """Insert snippets at named anchors, building the new document once.
+
+    `snippets` maps an anchor name to the text to insert: after the opening
+    <body> tag (which may carry attributes) for "body_start", before the
+    closing tag for "head_end" and "body_end". The first occurrence of each
+    anchor is used; anchors the document doesn't have are skipped.
+    """
+    inserts = []
+    for anchor, text in snippets.items():
+        if not text:
+            continue
+        tag, after = ANCHORS[anchor]
+        at = document.find(tag)
+        if at < 0:
+            continue
+        if after:
+            at = document.find(">", at) + 1
+            if at == 0:
+                continue
+        inserts.append((at, text))
+    if not inserts:
+        return document
+    inserts.sort(key=lambda insert: insert[0])
+    parts, last = [], 0
+    for at, text in inserts:
+        parts.append(document[last:at])
+        parts.append(text)
+        last = at
+    parts.append(document[last:])
+    return "".join(parts)
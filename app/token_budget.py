@@ -0,0 +1,187 @@
+# app/token_budget.py - prompt token budgeting and LLM usage accounting
+import functools
+import importlib.util
+import re
+import threading
+from app.utils import Config
+from app import metrics
+from app.job_status import current_job, job_status
+
+# Exact counts need the optional `tiktoken` package; otherwise a conservative estimate is used
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+
+# (context window, max completion tokens) per model family; longest prefix wins
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+    "gpt-4.1": (1047576, 32768),
+}
+# USD per million (prompt, completion) tokens
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4": (30.00, 60.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+MESSAGE_OVERHEAD = 4  # role and separators per chat message
+REPLY_OVERHEAD = 3    # every reply is primed with <|start|>assistant<|message|>
+SAFETY_MARGIN = 64    # slack for counting differences between encodings
+TOKEN_PIECES = re.compile(r"\s?[A-Za-z]+|\s?\d{1,3}|\s?[^\sA-Za-z\d]+|\s+")
+
+
+def _lookup(table: dict, model: str):
+    matches = [name for name in table if model.startswith(name)]
+    return table[max(matches, key=len)] if matches else None
+
+
+def model_limits(model: str) -> tuple:
+    """(context window, max completion tokens), with LLM_CONTEXT_WINDOW / LLM_MAX_OUTPUT_TOKENS overrides"""
+    context, output = _lookup(MODEL_LIMITS, model) or (8192, 4096)
+    return Config.LLM_CONTEXT_WINDOW or context, Config.LLM_MAX_OUTPUT_TOKENS or output
+
+
+def model_prices(model: str) -> tuple:
+    prompt, completion = _lookup(MODEL_PRICES, model) or (0.0, 0.0)
+    if Config.LLM_PRICE_PROMPT is not None:
+        prompt = Config.LLM_PRICE_PROMPT
+    if Config.LLM_PRICE_COMPLETION is not None:
+        completion = Config.LLM_PRICE_COMPLETION
+    return prompt, completion
+
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model: str):
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Tokens in `text`: exact with tiktoken, otherwise an estimate that errs on the high side"""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_encoding(model or Config.LLM_MODEL).encode(text, disallowed_special=()))
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PIECES.findall(text))
+
+
+def message_tokens(messages: list, model: str = None) -> int:
+    return sum(count_tokens(m["content"], model) + MESSAGE_OVERHEAD for m in messages) + REPLY_OVERHEAD
+
+
+def trim_to_tokens(text: str, limit: int, model: str = None) -> str:
+    """Shorten `text` to about `limit` tokens, keeping its head and tail around an elision marker"""
+    tokens = count_tokens(text, model)
+    if tokens <= limit:
+        return text
+    keep = max(int(len(text) * limit / tokens) - 40, 0)
+    while True:
+        head = text[:keep * 2 // 3]
+        tail = text[len(text) - keep // 3:] if keep // 3 else ""
+        trimmed = f"{head}\n[... {tokens - limit} tokens trimmed ...]\n{tail}"
+        if keep == 0 or count_tokens(trimmed, model) <= limit:
+            return trimmed
+        keep = keep * 9 // 10
+
+
+def fit_sections(sections: dict, available: int, model: str = None) -> dict:
+    """Trim sections so their tokens add up to at most `available`.
+
+    Small sections are kept whole: every section over a common cap is cut
+    down to it, with the cap chosen so the total fits (largest first).
+    """
+    sizes = {name: count_tokens(text, model) for name, text in sections.items()}
+    if sum(sizes.values()) <= available:
+        return dict(sections)
+
+    remaining, cap = max(available, 0), 0
+    pending = sorted(sizes.items(), key=lambda item: item[1])
+    for index, (name, size) in enumerate(pending):
+        share = remaining // (len(pending) - index)
+        if size > share:
+            cap = share
+            break
+        remaining -= size
+    trimmed = {name: trim_to_tokens(text, cap, model) if sizes[name] > cap else text for name, text in sections.items()}
+    print(f"✂️  Prompt over budget, trimmed {', '.join(n for n in sections if sizes[n] > cap)} to ~{cap} tokens")
+    return trimmed
+
+
+def prompt_budget(model: str, desired_output: int) -> int:
+    """Prompt tokens that still leave room for `desired_output` completion tokens"""
+    context, max_output = model_limits(model)
+    return context - min(desired_output, max_output) - SAFETY_MARGIN
+
+
+def completion_budget(messages: list, model: str, desired_output: int) -> tuple:
+    """(prompt tokens, max_tokens to request): the desired output, capped by the model and what the context leaves"""
+    context, max_output = model_limits(model)
+    prompt_tokens = message_tokens(messages, model)
+    return prompt_tokens, max(min(desired_output, max_output, context - prompt_tokens - SAFETY_MARGIN), 1)
+
+
+class TokenUsage:
+    """Process-wide token, cost and throughput totals for LLM calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.estimated_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.generation_seconds = 0.0
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, seconds: float, estimated: bool = False):
+        """Account one LLM call, globally and against the current job"""
+        prompt_price, completion_price = model_prices(model)
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        with self._lock:
+            self.calls += 1
+            self.estimated_calls += estimated
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost
+            self.generation_seconds += seconds
+        metrics.llm_tokens.inc((model, "prompt"), prompt_tokens)
+        metrics.llm_tokens.inc((model, "completion"), completion_tokens)
+        metrics.llm_cost.inc((model,), cost)
+
+        call = {"calls": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost_usd": cost}
+        trace = metrics.current_trace.get()
+        if trace is not None:
+            trace.details["llm_usage"] = _add_usage(trace.details.get("llm_usage"), call)
+        job = current_job.get()
+        if job is not None:
+            status = job_status.get(*job) or {}
+            job_status.update(*job, llm_usage=_add_usage(status.get("llm_usage"), call))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "estimated_calls": self.estimated_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "cost_per_call_usd": round(self.cost_usd / self.calls, 6) if self.calls else None,
+                "completion_tokens_per_second": round(self.completion_tokens / self.generation_seconds, 1) if self.generation_seconds else None,
+            }
+
+
+def _add_usage(total: dict, usage: dict) -> dict:
+    total = dict(total or {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+    for key, value in usage.items():
+        total[key] += value
+    total["cost_usd"] = round(total["cost_usd"], 6)
+    return total
+
+
+token_usage = TokenUsage()
@@ -1,13 +1,110 @@
 import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Config:
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+    # Extra comma-separated tokens for the same account; requests are spread across all of them
+    GITHUB_TOKENS = list(dict.fromkeys(
+        t.strip() for t in f"{os.getenv('GITHUB_TOKEN') or ''},{os.getenv('GITHUB_TOKENS', '')}".split(",") if t.strip()
+    ))
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     SECRET_SALT = os.getenv("SECRET_SALT", "default-secret-salt")
-    
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+    GITHUB_BLOB_CONCURRENCY = int(os.getenv("GITHUB_BLOB_CONCURRENCY", "8"))
+    GITHUB_INLINE_LIMIT = int(os.getenv("GITHUB_INLINE_LIMIT", "65536"))
+    ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(50 * 1024 * 1024)))
+    ATTACHMENT_MAX_TOTAL_BYTES = int(os.getenv("ATTACHMENT_MAX_TOTAL_BYTES", str(100 * 1024 * 1024)))
+    ATTACHMENT_PARSE_LIMIT = int(os.getenv("ATTACHMENT_PARSE_LIMIT", str(2 * 1024 * 1024)))
+    ATTACHMENT_SPOOL_DIR = os.getenv("ATTACHMENT_SPOOL_DIR") or None
+    GITHUB_BUILD_BUDGET = int(os.getenv("GITHUB_BUILD_BUDGET", "15"))
+    # Repo lookups are served from memory this long, then revalidated with a conditional GET
+    GITHUB_REPO_CACHE_TTL = float(os.getenv("GITHUB_REPO_CACHE_TTL", "60"))
+    GITHUB_RATELIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATELIMIT_MAX_WAIT", "3600"))
+    GITHUB_RATELIMIT_RETRIES = int(os.getenv("GITHUB_RATELIMIT_RETRIES", "2"))
+    EVALUATION_TIMEOUT = float(os.getenv("EVALUATION_TIMEOUT", "30"))
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "4"))
+    DATA_DIR = os.getenv("DATA_DIR", "data")
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(DATA_DIR, "jobs.db"))
+    # Attachments are decoded here when a build is submitted; the queued job only stores their paths
+    JOB_ATTACHMENT_DIR = os.getenv("JOB_ATTACHMENT_DIR", os.path.join(DATA_DIR, "attachments"))
+    # Finished (done or failed) jobs are deleted from the queue database after this many seconds
+    JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+    JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "100"))
+    JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "30"))
+    # Worker processes (uvicorn --workers / gunicorn -w read the same variable). With more than one,
+    # state must be shared: STATE_BACKEND defaults to "sqlite" (a file in DATA_DIR) instead of "memory"
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+    STATE_BACKEND = os.getenv("STATE_BACKEND") or ("sqlite" if WEB_CONCURRENCY > 1 else "memory")
+    STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(DATA_DIR, "state.db"))
+    # How often job status streams and idle queue workers look for changes made by other workers
+    STATE_POLL_INTERVAL = float(os.getenv("STATE_POLL_INTERVAL", "0.5"))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", str(7 * 24 * 3600)))
+    # An idempotency claim not yet attached to a queued job (e.g. the process died in between) expires after this
+    IDEMPOTENCY_CLAIM_TTL = float(os.getenv("IDEMPOTENCY_CLAIM_TTL", "60"))
+    TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "1000"))
+    JOB_STATUS_RETENTION = int(os.getenv("JOB_STATUS_RETENTION", "1000"))
+    JOB_STATUS_TTL = float(os.getenv("JOB_STATUS_TTL", "3600"))
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+    GITHUB_CONCURRENCY = int(os.getenv("GITHUB_CONCURRENCY", "4"))
+    EVALUATION_CONCURRENCY = int(os.getenv("EVALUATION_CONCURRENCY", "8"))
+    OUTBOX_PER_HOST = int(os.getenv("OUTBOX_PER_HOST", "4"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "12"))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "1"))
+    OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+    OUTBOX_RETENTION = float(os.getenv("OUTBOX_RETENTION", str(7 * 24 * 3600)))
+    # GitHub/LLM initialization after a failure at startup: first retry delay and the cap it doubles up to
+    PROVIDER_RETRY_BASE = float(os.getenv("PROVIDER_RETRY_BASE", "5"))
+    PROVIDER_RETRY_MAX = float(os.getenv("PROVIDER_RETRY_MAX", "300"))
+    # Circuit breakers (LLM, GitHub, each evaluation host): consecutive failures to open, seconds before probing
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+    BREAKER_MAX_RESET_TIMEOUT = float(os.getenv("BREAKER_MAX_RESET_TIMEOUT", "300"))
+    BREAKER_PROBE_WAIT = float(os.getenv("BREAKER_PROBE_WAIT", "1"))
+    # Build pipeline: retries of a failed GitHub stage (on 5xx/network errors) before the job is parked, first retry delay
+    STAGE_RETRIES = int(os.getenv("STAGE_RETRIES", "2"))
+    STAGE_RETRY_DELAY = float(os.getenv("STAGE_RETRY_DELAY", "1"))
+    # Pages deployments: build polling backoff (seconds), how long to wait for the site, and whether
+    # the evaluation callback is held until the site responds or that deadline passes
+    PAGES_POLL_INTERVAL = float(os.getenv("PAGES_POLL_INTERVAL", "2"))
+    PAGES_POLL_MAX = float(os.getenv("PAGES_POLL_MAX", "30"))
+    PAGES_READY_TIMEOUT = float(os.getenv("PAGES_READY_TIMEOUT", "300"))
+    PAGES_CHECK_TIMEOUT = float(os.getenv("PAGES_CHECK_TIMEOUT", "10"))
+    PAGES_WAIT_FOR_SITE = os.getenv("PAGES_WAIT_FOR_SITE", "true").lower() == "true"
+    LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+    # JSON list of backends for the model router; unset means one OpenAI backend with LLM_MODEL
+    LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+    LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
+    LLM_ROUTER_EWMA_ALPHA = float(os.getenv("LLM_ROUTER_EWMA_ALPHA", "0.2"))
+    LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.2"))
+    LLM_STREAMING = os.getenv("LLM_STREAMING", "true").lower() == "true"
+    LLM_STREAM_RETRIES = int(os.getenv("LLM_STREAM_RETRIES", "1"))
+    LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4000"))
+    LLM_REVISION_MAX_TOKENS = int(os.getenv("LLM_REVISION_MAX_TOKENS", "1500"))
+    # Override the built-in model table (0 = use it) and prices (USD per million tokens)
+    LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "0"))
+    LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "0"))
+    LLM_PRICE_PROMPT = float(os.environ["LLM_PRICE_PROMPT"]) if os.getenv("LLM_PRICE_PROMPT") else None
+    LLM_PRICE_COMPLETION = float(os.environ["LLM_PRICE_COMPLETION"]) if os.getenv("LLM_PRICE_COMPLETION") else None
+    LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(DATA_DIR, "llm_cache"))
+    LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+    LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
     @classmethod
     def validate(cls):
         """Check if all required environment variables are set"""
@@ -16,9 +113,17 @@ class Config:
             missing.append("GITHUB_TOKEN")
         if not cls.OPENAI_API_KEY:
             missing.append("OPENAI_API_KEY")
-        
+
         if missing:
             print(f"⚠️  Warning: Missing environment variables: {', '.join(missing)}")
             print("   The app will run but certain features may not work.")
         else:
-            print("✅ All environment variables are set!")
\ No newline at end of file
+            print("✅ All environment variables are set!")
+
+# Bounded pool for the few stages that are still synchronous
+_blocking_executor = ThreadPoolExecutor(max_workers=Config.BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a synchronous callable in the bounded executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
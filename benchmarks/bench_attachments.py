@@ -0,0 +1,177 @@
+# benchmarks/bench_attachments.py
+"""Peak memory of ingesting and publishing a large data-URI attachment.
+
+Decodes a `--size-mb` base64 CSV attachment and uploads it as a Git blob
+to a sink transport that hashes the request body as it arrives:
+
+- in memory: decode the whole payload, then base64 it again into a JSON body
+- streaming: decode chunk by chunk into a spool file, then stream the blob body
+
+Peak memory is measured with tracemalloc, on top of the data URI itself
+(which arrives as part of the request JSON either way). Then submits the
+same attachment through /api/build (stub LLM, fake GitHub API) and checks
+that the queued job row holds the spool file's path rather than the data,
+that the file is published intact, and that its spool file is deleted once
+the build is done; an attachment or spool entry naming a server file gets
+that file neither published nor deleted. Exits non-zero if streaming peaks above 10% of the
+attachment size or a check fails.
+
+    python -m benchmarks.bench_attachments --size-mb 50
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import httpx
+from app import main
+from app.attachments import close_attachments, ingest_attachments
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM, git_blob_sha
+
+
+class SinkTransport(httpx.AsyncBaseTransport):
+    """Accepts any blob upload, hashing the body chunk by chunk instead of keeping it"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        digest = hashlib.sha1()
+        async for chunk in request.stream:
+            digest.update(chunk)
+            self.received += len(chunk)
+        return httpx.Response(201, json={"sha": digest.hexdigest()})
+
+
+def make_data_uri(size: int) -> str:
+    row = b"2024-01-01,sensor-42,23.5,ok\n"
+    data = b"date,sensor,value,status\n" + row * (size // len(row))
+    return "data:text/csv;base64," + base64.b64encode(data).decode()
+
+
+async def in_memory(client: AsyncGitHubClient, url: str):
+    data = base64.b64decode(url.split(",", 1)[1])
+    await client.post("/repos/o/r/git/blobs", json={"content": base64.b64encode(data).decode(), "encoding": "base64"})
+
+
+async def streaming(client: AsyncGitHubClient, url: str):
+    attachments = ingest_attachments([{"name": "readings.csv", "url": url}])
+    try:
+        print(attachments[0].summary())
+        await client.post_stream("/repos/o/r/git/blobs", attachments[0].blob_body)
+    finally:
+        close_attachments(attachments)
+
+
+async def measure(name: str, publish, url: str, size: int) -> int:
+    sink = SinkTransport()
+    client = AsyncGitHubClient("stub-token", "http://github.local", sink)
+    tracemalloc.start()
+    start = time.perf_counter()
+    await publish(client, url)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    await client.aclose()
+    print(f"   {name:<10} peak={peak / 2**20:7.1f} MB ({peak / size:5.2f}x the file)  uploaded={sink.received / 2**20:5.1f} MB  {elapsed:5.2f}s")
+    return peak
+
+
+async def through_api(url: str) -> list:
+    """Build with the attachment through /api/build; returns the problems found"""
+    fake_github = FakeGitHub()
+    main.llm_gen = StubLLM(delay=0.1)
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    directory = tempfile.mkdtemp()
+    db_path = os.path.join(directory, "jobs.db")
+    Config.JOB_ATTACHMENT_DIR = os.path.join(directory, "attachments")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    problems = []
+    evaluation = StubEvaluation()
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        request = build_request("attachment-api", f"{eval_server.url}/notify")
+        request["attachments"] = [{"name": "readings.csv", "url": url}]
+        async with httpx.AsyncClient(base_url=api.url, timeout=300) as client:
+            start = time.perf_counter()
+            response = await client.post("/api/build", json=request)
+            response.raise_for_status()
+            accepted = time.perf_counter() - start
+        job_id = response.json()["job_id"]
+        with sqlite3.connect(db_path) as db:
+            payload_bytes = db.execute("SELECT length(payload) FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        spooled = os.listdir(Config.JOB_ATTACHMENT_DIR)
+        while (job_status.get("attachment-api", 1) or {}).get("state") not in ("completed", "failed"):
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+
+        # A client naming a server file as an attachment (or as a spool entry) gets neither it read nor deleted
+        server_file = os.path.join(directory, "server.env")
+        with open(server_file, "w") as f:
+            f.write("SECRET=do-not-publish\n")
+        planted = os.path.join(Config.JOB_ATTACHMENT_DIR, "attachment-planted")
+        with open(planted, "w") as f:
+            f.write("not this request's spool file\n")
+        request = build_request("attachment-path", f"{eval_server.url}/notify")
+        request["attachments"] = [{"name": "env.txt", "path": server_file, "size": 22, "type": "text/plain"}]
+        request["spooled_attachments"] = [{"name": "planted.txt", "path": planted, "size": 30, "type": "text/plain"}]
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            (await client.post("/api/build", json=request)).raise_for_status()
+        while (job_status.get("attachment-path", 1) or {}).get("state") not in ("completed", "failed"):
+            await asyncio.sleep(0.05)
+
+    repo = fake_github.repos.get("task-attachment-api", {})
+    published = fake_github._head_files(repo).get("readings.csv") if repo else None
+    print(f"   /api/build  accepted in {accepted:5.2f}s, built in {elapsed:5.2f}s;"
+          f" queued payload {payload_bytes} bytes, {len(spooled)} spool file(s)")
+    if payload_bytes > 64 * 1024:
+        problems.append(f"the queued job payload is {payload_bytes} bytes: the attachment data is in the row")
+    if len(spooled) != 1:
+        problems.append(f"{len(spooled)} spool files after submission, expected 1")
+    if published != git_blob_sha(base64.b64decode(url.split(",", 1)[1])):
+        problems.append("readings.csv was not published intact")
+    if os.listdir(Config.JOB_ATTACHMENT_DIR) != ["attachment-planted"]:
+        problems.append(f"spool directory after the builds: {os.listdir(Config.JOB_ATTACHMENT_DIR)}")
+    repo = fake_github.repos.get("task-attachment-path")
+    injected = fake_github._head_files(repo) if repo else {}
+    if {"env.txt", "planted.txt"} & set(injected):
+        problems.append(f"files named by the client's attachment paths were published: {sorted(injected)}")
+    if not os.path.exists(server_file):
+        problems.append("a file named by a client's attachment path was deleted")
+    return problems
+
+
+async def run(args) -> int:
+    size = int(args.size_mb * 2**20)
+    Config.ATTACHMENT_MAX_BYTES = Config.ATTACHMENT_MAX_TOTAL_BYTES = 2 * size
+    url = make_data_uri(size)
+    print(f"\n📊 Ingesting and publishing a {args.size_mb:.0f} MB attachment ({len(url) / 2**20:.0f} MB data URI)")
+    await measure("in memory", in_memory, url, size)
+    peak = await measure("streaming", streaming, url, size)
+    problems = await through_api(url)
+    if peak > size * 0.1:
+        problems.insert(0, "streaming ingestion held a large part of the attachment in memory")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=50)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,155 @@
+# benchmarks/bench_breakers.py
+"""Circuit breakers under injected dependency outages, end to end.
+
+Runs builds through the real app with every dependency stubbed locally and
+takes each one down in turn:
+
+- LLM: the mock backend fails every call; builds should fall back to the
+  simple generator without calling it once its breaker is open, and use it
+  again after it recovers
+- GitHub: the fake API answers 503 for `--outage` seconds; builds should be
+  parked in the queue (not failed) and all complete once it is back
+- evaluation: the callback server answers 503 for `--outage` seconds; the
+  outbox should stop hammering it and still deliver every callback
+
+Exits non-zero if a build failed or was lost, or if a dependency kept
+getting calls while its breaker should have been open.
+
+    python -m benchmarks.bench_breakers --builds 12 --outage 3
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+import httpx
+from app import circuit_breaker, main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.llm_generator import LLMCodeGenerator
+from app.llm_router import Backend, MockLLMBackend, ModelRouter
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, FlakyEvaluation
+
+
+async def submit(client: httpx.AsyncClient, prefix: str, count: int, eval_url: str) -> list:
+    tasks = [f"{prefix}-{i}" for i in range(count)]
+    await asyncio.gather(*[client.post("/api/build", json=build_request(task, eval_url)) for task in tasks])
+    return tasks
+
+
+async def drain(timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while (main.job_queue.pending_count() or main.outbox.pending_count()) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+
+def states(tasks: list) -> dict:
+    counts = {}
+    for task in tasks:
+        status = job_status.get(task, 1)
+        state = status["state"] if status else "missing"
+        counts[state] = counts.get(state, 0) + 1
+    return counts
+
+
+async def run(args) -> int:
+    Config.BREAKER_FAILURE_THRESHOLD = args.threshold
+    Config.BREAKER_RESET_TIMEOUT = args.reset_timeout
+    Config.BREAKER_MAX_RESET_TIMEOUT = args.reset_timeout * 4
+    Config.OUTBOX_BACKOFF_BASE = 0.2
+    Config.OUTBOX_BACKOFF_MAX = 1.0
+    Config.LLM_STREAMING = True
+    problems = []
+
+    fake_github = FakeGitHub()
+    evaluation = FlakyEvaluation(fail_rate=0.0, latency=0.01)
+    llm = MockLLMBackend(latency=0.05, jitter=0.01, error_rate=1.0, seed=3)
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.llm_gen = LLMCodeGenerator(router=ModelRouter([Backend("mock", "gpt-4o-mini", llm, timeout=5)], hedge_delay=0))
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            print(f"\n📊 {args.builds} builds per phase, breakers open after {args.threshold} failures,"
+                  f" probe after {args.reset_timeout:.1f}s")
+
+            # LLM down: only the calls before the breaker opens (and its probes) reach the backend
+            tasks = await submit(client, "llm-down", args.builds, eval_url)
+            await drain()
+            outage_calls = llm.calls
+            llm.error_rate = 0.0
+            await asyncio.sleep(circuit_breaker.breakers["llm"].retry_after() + 0.1)
+            # The first build is the half-open probe; once it succeeds the rest go to the LLM again
+            recovered = await submit(client, "llm-probe", 1, eval_url)
+            await drain()
+            recovered += await submit(client, "llm-up", args.builds - 1, eval_url)
+            await drain()
+            breaker = circuit_breaker.breakers["llm"].snapshot()
+            print(f"   LLM down:        {states(tasks)}  backend calls={outage_calls} (unguarded: {args.builds * 2})")
+            print(f"   LLM recovered:   {states(recovered)}  backend calls={llm.calls - outage_calls}  breaker={breaker['state']}")
+            if states(tasks).get("completed") != args.builds or outage_calls >= args.builds * 2:
+                problems.append("builds failed or kept calling the LLM while it was down")
+            if breaker["state"] != "closed" or llm.calls - outage_calls < args.builds:
+                problems.append("the LLM breaker did not close again after recovery")
+
+            # GitHub down: builds park in the queue and finish once it is back
+            fake_github.down = True
+            before = fake_github.calls
+            tasks = await submit(client, "github-down", args.builds, eval_url)
+            await asyncio.sleep(args.outage)
+            outage_calls = fake_github.calls - before
+            during = states(tasks)
+            fake_github.down = False
+            await drain()
+            print(f"   GitHub down:     {during} after {args.outage:.0f}s, API calls={outage_calls}")
+            print(f"   GitHub back:     {states(tasks)}  breaker={circuit_breaker.breakers['github'].snapshot()['state']}")
+            if states(tasks).get("completed") != args.builds:
+                problems.append("builds were lost or failed during the GitHub outage")
+            if during.get("failed"):
+                problems.append("builds failed instead of parking while GitHub was down")
+
+            # Evaluation server down: the outbox backs off to breaker probes, then delivers everything
+            evaluation.fail_rate = 1.0
+            before = evaluation.attempts
+            tasks = await submit(client, "eval-down", args.builds, eval_url)
+            await asyncio.sleep(args.outage)
+            outage_attempts = evaluation.attempts - before
+            evaluation.fail_rate = 0.0
+            await drain()
+            delivered = {payload["task"] for payload in evaluation.received}
+            bound = args.threshold + Config.OUTBOX_PER_HOST + math.ceil(args.outage / args.reset_timeout) + 1
+            print(f"   evaluation down: {outage_attempts} callback attempts in {args.outage:.0f}s (bound {bound})")
+            print(f"   evaluation back: delivered={len(delivered & set(tasks))}/{args.builds}  outbox={main.outbox.stats()}")
+            if len(delivered & set(tasks)) != args.builds:
+                problems.append("evaluation callbacks were lost")
+            if outage_attempts > bound:
+                problems.append("the evaluation server kept getting callbacks while its breaker was open")
+
+            health = (await client.get("/health")).json()
+            shown = ", ".join(f"{name}={breaker['state']}" for name, breaker in health["circuit_breakers"].items())
+            print(f"   /health circuit_breakers: {shown}")
+
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=12)
+    parser.add_argument("--outage", type=float, default=3.0)
+    parser.add_argument("--threshold", type=int, default=3)
+    parser.add_argument("--reset-timeout", type=float, default=1.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,79 @@
+# benchmarks/bench_build_latency.py
+"""p99 latency of /api/build and /health while N builds are in flight.
+
+Runs the real FastAPI app against a stub LLM, a fake GitHub API and a stub
+evaluation server. Pass --blocking to simulate the old synchronous LLM client.
+
+    python -m benchmarks.bench_build_latency --inflight 50 --llm-delay 1.0
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import httpx
+from app import main
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.evaluation_outbox import EvaluationOutbox
+from app.job_queue import JobQueue
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM, percentile
+
+
+def build_request(task: str, evaluation_url: str) -> dict:
+    return {
+        "email": "student@example.com",
+        "secret": "test123",
+        "task": task,
+        "round": 1,
+        "nonce": f"nonce-{task}",
+        "brief": "Create a counter app",
+        "evaluation_url": evaluation_url,
+    }
+
+
+async def timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float:
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run(args):
+    fake_github = FakeGitHub()
+    evaluation = StubEvaluation()
+    main.llm_gen = StubLLM(delay=args.llm_delay, blocking=args.blocking)
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path, max_pending=10_000)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=120) as client:
+            # Put N builds in flight
+            await asyncio.gather(*[
+                client.post("/api/build", json=build_request(f"load-{i}", eval_url))
+                for i in range(args.inflight)
+            ])
+
+            build_latencies, health_latencies = [], []
+            for i in range(args.samples):
+                build_latencies.append(await timed(client, "POST", "/api/build", json=build_request(f"probe-{i}", eval_url)))
+                health_latencies.append(await timed(client, "GET", "/health"))
+
+        mode = "blocking LLM" if args.blocking else "async LLM"
+        print(f"\n📊 {mode}, {args.inflight} builds in flight, LLM delay {args.llm_delay}s")
+        for name, values in (("/api/build", build_latencies), ("/health", health_latencies)):
+            print(f"   {name:<11} p50={percentile(values, 50) * 1000:8.1f}ms  p99={percentile(values, 99) * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inflight", type=int, default=50)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--llm-delay", type=float, default=1.0)
+    parser.add_argument("--blocking", action="store_true")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,71 @@
+# benchmarks/bench_callbacks.py
+"""Evaluation callback throughput: a new client per callback vs. the shared pooled client.
+
+Posts `--callbacks` payloads to a local stub evaluation server with
+`--concurrency` in flight. "per-call" opens a fresh AsyncClient for each
+callback (a new connection every time, as before); "pooled" goes through
+`send_evaluation` and the shared keep-alive client.
+
+    python -m benchmarks.bench_callbacks --callbacks 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from app.evaluation_outbox import send_evaluation
+from app.http_clients import http_clients
+from app.utils import Config
+from benchmarks.stubs import BackgroundServer, StubEvaluation, percentile
+
+PAYLOAD = {
+    "email": "student@example.com", "task": "bench", "round": 1, "nonce": "n",
+    "repo_url": "https://github.com/user/repo", "commit_sha": "0" * 40, "pages_url": "https://user.github.io/repo/",
+}
+
+
+async def per_call(url: str) -> bool:
+    async with httpx.AsyncClient(timeout=Config.EVALUATION_TIMEOUT) as client:
+        response = await client.post(url, json=PAYLOAD)
+        return response.status_code == 200
+
+
+async def pooled(url: str) -> bool:
+    delivered, *_ = await send_evaluation(url, PAYLOAD)
+    return delivered
+
+
+async def measure(send, url: str, callbacks: int, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with limit:
+            start = time.perf_counter()
+            ok = await send(url)
+            latencies.append(time.perf_counter() - start)
+            return ok
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[one() for _ in range(callbacks)])
+    elapsed = time.perf_counter() - start
+    return sum(results), elapsed, latencies
+
+
+async def run(args):
+    evaluation = StubEvaluation()
+    with BackgroundServer(evaluation.app) as server:
+        url = f"{server.url}/notify"
+        await http_clients.start()
+        print(f"\n📊 {args.callbacks} callbacks, {args.concurrency} concurrent")
+        for name, send in (("per-call", per_call), ("pooled", pooled)):
+            delivered, elapsed, latencies = await measure(send, url, args.callbacks, args.concurrency)
+            print(f"   {name:<9} {delivered / elapsed:8.0f} callbacks/s  delivered={delivered}"
+                  f"  p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
+        await http_clients.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callbacks", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,82 @@
+# benchmarks/bench_head_lookup.py
+"""Latency regression check for resolving a repo's head SHA on a long history.
+
+Seeds the fake GitHub with thousands of commits and compares walking the
+full commit list (the old `list(repo.get_commits())`) with the publisher's
+tracked head / single ref lookup. Exits non-zero if the publisher needs
+more than one request, or if a stale tracked head is not recovered.
+
+    python -m benchmarks.bench_head_lookup --commits 5000
+"""
+import argparse
+import asyncio
+import sys
+import time
+import httpx
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from benchmarks.stubs import FakeGitHub
+
+
+def new_manager(fake: FakeGitHub) -> GitHubManager:
+    return GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake.app)))
+
+
+async def timed_calls(fake: FakeGitHub, coro):
+    before, start = fake.calls, time.perf_counter()
+    result = await coro
+    return result, fake.calls - before, time.perf_counter() - start
+
+
+async def paginate_commits(mgr: GitHubManager, repo_path: str) -> str:
+    commits, page = [], 1
+    while True:
+        batch = await mgr.client.get(f"{repo_path}/commits", params={"per_page": 30, "page": page})
+        if not batch:
+            return commits[0]["sha"]
+        commits.extend(batch)
+        page += 1
+
+
+async def run(args) -> int:
+    fake = FakeGitHub(latency=args.latency)
+    mgr = new_manager(fake)
+    login = await mgr.authenticate()
+    await mgr.client.post("/user/repos", json={"name": "long-history", "auto_init": True})
+    repo = fake.repos["long-history"]
+    for i in range(args.commits):
+        fake._commit_file(repo, "log.txt", str(i).encode(), f"commit {i}")
+    repo_path = f"/repos/{login}/long-history"
+
+    legacy_sha, legacy_calls, legacy_time = await timed_calls(fake, paginate_commits(mgr, repo_path))
+    lookup_sha, lookup_calls, lookup_time = await timed_calls(fake, mgr._resolve_head(repo_path, "main"))
+    published = await mgr._publish_files(repo_path, "main", {"index.html": "v1"}, "Publish")
+    tracked_sha, tracked_calls, tracked_time = await timed_calls(fake, mgr._resolve_head(repo_path, "main"))
+
+    # Someone else pushes; our tracked head goes stale and the next publish must recover
+    other = new_manager(fake)
+    await other._publish_files(repo_path, "main", {"index.html": "v2"}, "Concurrent push")
+    recovered = await mgr._publish_files(repo_path, "main", {"index.html": "v3"}, "After concurrent push")
+
+    print(f"\n📊 Head SHA on a {args.commits}-commit history ({args.latency * 1000:.0f}ms per request)")
+    print(f"   paginate commits: {legacy_calls:>4} calls {legacy_time * 1000:8.1f}ms")
+    print(f"   ref lookup:       {lookup_calls:>4} calls {lookup_time * 1000:8.1f}ms")
+    print(f"   tracked head:     {tracked_calls:>4} calls {tracked_time * 1000:8.1f}ms")
+
+    failures = []
+    if lookup_sha != legacy_sha:
+        failures.append("ref lookup disagrees with commit history")
+    if lookup_calls > 1 or tracked_calls > 0 or tracked_sha != published:
+        failures.append("head resolution made more requests than expected")
+    if fake.repos["long-history"]["refs"]["heads/main"] != recovered:
+        failures.append("stale tracked head was not recovered")
+    for failure in failures:
+        print(f"💥 {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commits", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,72 @@
+# benchmarks/bench_idempotency.py
+"""Duplicate-request check: 50 identical /api/build calls must produce one build.
+
+Fires N identical requests concurrently, waits for the build, then replays
+the request once more. Exits non-zero unless there was exactly one LLM
+call, one published commit and one evaluation callback.
+
+    python -m benchmarks.bench_idempotency --duplicates 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import httpx
+from app import main
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.evaluation_outbox import EvaluationOutbox
+from app.job_queue import JobQueue
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM, percentile
+
+
+async def run(args) -> int:
+    fake_github = FakeGitHub()
+    evaluation = StubEvaluation()
+    llm = StubLLM(delay=args.llm_delay)
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.llm_gen = llm
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        request = build_request("idempotent", f"{eval_server.url}/notify")
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            async def post():
+                start = time.perf_counter()
+                response = await client.post("/api/build", json=request)
+                return response.json(), time.perf_counter() - start
+
+            results = await asyncio.gather(*[post() for _ in range(args.duplicates)])
+            while main.job_queue.pending_count() or main.outbox.pending_count():
+                await asyncio.sleep(0.1)
+            replay, _ = await post()
+
+    bodies = [body for body, _ in results]
+    latencies = [latency for _, latency in results]
+    commits = len(fake_github._log(fake_github.repos["task-idempotent"])) - 1  # minus the auto_init commit
+    job_ids = {body["job_id"] for body in bodies if body.get("job_id")}
+
+    print(f"\n📊 {args.duplicates} identical requests")
+    print(f"   new builds={sum(1 for b in bodies if not b.get('duplicate'))}  attached duplicates={sum(1 for b in bodies if b.get('duplicate'))}  job ids={sorted(job_ids)}")
+    print(f"   LLM calls={llm.calls}  commits={commits}  evaluation callbacks={len(evaluation.received)}")
+    print(f"   replay after completion: status={replay['status']} commit={replay.get('commit_sha', '')[:8]}")
+    print(f"   response p50={percentile(latencies, 50) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
+
+    ok = llm.calls == 1 and commits == 1 and len(evaluation.received) == 1 and replay["status"] == "completed"
+    if not ok:
+        print("💥 duplicate requests started more than one build")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,142 @@
+# benchmarks/bench_job_events.py
+"""Server-sent job events for builds against a stub LLM and a fake GitHub API.
+
+Submits `--builds` builds and follows each one on
+/api/jobs/{task}/{round}/events from the moment it is accepted. Checks that
+every stream:
+
+- opens with a `snapshot` frame
+- reports every stage twice, as a `stage` frame when it starts (no record
+  yet) and when it finishes (its record appended to `stages`), in the
+  order the final status lists them
+- ends with exactly one `done` frame, state `completed`, after which the
+  server closes the stream
+- agrees with GET /api/jobs/{task}/{round}
+
+A subscriber that connects after the job finished gets the snapshot and
+nothing else, and an unknown job is a 404. Reports time to the first frame
+and to the done frame. Exits non-zero if a check fails.
+
+    python -m benchmarks.bench_job_events --builds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+import httpx
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM, percentile
+
+
+async def read_events(client: httpx.AsyncClient, path: str) -> list:
+    """(event, data, seconds since the request) for every frame until the server closes the stream"""
+    frames, start = [], time.perf_counter()
+    async with client.stream("GET", path) as response:
+        response.raise_for_status()
+        event, data = None, None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+            elif not line and event:
+                frames.append((event, data, time.perf_counter() - start))
+                event, data = None, None
+    return frames
+
+
+def check_stream(task: str, frames: list, status: dict) -> list:
+    problems = []
+    events = [event for event, _, _ in frames]
+    if not events or events[0] != "snapshot":
+        problems.append(f"{task}: the stream starts with {events[:1]}, not a snapshot")
+    if events.count("done") != 1 or events[-1] != "done":
+        problems.append(f"{task}: {events.count('done')} done frame(s), last frame {events[-1:]}")
+        return problems
+    final = frames[-1][1]
+    if final["state"] != "completed":
+        problems.append(f"{task}: done frame in state {final['state']} ({final.get('error')})")
+
+    # Stage frames: a start (stage set, no new record) then a finish (one more record), matching the final list
+    started, finished = [], []
+    previous = len(frames[0][1]["stages"])
+    for event, data, _ in frames[1:]:
+        if event != "stage":
+            continue
+        if len(data["stages"]) == previous:
+            started.append(data["stage"])
+        elif len(data["stages"]) == previous + 1:
+            finished.append(data["stages"][-1]["stage"])
+            previous += 1
+        else:
+            problems.append(f"{task}: a stage frame added {len(data['stages']) - previous} records")
+            previous = len(data["stages"])
+    already = [record["stage"] for record in frames[0][1]["stages"]]
+    if already + finished != [record["stage"] for record in final["stages"]]:
+        problems.append(f"{task}: finished stages {already + finished}, final status lists {[r['stage'] for r in final['stages']]}")
+    if Counter(started) - Counter(finished):
+        problems.append(f"{task}: stages started {started} but only {finished} finished")
+    if {key: final[key] for key in ("state", "stages", "commit_sha")} != {key: status[key] for key in ("state", "stages", "commit_sha")}:
+        problems.append(f"{task}: the done frame and GET /api/jobs disagree")
+    return problems
+
+
+async def run(args) -> int:
+    fake_github = FakeGitHub()
+    main.llm_gen = StubLLM(delay=args.llm_delay)
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    problems = []
+    evaluation = StubEvaluation()
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+
+            async def follow(task: str) -> list:
+                response = await client.post("/api/build", json=build_request(task, eval_url))
+                response.raise_for_status()
+                return await read_events(client, f"/api/jobs/{task}/1/events")
+
+            tasks = [f"events-{i}" for i in range(args.builds)]
+            streams = await asyncio.gather(*(follow(task) for task in tasks))
+            for task, frames in zip(tasks, streams):
+                status = (await client.get(f"/api/jobs/{task}/1")).json()
+                problems.extend(check_stream(task, frames, status))
+
+            late = await read_events(client, f"/api/jobs/{tasks[0]}/1/events")
+            if [event for event, _, _ in late] != ["snapshot"] or late[0][1]["state"] != "completed":
+                problems.append(f"a subscriber after completion got {[event for event, _, _ in late]}")
+            missing = await client.get("/api/jobs/no-such-task/1/events")
+            if missing.status_code != 404:
+                problems.append(f"events for an unknown job answered {missing.status_code}")
+
+    first = [frames[0][2] * 1000 for frames in streams if frames]
+    done = [frames[-1][2] for frames in streams if frames]
+    print(f"\n📊 Job events for {args.builds} builds (stub LLM {args.llm_delay:.1f}s)")
+    print(f"   frames per build: {', '.join(str(len(frames)) for frames in streams)}")
+    print(f"   first frame p50={percentile(first, 50):.1f}ms  done frame p50={percentile(done, 50):.2f}s")
+    print(f"   events: {' '.join(event for event, _, _ in streams[0])}")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=5)
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,83 @@
+# benchmarks/bench_llm_cache.py
+"""Latency of repeated briefs through LLMCodeGenerator with the response cache.
+
+Uses a stub OpenAI client with a fixed completion latency. Reports cold
+(miss), warm in-memory, warm on-disk (fresh process-like cache) and
+bypassed generations, then writes `--writes` entries into a size-capped
+cache and checks the directory stays under the cap without being scanned
+on every write. Exits non-zero if it is.
+
+    python -m benchmarks.bench_llm_cache --llm-delay 2.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from app.llm_cache import LLMResponseCache
+from app.llm_generator import LLMCodeGenerator
+from app.utils import Config
+from benchmarks.stubs import StubOpenAI
+
+
+def make_generator(cache: LLMResponseCache, delay: float) -> LLMCodeGenerator:
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub-key"
+    gen = LLMCodeGenerator(cache=cache)
+    gen.client = StubOpenAI(delay=delay)
+    return gen
+
+
+async def timed(gen: LLMCodeGenerator, **kwargs) -> float:
+    start = time.perf_counter()
+    await gen.generate_app("Create a counter app with +1 and reset", [], ["Page has a #count element"], **kwargs)
+    return (time.perf_counter() - start) * 1000
+
+
+async def run(args):
+    directory = tempfile.mkdtemp()
+    cache = LLMResponseCache(directory=directory)
+    gen = make_generator(cache, args.llm_delay)
+
+    cold = await timed(gen)
+    warm_memory = await timed(gen)
+    # A new cache over the same directory behaves like a restarted process
+    disk_gen = make_generator(LLMResponseCache(directory=directory), args.llm_delay)
+    warm_disk = await timed(disk_gen)
+    bypass = await timed(gen, use_cache=False)
+
+    print(f"\n📊 LLM response cache (stub completion latency {args.llm_delay}s)")
+    print(f"   cold miss:      {cold:9.2f}ms")
+    print(f"   memory hit:     {warm_memory:9.2f}ms")
+    print(f"   disk hit:       {warm_disk:9.2f}ms")
+    print(f"   bypassed:       {bypass:9.2f}ms")
+    print(f"   completions:    {gen.client.calls + disk_gen.client.calls}  stats={cache.stats()}")
+
+    # Entries of ~2KB into a 1MB cap: evictions are needed, a scan per write is not
+    capped_dir = tempfile.mkdtemp()
+    capped = LLMResponseCache(directory=capped_dir, max_bytes=1024 * 1024)
+    value = {"files": {"index.html": "x" * 2048}}
+    start = time.perf_counter()
+    for i in range(args.writes):
+        await capped.set(f"key-{i}", value)
+    per_write = (time.perf_counter() - start) * 1000 / args.writes
+    on_disk = sum(os.path.getsize(os.path.join(capped_dir, name)) for name in os.listdir(capped_dir))
+    stats = capped.stats()
+    print(f"   capped writes:  {per_write:9.2f}ms each, {stats['sweeps']} directory scans for {args.writes} writes,"
+          f" {stats['evictions']} evictions, {on_disk} bytes on disk")
+
+    problems = []
+    if on_disk > capped.max_bytes:
+        problems.append(f"{on_disk} bytes on disk, cap is {capped.max_bytes}")
+    if stats["sweeps"] > args.writes // 10:
+        problems.append(f"{stats['sweeps']} directory scans for {args.writes} writes")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-delay", type=float, default=2.0)
+    parser.add_argument("--writes", type=int, default=1000)
+    sys.exit(asyncio.run(run(parser.parse_args())))
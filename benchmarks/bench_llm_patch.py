@@ -0,0 +1,95 @@
+# benchmarks/bench_llm_patch.py
+"""Round 2 revisions through the LLM: full regeneration vs. SEARCH/REPLACE patches.
+
+Uses a stub OpenAI client whose latency grows with the completion length
+(`--chars-per-second`), like real token-by-token generation. Revises the
+counter app three ways:
+
+- full rewrite: generate_app returns every file again
+- patch: revise_app gets a small SEARCH/REPLACE patch and applies it locally
+- stale patch: the patch doesn't apply, so revise_app falls back to a full rewrite
+- failed rewrite: that full rewrite fails too, so revise_app raises (the app
+  then updates the live files itself) instead of building a new app
+
+Exits non-zero if the good patch was not applied, the stale one was, or a
+failed rewrite returned files.
+
+    python -m benchmarks.bench_llm_patch --chars-per-second 400
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from app.llm_generator import LLMCodeGenerator
+from app.simple_generator import SimpleCodeGenerator
+from app.utils import Config
+from benchmarks.stubs import StubOpenAI
+
+BRIEF = "Add a -5 button with id decrementFive"
+CHECKS = ["Page has a button #decrementFive", "Clicking #decrementFive lowers #count by 5"]
+
+PATCH = """FILE: index.html
+<<<<<<< SEARCH
+            <button class="btn btn-info" onclick="incrementBy(10)">+10</button>
+=======
+            <button class="btn btn-info" onclick="incrementBy(10)">+10</button>
+            <button class="btn btn-secondary" id="decrementFive" onclick="incrementBy(-5)">-5</button>
+>>>>>>> REPLACE
+"""
+STALE_PATCH = PATCH.replace('onclick="incrementBy(10)">+10</button>\n=', 'onclick="incrementBy(20)">+20</button>\n=')
+
+
+def existing_app() -> dict:
+    return SimpleCodeGenerator()._generate_counter() | {"style.css": "body { margin: 0; }"}
+
+
+def revised_app() -> dict:
+    files = existing_app()
+    files["index.html"] = files["index.html"].replace(
+        '+10</button>\n', '+10</button>\n            <button class="btn btn-secondary" id="decrementFive" onclick="incrementBy(-5)">-5</button>\n'
+    )
+    return files
+
+
+async def scenario(name: str, responses: list, revise: bool, args):
+    gen = LLMCodeGenerator()
+    stub = gen.client = StubOpenAI(responses=responses, chars_per_second=args.chars_per_second)
+    start = time.perf_counter()
+    if revise:
+        files = await gen.revise_app(existing_app(), BRIEF, CHECKS, use_cache=False)
+    else:
+        files = await gen.generate_app(BRIEF, [], CHECKS, use_cache=False)
+    elapsed = time.perf_counter() - start
+    applied = 'id="decrementFive"' in files["index.html"]
+    print(f"   {name:<13} LLM calls={stub.calls}  chars generated={stub.chars_generated:>5}  {elapsed:6.2f}s  change present={applied}")
+    return stub.calls, applied
+
+
+async def run(args) -> int:
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub-key"
+    Config.LLM_STREAMING = False
+    full = json.dumps(revised_app())
+
+    print(f"\n📊 Revising the counter app at {args.chars_per_second:.0f} generated chars/s")
+    await scenario("full rewrite", [full], False, args)
+    patch_calls, patch_applied = await scenario("patch", [PATCH], True, args)
+    stale_calls, stale_applied = await scenario("stale patch", [STALE_PATCH, full], True, args)
+
+    failed = patch_calls != 1 or not patch_applied or stale_calls != 2 or not stale_applied
+    if failed:
+        print("💥 patches were not applied or did not fall back as expected")
+
+    try:
+        await scenario("failed rewrite", [STALE_PATCH, "not JSON"], True, args)
+        print("💥 a failed rewrite returned files instead of raising")
+        failed = True
+    except ValueError as e:
+        print(f"   {'failed rewrite':<13} raised {type(e).__name__}, left to the caller")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars-per-second", type=float, default=400)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,108 @@
+# benchmarks/bench_llm_router.py
+"""Tail latency of LLM generation through the model router, offline.
+
+Runs `--requests` streamed generations (`--concurrency` at a time) through
+LLMCodeGenerator against the shipped mock backends:
+
+- single backend: a backend with a `--tail-rate` chance of a 10x stall; a
+  hedge delay is set but there is no other backend, so nothing is duplicated
+- two backends: plus a steadier, slower backend, without and with hedging
+  after `--hedge-delay`
+- flaky primary: the fast backend also fails 30% of calls; EWMA steers away from it
+
+Reports p50/p95/p99/max latency and the extra backend calls hedging cost,
+and checks that every backend call, including hedges that lost, is counted
+in token_usage. Then makes one slow non-streaming call, which must not be
+hedged. Exits non-zero if hedging did not cut the p99 or a check fails.
+
+    python -m benchmarks.bench_llm_router --requests 200 --latency 0.2
+"""
+import argparse
+import asyncio
+import sys
+import time
+from app.llm_generator import LLMCodeGenerator
+from app.llm_router import Backend, MockLLMBackend, ModelRouter
+from app.token_budget import token_usage
+from app.utils import Config
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+async def scenario(name: str, backends: list, hedge_delay: float, args, problems: list) -> float:
+    router = ModelRouter([Backend(n, "gpt-4o-mini", client, timeout=30) for n, client in backends], hedge_delay=hedge_delay)
+    gen = LLMCodeGenerator(router=router)
+    recorded_before = token_usage.calls
+    limit = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with limit:
+            start = time.perf_counter()
+            await gen.generate_app(f"Create a counter app #{i}", [], [], use_cache=False)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[one(i) for i in range(args.requests)])
+    stats = router.snapshot()
+    calls = sum(client.calls for _, client in backends)
+    wins = ", ".join(f"{n}={b['wins']}" for n, b in stats["backends"].items())
+    print(f"   {name:<22} p50={percentile(latencies, 0.5):5.2f}s  p95={percentile(latencies, 0.95):5.2f}s"
+          f"  p99={percentile(latencies, 0.99):5.2f}s  max={max(latencies):5.2f}s"
+          f"  extra calls={calls - args.requests:>3}  hedges={stats['hedges']:>3}  failovers={stats['failovers']:>3}  wins: {wins}")
+    # Failed calls aren't billed; every other backend call is, winner or not
+    recorded = token_usage.calls - recorded_before
+    billed = calls - sum(b["errors"] for b in stats["backends"].values())
+    if recorded != billed:
+        problems.append(f"{name}: {recorded} calls in token_usage for {billed} billed backend calls")
+    if len(backends) == 1 and calls != args.requests:
+        problems.append(f"{name}: {calls - args.requests} duplicate calls to the only backend")
+    return percentile(latencies, 0.99)
+
+
+async def run(args) -> int:
+    Config.LLM_STREAMING = True
+    tail = args.latency * 10
+
+    def fast(seed, error_rate=0.0):
+        return MockLLMBackend(latency=args.latency, jitter=args.latency / 4, tail_rate=args.tail_rate,
+                              tail_latency=tail, error_rate=error_rate, seed=seed)
+
+    def steady(seed):
+        return MockLLMBackend(latency=args.latency * 1.5, jitter=args.latency / 4, seed=seed)
+
+    print(f"\n📊 {args.requests} streamed generations, {args.latency:.2f}s typical first chunk,"
+          f" {args.tail_rate:.0%} stalls of {tail:.1f}s, hedge after {args.hedge_delay:.2f}s")
+    problems = []
+    await scenario("single backend", [("fast", fast(1))], args.hedge_delay, args, problems)
+    unhedged = await scenario("two backends", [("fast", fast(1)), ("steady", steady(2))], 0, args, problems)
+    hedged = await scenario("two backends, hedged", [("fast", fast(1)), ("steady", steady(2))], args.hedge_delay, args, problems)
+    await scenario("flaky primary, hedged", [("fast", fast(1, error_rate=0.3)), ("steady", steady(2))], args.hedge_delay, args, problems)
+    if hedged >= unhedged:
+        problems.append("hedging did not reduce the tail latency")
+
+    # A long non-streaming completion is slow, not stuck: it must not be duplicated
+    slow = MockLLMBackend(latency=args.hedge_delay * 3, jitter=0, seed=3)
+    router = ModelRouter([Backend("slow", "gpt-4o-mini", slow, timeout=30), Backend("other", "gpt-4o-mini", fast(4), timeout=30)],
+                         hedge_delay=args.hedge_delay)
+    router.backends[1].ewma_latency = args.hedge_delay * 10  # rank the slow backend first
+    await router.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+    print(f"   non-streaming call taking {args.hedge_delay * 3:.2f}s: hedges={router.hedges}")
+    if router.hedges:
+        problems.append("a non-streaming call was hedged")
+
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--hedge-delay", type=float, default=0.4)
+    sys.exit(asyncio.run(run(parser.parse_args())))
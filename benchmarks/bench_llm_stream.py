@@ -0,0 +1,52 @@
+# benchmarks/bench_llm_stream.py
+"""Streaming vs. buffered generation: latency, time-to-first-file and wasted output.
+
+Uses a stub OpenAI client that delivers the completion over `--llm-delay`
+seconds. The "malformed" scenario returns prose before the JSON on the
+first attempt and a valid object on the retry.
+
+    python -m benchmarks.bench_llm_stream --llm-delay 3.0
+"""
+import argparse
+import asyncio
+import json
+import time
+from app.llm_generator import LLMCodeGenerator
+from app.llm_stream import stream_metrics
+from app.simple_generator import SimpleCodeGenerator
+from app.utils import Config
+from benchmarks.stubs import StubOpenAI
+
+VALID = json.dumps(SimpleCodeGenerator()._generate_calculator() | {"style.css": "body { margin: 0; }"})
+MALFORMED = "Sure! Here is your application:\n" + VALID
+
+
+async def generate(streaming: bool, responses: list, delay: float):
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub-key"
+    Config.LLM_STREAMING = streaming
+    gen = LLMCodeGenerator()
+    gen.client = StubOpenAI(delay=delay, responses=responses)
+    start = time.perf_counter()
+    files = await gen.generate_app("Create a calculator", [], [])
+    elapsed = time.perf_counter() - start
+    used_llm = "calculate()" in files.get("script.js", "") and files.get("style.css") == "body { margin: 0; }"
+    return elapsed, gen.client.chars_generated, used_llm
+
+
+async def run(args):
+    print(f"\n📊 Stub completion of {len(VALID)} chars over {args.llm_delay}s")
+    for scenario, responses in (("valid", [VALID]), ("malformed first", [MALFORMED, VALID])):
+        for streaming in (False, True):
+            ttff_before = len(stream_metrics.time_to_first_file)
+            elapsed, chars, used_llm = await generate(streaming, responses, args.llm_delay)
+            ttff = list(stream_metrics.time_to_first_file)[ttff_before:]
+            mode = "stream" if streaming else "buffered"
+            print(f"   {scenario:<16} {mode:<9} total={elapsed:6.2f}s  first file={f'{ttff[0]:.2f}s' if ttff else '   -  '}"
+                  f"  chars generated={chars:>6}  result={'LLM' if used_llm else 'fallback'}")
+    print(f"   stream metrics: {stream_metrics.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-delay", type=float, default=3.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,207 @@
+# benchmarks/bench_metrics.py
+"""/metrics and /api/traces for builds against a stub LLM and a fake GitHub API.
+
+Scrapes /metrics, runs `--builds` builds to completion and scrapes it again.
+Checks that:
+
+- every `build_stage_duration_seconds` series is a valid histogram: bucket
+  counts never decrease as `le` grows, and the `+Inf` bucket equals `_count`
+- each stage a build went through (its trace, plus `auth` and `queue_wait`,
+  which are timed outside it) gained exactly one `outcome="ok"` observation
+  per build, and the traced stage durations add up to the `_sum` increase
+- `build_jobs_total{outcome="ok"}` went up by the number of builds
+- /api/traces/{task} has one round 1 trace per build, with outcome `ok`, the
+  stages listed by GET /api/jobs and no stage with another outcome
+
+and that an unknown task is a 404. Also checks that label values with
+quotes, backslashes and newlines are escaped (every sample line still
+parses and the value reads back unchanged) and that a build whose
+evaluation_url has no valid host is refused with a 400. Reports the
+scrape time and series count. Exits non-zero if a check fails.
+
+    python -m benchmarks.bench_metrics --builds 5
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+import httpx
+from app import main, metrics
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+SAMPLE = re.compile(r'^(\w+)(?:\{((?:\w+="(?:[^"\\\n]|\\.)*",?)*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+ESCAPE = re.compile(r'\\(.)')
+AWKWARD = 'bench "quoted" \\ label\nsecond line'
+STAGES = "build_stage_duration_seconds"
+
+
+def unescape(value: str) -> str:
+    return ESCAPE.sub(lambda match: "\n" if match.group(1) == "n" else match.group(1), value)
+
+
+def parse(text: str) -> dict:
+    """{(name, ((label, value), ...)): value} for every sample line of an exposition; raises on a malformed line"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            raise ValueError(f"malformed sample line: {line!r}")
+        name, labels, value = match.groups()
+        samples[(name, tuple((label, unescape(raw)) for label, raw in LABEL.findall(labels or "")))] = float(value)
+    return samples
+
+
+def histograms(samples: dict, name: str) -> dict:
+    """{labels without le: {"buckets": [(le, count), ...], "sum": s, "count": c}} for histogram `name`"""
+    series = defaultdict(lambda: {"buckets": [], "sum": 0.0, "count": 0.0})
+    for (sample, labels), value in samples.items():
+        key = tuple(pair for pair in labels if pair[0] != "le")
+        if sample == f"{name}_bucket":
+            series[key]["buckets"].append((float(dict(labels)["le"]), value))
+        elif sample == f"{name}_sum":
+            series[key]["sum"] = value
+        elif sample == f"{name}_count":
+            series[key]["count"] = value
+    for values in series.values():
+        values["buckets"].sort()
+    return dict(series)
+
+
+def check_histograms(series: dict) -> list:
+    problems = []
+    for labels, values in series.items():
+        counts = [count for _, count in values["buckets"]]
+        if counts != sorted(counts):
+            problems.append(f"{STAGES}{dict(labels)}: bucket counts decrease ({counts})")
+        if not values["buckets"] or values["buckets"][-1] != (float("inf"), values["count"]):
+            problems.append(f"{STAGES}{dict(labels)}: +Inf bucket {values['buckets'][-1:]} != _count {values['count']}")
+    return problems
+
+
+async def run(args) -> int:
+    fake_github = FakeGitHub()
+    main.llm_gen = StubLLM(delay=args.llm_delay)
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    problems = []
+    evaluation = StubEvaluation()
+    tasks = [f"metrics-{i}" for i in range(args.builds)]
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            before = parse((await client.get("/metrics")).text)
+
+            async def build(task: str) -> dict:
+                (await client.post("/api/build", json=build_request(task, eval_url))).raise_for_status()
+                deadline = time.monotonic() + args.timeout
+                while time.monotonic() < deadline:
+                    status = (await client.get(f"/api/jobs/{task}/1")).json()
+                    if status["state"] in ("completed", "failed"):
+                        return status
+                    await asyncio.sleep(0.05)
+                return status
+
+            statuses = dict(zip(tasks, await asyncio.gather(*(build(task) for task in tasks))))
+
+            # The job counter goes up once process_build_request has returned to the queue
+            ok = ("build_jobs_total", (("outcome", "ok"),))
+            deadline = time.monotonic() + 5
+            while True:
+                started = time.perf_counter()
+                exposition = (await client.get("/metrics")).text
+                scrape = time.perf_counter() - started
+                after = parse(exposition)
+                if after.get(ok, 0) - before.get(ok, 0) >= args.builds or time.monotonic() > deadline:
+                    break
+                await asyncio.sleep(0.05)
+
+            traces = {}
+            for task in tasks:
+                response = await client.get(f"/api/traces/{task}")
+                if response.status_code != 200:
+                    problems.append(f"{task}: /api/traces answered {response.status_code}")
+                    continue
+                traces[task] = response.json()["traces"]
+            missing = await client.get("/api/traces/no-such-task")
+            if missing.status_code != 404:
+                problems.append(f"traces for an unknown task answered {missing.status_code}")
+
+            # A label value that would break the exposition unescaped, and a callback URL that names no valid host
+            metrics.breaker_events.inc((AWKWARD, "probe"))
+            try:
+                escaped = parse((await client.get("/metrics")).text)
+                if escaped.get(("circuit_breaker_events_total", (("breaker", AWKWARD), ("event", "probe")))) != 1:
+                    problems.append("a label value with quotes, a backslash and a newline didn't read back unchanged")
+            except ValueError as e:
+                problems.append(f"/metrics broke on a label value with quotes, a backslash and a newline: {e}")
+            request = build_request("metrics-bad-url", 'http://eval"host\\/notify')
+            refused = await client.post("/api/build", json=request)
+            if refused.status_code != 400:
+                problems.append(f"a build with an invalid evaluation_url host answered {refused.status_code}")
+
+    for task, status in statuses.items():
+        if status["state"] != "completed":
+            problems.append(f"{task}: build ended {status['state']} ({status.get('error')})")
+
+    # Traces: one per build, matching the job status
+    traced = defaultdict(lambda: {"count": 0, "sum": 0.0})
+    for task, task_traces in traces.items():
+        if len(task_traces) != 1 or task_traces[0]["round"] != 1 or task_traces[0]["outcome"] != "ok":
+            problems.append(f"{task}: traces {[(t['round'], t['outcome']) for t in task_traces]}, expected one ok round 1 trace")
+            continue
+        stages = task_traces[0]["stages"]
+        if [record["stage"] for record in stages] != [record["stage"] for record in statuses[task]["stages"]]:
+            problems.append(f"{task}: traced stages {[r['stage'] for r in stages]}, job status lists {[r['stage'] for r in statuses[task]['stages']]}")
+        for record in stages:
+            if record["outcome"] != "ok" or record["duration"] < 0 or record["offset"] < 0:
+                problems.append(f"{task}: stage record {record}")
+            traced[record["stage"]]["count"] += 1
+            traced[record["stage"]]["sum"] += record["duration"]
+
+    # Histograms: valid series, one ok observation per build and stage, durations matching the traces
+    series_before, series_after = histograms(before, STAGES), histograms(after, STAGES)
+    problems.extend(check_histograms(series_after))
+    for name in sorted(set(traced) | {"auth", "queue_wait"}):
+        labels = (("stage", name), ("outcome", "ok"))
+        old = series_before.get(labels, {"count": 0.0, "sum": 0.0})
+        new = series_after.get(labels, {"count": 0.0, "sum": 0.0})
+        if new["count"] - old["count"] != args.builds:
+            problems.append(f"{STAGES}{{stage=\"{name}\",outcome=\"ok\"}}: _count went up by {new['count'] - old['count']:g}, not {args.builds}")
+        if name in traced and abs((new["sum"] - old["sum"]) - traced[name]["sum"]) > 0.001 * args.builds:
+            problems.append(f"{STAGES}{{stage=\"{name}\"}}: _sum went up by {new['sum'] - old['sum']:.4f}s, traces add up to {traced[name]['sum']:.4f}s")
+    if after.get(ok, 0) - before.get(ok, 0) != args.builds:
+        problems.append(f'build_jobs_total{{outcome="ok"}} went up by {after.get(ok, 0) - before.get(ok, 0):g}, not {args.builds}')
+
+    print(f"\n📊 /metrics after {args.builds} builds (stub LLM {args.llm_delay:.1f}s)")
+    print(f"   scrape: {scrape * 1000:.1f}ms, {len(exposition)} bytes, {len(after)} samples, {len(series_after)} stage series")
+    for name in sorted(set(traced) | {"auth", "queue_wait"}):
+        values = series_after.get((("stage", name), ("outcome", "ok")), {"count": 0, "sum": 0.0})
+        print(f"   {name:20s} count={values['count']:g}  mean={values['sum'] / max(values['count'], 1) * 1000:.1f}ms")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=5)
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
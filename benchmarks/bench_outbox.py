@@ -0,0 +1,87 @@
+# benchmarks/bench_outbox.py
+"""Evaluation outbox against a flaky evaluation server, including a restart.
+
+Runs `--builds` builds through the real app while the stub evaluation
+server rejects `--fail-rate` of all callbacks with 503. The app is
+restarted as soon as the builds finish, with callbacks still pending.
+Exits non-zero unless every callback is eventually delivered and the
+per-host concurrency limit held.
+
+    python -m benchmarks.bench_outbox --builds 20 --fail-rate 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import httpx
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, FlakyEvaluation, StubLLM, percentile
+
+
+async def run(args) -> int:
+    Config.OUTBOX_BACKOFF_BASE = args.backoff_base
+    Config.OUTBOX_BACKOFF_MAX = args.backoff_max
+    fake_github = FakeGitHub()
+    evaluation = FlakyEvaluation(fail_rate=args.fail_rate)
+    main.llm_gen = StubLLM(delay=0.1)
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+
+    def restart():
+        main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+        main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+        main.idempotency = IdempotencyStore(db_path=db_path)
+        main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    restart()
+    start = time.perf_counter()
+    with BackgroundServer(evaluation.app) as eval_server:
+        eval_url = f"{eval_server.url}/notify"
+        with BackgroundServer(main.app) as api:
+            async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+                await asyncio.gather(*[
+                    client.post("/api/build", json=build_request(f"flaky-{i}", eval_url)) for i in range(args.builds)
+                ])
+            while main.job_queue.pending_count():
+                await asyncio.sleep(0.1)
+        pending_at_restart = main.outbox.pending_count()
+
+        restart()
+        with BackgroundServer(main.app):
+            while main.job_queue.pending_count() or main.outbox.pending_count():
+                await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+    builds = [job_status.get(f"flaky-{i}", 1) for i in range(args.builds)]
+    build_times = [status["updated_at"] - status["created_at"] for status in builds if status]
+    delivered = {payload["task"] for payload in evaluation.received}
+    stats = main.outbox.stats()
+
+    print(f"\n📊 {args.builds} builds, evaluation server failing {args.fail_rate:.0%} of callbacks")
+    print(f"   build time (queued -> completed) p50={percentile(build_times, 50):.2f}s p99={percentile(build_times, 99):.2f}s")
+    print(f"   callback attempts={evaluation.attempts}  delivered={len(delivered)}/{args.builds}  outbox={stats}")
+    print(f"   pending at restart={pending_at_restart}  peak concurrent callbacks={evaluation.peak_in_flight} (per-host limit {Config.OUTBOX_PER_HOST})")
+    print(f"   total time until every callback delivered={elapsed:.1f}s")
+
+    ok = len(delivered) == args.builds and evaluation.peak_in_flight <= Config.OUTBOX_PER_HOST
+    if not ok:
+        print("💥 callbacks were lost or the per-host limit was exceeded")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=20)
+    parser.add_argument("--fail-rate", type=float, default=0.5)
+    parser.add_argument("--backoff-base", type=float, default=0.5)
+    parser.add_argument("--backoff-max", type=float, default=4.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,140 @@
+# benchmarks/bench_pages.py
+"""Pages deployment tracking: evaluation callbacks only after the site is live.
+
+Runs builds through the real app against the fake GitHub API, whose Pages
+builds take `--build-time` seconds after each push. The evaluation stub
+checks, when each callback arrives, whether the reported pages_url is
+already serving the reported commit. Three phases:
+
+- hold off: callbacks are sent as soon as the build is done (the old
+  behaviour, minus the fixed 2s sleep in the build worker)
+- hold on: callbacks are held until the tracker sees the site respond
+- deadline: the site never comes up within PAGES_READY_TIMEOUT; held
+  callbacks still go out once it passes
+
+Exits non-zero if a held callback arrived before its site was live, a
+callback was lost, or a deployment ended in the wrong state.
+
+    python -m benchmarks.bench_pages --builds 8 --build-time 1.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import httpx
+from fastapi import FastAPI
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub
+
+
+class PagesEvaluation:
+    """Evaluation endpoint that notes whether the site serves the reported commit when a callback arrives"""
+
+    def __init__(self, github: FakeGitHub):
+        self.received = {}
+        self.app = FastAPI()
+
+        @self.app.post("/notify")
+        async def notify(payload: dict):
+            repo = github.repos.get(payload["repo_url"].split("/")[-1])
+            live = repo is not None and github._site_commit(repo) == payload["commit_sha"]
+            self.received[payload["task"]] = (time.monotonic(), live)
+            return {"status": "ok"}
+
+
+async def run_phase(client: httpx.AsyncClient, evaluation: PagesEvaluation, prefix: str, builds: int,
+                    eval_url: str, timeout: float = 60) -> dict:
+    tasks = [f"{prefix}-{i}" for i in range(builds)]
+    submitted = time.monotonic()
+    await asyncio.gather(*[client.post("/api/build", json=build_request(task, eval_url)) for task in tasks])
+    built, deadline = {}, submitted + timeout
+    while time.monotonic() < deadline and not set(tasks) <= set(evaluation.received):
+        for task in tasks:
+            status = job_status.get(task, 1)
+            if task not in built and status and status["state"] == "completed":
+                built[task] = time.monotonic()
+        await asyncio.sleep(0.02)
+    # The tracker records the outcome and releases the held callback in either order when the
+    # deadline passes (and without the hold the callback comes first): wait for every outcome
+    while time.monotonic() < deadline and any((job_status.get(task, 1) or {}).get("pages") is None for task in tasks):
+        await asyncio.sleep(0.02)
+    received = {task: evaluation.received[task] for task in tasks if task in evaluation.received}
+    return {
+        "tasks": tasks,
+        "build": statistics.mean(at - submitted for at in built.values()) if built else float("nan"),
+        "callback": statistics.mean(at - submitted for at, _ in received.values()) if received else float("nan"),
+        "delivered": len(received),
+        "early": sum(1 for _, live in received.values() if not live),
+        "pages": {job_status.get(task, 1)["pages"] for task in tasks if job_status.get(task, 1)},
+    }
+
+
+async def run(args) -> int:
+    Config.PAGES_POLL_INTERVAL = args.poll
+    Config.PAGES_POLL_MAX = args.poll * 4
+    Config.PAGES_READY_TIMEOUT = args.build_time * 10
+    problems = []
+
+    fake_github = FakeGitHub(pages_build_time=args.build_time)
+    evaluation = PagesEvaluation(fake_github)
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.llm_gen = None
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            print(f"\n📊 {args.builds} builds per phase, Pages builds take {args.build_time:.1f}s, first poll after {args.poll:.2f}s")
+
+            Config.PAGES_WAIT_FOR_SITE = False
+            off = await run_phase(client, evaluation, "hold-off", args.builds, eval_url)
+            Config.PAGES_WAIT_FOR_SITE = True
+            on = await run_phase(client, evaluation, "hold-on", args.builds, eval_url)
+
+            Config.PAGES_READY_TIMEOUT = args.build_time / 2
+            fake_github.pages_build_time = args.build_time * 100
+            late = await run_phase(client, evaluation, "deadline", args.builds, eval_url)
+            await asyncio.sleep(args.build_time)
+            health = (await client.get("/health")).json()
+
+    for name, phase in (("hold off", off), ("hold on", on), ("deadline", late)):
+        print(f"   {name:9} build done {phase['build']:5.2f}s  callback {phase['callback']:5.2f}s"
+              f"  delivered {phase['delivered']}/{args.builds}  before site was live: {phase['early']}  pages={sorted(map(str, phase['pages']))}")
+    tracked = health["pages"]["ready"] + health["pages"]["errored"] + health["pages"]["timeout"]
+    print(f"   tracking: {health['pages']['polls'] / tracked:.1f} build polls and {fake_github.calls / tracked:.1f} API calls"
+          f" per build in total; the build worker no longer sleeps 2s")
+    print(f"   /health pages: {health['pages']}")
+
+    if any(phase["delivered"] != args.builds for phase in (off, on, late)):
+        problems.append("evaluation callbacks were lost")
+    if on["early"]:
+        problems.append("held callbacks arrived before the site was live")
+    if on["pages"] != {"ready"} or late["pages"] != {"timeout"}:
+        problems.append("deployments ended in the wrong state")
+    if not off["early"]:
+        problems.append("without the hold no callback beat the site; --build-time is too short to show anything")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=8)
+    parser.add_argument("--build-time", type=float, default=1.5)
+    parser.add_argument("--poll", type=float, default=0.25)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,129 @@
+# benchmarks/bench_pipeline.py
+"""End-to-end build wall clock: stage graph vs. the same stages run one after another.
+
+Runs round 1 and round 2 builds, one at a time, through the real app with a
+stub LLM (`--llm-delay` per generation) and a fake GitHub API that takes
+`--github-latency` per call. In round 1, repo creation and Pages setup no
+longer wait for the LLM; round 2 needs the live files before it can call
+the LLM, so it has nothing to overlap. The serial baseline runs the same stages with each
+one waiting for the previous, as process_build_request used to.
+
+A last phase fails a few GitHub calls with 502s while builds are running:
+only the GitHub stage that hit them should be retried. The LLM must not be
+called again and no build should fail.
+
+Exits non-zero if a build didn't complete or a retry regenerated code.
+
+    python -m benchmarks.bench_pipeline --builds 5 --llm-delay 1.0 --github-latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import httpx
+from app import main, metrics
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.pipeline import Stage
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+graph_stages = main.build_stages
+
+
+def serial_stages(request_data: dict, attachments: list) -> list:
+    """The same stages, each also waiting for the one declared before it"""
+    stages, previous = [], None
+    for stage in graph_stages(request_data, attachments):
+        async def run(stage=stage, **results):
+            return await stage.run(**{name: results[name] for name in stage.after})
+        after = stage.after + ((previous,) if previous and previous not in stage.after else ())
+        stages.append(Stage(stage.name, run, after=after, retries=stage.retries, retry_if=stage.retry_if))
+        previous = stage.name
+    return stages
+
+
+async def build(client: httpx.AsyncClient, task: str, round_num: int, eval_url: str, timeout: float = 60) -> float:
+    request = dict(build_request(task, eval_url), round=round_num, nonce=f"nonce-{task}-{round_num}",
+                   brief="Create a counter app" if round_num == 1 else "Add a reset button and a history list")
+    start = time.perf_counter()
+    response = await client.post("/api/build", json=request)
+    response.raise_for_status()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = job_status.get(task, round_num)
+        if status and status["state"] in ("completed", "failed"):
+            break
+        await asyncio.sleep(0.01)
+    status = job_status.get(task, round_num)
+    return time.perf_counter() - start if status and status["state"] == "completed" else float("nan")
+
+
+async def run(args) -> int:
+    Config.STAGE_RETRY_DELAY = 0.05
+    problems = []
+    fake_github = FakeGitHub(latency=args.github_latency)
+    evaluation = StubEvaluation()
+    llm = StubLLM(delay=args.llm_delay)
+    main.llm_gen = llm
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    timings = {}
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            for mode, stages in (("serial", serial_stages), ("graph", graph_stages)):
+                main.build_stages = stages
+                for round_num in (1, 2):
+                    timings[mode, round_num] = [
+                        await build(client, f"{mode}-{i}", round_num, eval_url) for i in range(args.builds)
+                    ]
+
+            main.build_stages = graph_stages
+            calls_before = llm.calls
+            retries_before = sum(metrics.stage_retries.get((name,)) for name in ("provision", "publish"))
+            tasks = [f"flaky-{i}" for i in range(args.builds)]
+            timings["flaky", 1] = []
+            for task in tasks:
+                fake_github.fail_next = 2
+                timings["flaky", 1].append(await build(client, task, 1, eval_url))
+            regenerated = llm.calls - calls_before - len(tasks)
+            retries = sum(metrics.stage_retries.get((name,)) for name in ("provision", "publish")) - retries_before
+
+    print(f"\n📊 {args.builds} builds per round, one at a time; LLM {args.llm_delay:.1f}s, GitHub {args.github_latency * 1000:.0f}ms per call")
+    for round_num in (1, 2):
+        serial = statistics.mean(timings["serial", round_num])
+        graph = statistics.mean(timings["graph", round_num])
+        print(f"   round {round_num}: serial {serial:5.2f}s  graph {graph:5.2f}s  saved {serial - graph:5.2f}s ({(1 - graph / serial) * 100:4.1f}%)")
+    flaky = timings["flaky", 1]
+    print(f"   2 GitHub 502s per build: {statistics.mean(flaky):5.2f}s, {retries} stage retries, {regenerated} extra LLM calls")
+
+    if any(value != value for values in timings.values() for value in values):
+        problems.append("builds failed or timed out")
+    if statistics.mean(timings["graph", 1]) >= statistics.mean(timings["serial", 1]):
+        problems.append("round 1 builds were not faster with the stage graph")
+    if regenerated:
+        problems.append("a GitHub retry regenerated code")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=5)
+    parser.add_argument("--llm-delay", type=float, default=1.0)
+    parser.add_argument("--github-latency", type=float, default=0.2)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,84 @@
+# benchmarks/bench_publish.py
+"""Round trips and wall time: per-file Contents API vs. single-commit Git Data API.
+
+Runs against the in-memory fake GitHub with a fixed per-request latency to
+stand in for network round trips. Also runs round 2 updates (no change,
+one changed file, all changed) through the diff-based updater.
+
+    python -m benchmarks.bench_publish --latency 0.03
+"""
+import argparse
+import asyncio
+import base64
+import time
+import httpx
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from benchmarks.stubs import FakeGitHub
+
+
+def make_files(count: int) -> dict:
+    files = {"index.html": "<!DOCTYPE html><html><body>app</body></html>"}
+    files.update({f"assets/module-{i}.js": f"console.log({i});\n" * 20 for i in range(count - 1)})
+    return files
+
+
+async def legacy_create(mgr: GitHubManager, name: str, files: dict):
+    """The pre-batching sequence: one Contents API commit per file, then list commits"""
+    client, repo_path = mgr.client, f"/repos/{mgr.login}/{name}"
+    await client.post("/user/repos", json={"name": name, "auto_init": False})
+    for path, content in {"LICENSE": mgr._get_mit_license(), "README.md": "readme", **files}.items():
+        await client.put(f"{repo_path}/contents/{path}", json={
+            "message": f"Add {path}", "content": base64.b64encode(content.encode()).decode()
+        })
+    return (await client.get(f"{repo_path}/commits"))[0]["sha"]
+
+
+async def batched_create(mgr: GitHubManager, name: str, files: dict):
+    repo = await mgr.client.post("/user/repos", json={"name": name, "auto_init": True})
+    files = {"LICENSE": mgr._get_mit_license(), "README.md": "readme", **files}
+    return await mgr._publish_files(f"/repos/{mgr.login}/{name}", repo["default_branch"], files, "Add app", base_tree=False)
+
+
+async def measure(fake: FakeGitHub, mgr: GitHubManager, publish, name: str, files: dict):
+    before = fake.calls
+    start = time.perf_counter()
+    await publish(mgr, name, files)
+    return fake.calls - before, time.perf_counter() - start
+
+
+async def run(args):
+    fake = FakeGitHub(latency=args.latency)
+    mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake.app)))
+    await mgr.authenticate()
+
+    print(f"\n📊 Publishing with {args.latency * 1000:.0f}ms simulated latency per request")
+    for count in (3, 50):
+        files = make_files(count)
+        legacy_calls, legacy_time = await measure(fake, mgr, legacy_create, f"legacy-{count}", files)
+        batched_calls, batched_time = await measure(fake, mgr, batched_create, f"batched-{count}", files)
+        legacy_commits = len(fake._log(fake.repos[f"legacy-{count}"]))
+        batched_commits = len(fake._log(fake.repos[f"batched-{count}"])) - 1  # minus the auto_init commit
+        print(f"   {count:>2} files  contents API: {legacy_calls:>3} calls {legacy_commits:>3} commits {legacy_time * 1000:7.0f}ms"
+              f"  |  git data API: {batched_calls:>3} calls {batched_commits} commit {batched_time * 1000:6.0f}ms")
+
+    print("   round 2 update of the 50-file app:")
+    files = make_files(50)
+    repo_url = (await mgr.create_repo_from_code("update-50", files, "brief"))["repo_url"]
+    for label, update in (
+        ("no change", files),
+        ("1 file changed", {**files, "index.html": files["index.html"] + "<!-- v2 -->"}),
+        ("all changed", {path: content + "\n// v3" for path, content in files.items()}),
+    ):
+        before, commits_before = fake.calls, len(fake._log(fake.repos["task-update-50"]))
+        info = await mgr.update_repo(repo_url, update, "brief")
+        stats = info["publish"]
+        print(f"     {label:<15} {fake.calls - before:>2} calls  {len(fake._log(fake.repos['task-update-50'])) - commits_before} new commits"
+              f"  changed={stats['changed']:>2}/{stats['files']}  saved {stats['bytes_saved']:>6} bytes, {stats['calls_saved']:>2} calls")
+    await mgr.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.03)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,83 @@
+# benchmarks/bench_queue_load.py
+"""Burst load test for the durable job queue.
+
+Fires a burst of /api/build requests at the app (stub LLM, fake GitHub),
+restarts the server half-way through the drain, and reports accepted vs.
+429-rejected requests, peak LLM concurrency and how many jobs survived
+the restart.
+
+    python -m benchmarks.bench_queue_load --burst 200 --queue-max 150
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import httpx
+from app import main
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.evaluation_outbox import EvaluationOutbox
+from app.job_queue import JobQueue
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+
+async def run(args):
+    fake_github = FakeGitHub()
+    evaluation = StubEvaluation()
+    llm = StubLLM(delay=args.llm_delay)
+    main.llm_gen = llm
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+
+    def new_github():
+        return GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+
+    def new_queue():
+        return JobQueue(main.process_build_request, db_path=db_path, workers=args.workers, max_pending=args.queue_max)
+
+    main.github_mgr = new_github()
+    main.job_queue = new_queue()
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+    start = time.perf_counter()
+    with BackgroundServer(evaluation.app) as eval_server:
+        eval_url = f"{eval_server.url}/notify"
+
+        with BackgroundServer(main.app) as api:
+            async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+                responses = await asyncio.gather(*[
+                    client.post("/api/build", json=build_request(f"burst-{i}", eval_url))
+                    for i in range(args.burst)
+                ])
+            accepted = sum(1 for r in responses if r.status_code == 200)
+            rejected = [r for r in responses if r.status_code == 429]
+            await asyncio.sleep(args.restart_after)
+
+        # Simulated restart: a fresh queue over the same database resumes the jobs
+        pending_at_restart = main.job_queue.pending_count()
+        main.github_mgr = new_github()
+        main.job_queue = new_queue()
+        main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+        with BackgroundServer(main.app):
+            while main.job_queue.pending_count() or main.outbox.pending_count():
+                await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+    delivered = {payload["task"] for payload in evaluation.received}
+    print(f"\n📊 Burst of {args.burst}, queue max {args.queue_max}, {args.workers} workers")
+    print(f"   accepted={accepted}  rejected_429={len(rejected)}  retry_after={rejected[0].headers.get('retry-after') if rejected else '-'}")
+    print(f"   peak concurrent LLM calls={llm.peak_in_flight}")
+    print(f"   pending at restart={pending_at_restart}  delivered after drain={len(delivered)}/{accepted}")
+    print(f"   total drain time={elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--queue-max", type=int, default=150)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=0.2)
+    parser.add_argument("--restart-after", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,86 @@
+# benchmarks/bench_ratelimit.py
+"""GitHub rate limits: builds against a fake API that enforces a per-token limit.
+
+Each scenario runs `--builds` builds through the real app while the fake
+GitHub allows `--limit` calls per token every `--window` seconds:
+
+- unscheduled: no budget reservations and no waiting, as before (rate-limited builds fail)
+- 1 token / N tokens: the rate-limit scheduler with a pool of tokens
+
+Exits non-zero if any scheduled build failed.
+
+    python -m benchmarks.bench_ratelimit --builds 20 --limit 60 --window 5
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import httpx
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.utils import Config
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+
+async def scenario(name: str, tokens: list, scheduled: bool, args):
+    fake_github = FakeGitHub(rate_limit=args.limit, window=args.window)
+    main.llm_gen = StubLLM(delay=0.05)
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient(tokens, "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    if not scheduled:
+        scheduler = main.github_mgr.client.scheduler
+        scheduler._pick = lambda calls, now: scheduler.tokens[0]  # never wait, whatever the headers say
+        main.github_mgr.reserve_budget = lambda calls=None: contextlib.nullcontext()
+    Config.GITHUB_RATELIMIT_RETRIES = 2 if scheduled else 0
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    tasks = [f"{name.replace(' ', '-')}-{i}" for i in range(args.builds)]
+    evaluation = StubEvaluation()
+    start = time.perf_counter()
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            await asyncio.gather(*[
+                client.post("/api/build", json=build_request(task, f"{eval_server.url}/notify")) for task in tasks
+            ])
+        while main.job_queue.pending_count():
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        scheduler = main.github_mgr.client.scheduler.snapshot()
+
+    states = [job_status.get(task, 1)["state"] for task in tasks]
+    failed = states.count("failed")
+    per_token = [fake_github.token_calls[token] for token in tokens]
+    print(f"   {name:<12} completed={states.count('completed'):>3}  failed={failed:>3}  403s={fake_github.rejected:>3}"
+          f"  waits={scheduler['waits']:>3}  calls per token={per_token}  wall={elapsed:5.1f}s")
+    return failed
+
+
+async def run(args) -> int:
+    print(f"\n📊 {args.builds} builds, {args.limit} calls per token every {args.window:.0f}s")
+    await scenario("unscheduled", ["token-a"], False, args)
+    failed = await scenario("1 token", ["token-a"], True, args)
+    pool = [f"token-{chr(ord('a') + i)}" for i in range(args.tokens)]
+    failed += await scenario(f"{args.tokens} tokens", pool, True, args)
+    if failed:
+        print("💥 scheduled builds failed on rate limits")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=60)
+    parser.add_argument("--window", type=float, default=5.0)
+    parser.add_argument("--tokens", type=int, default=3)
+    sys.exit(asyncio.run(run(parser.parse_args())))
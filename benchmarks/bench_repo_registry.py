@@ -0,0 +1,149 @@
+# benchmarks/bench_repo_registry.py
+"""GitHub calls per build with the repo registry vs. a lookup per call site.
+
+Runs round 1 and round 2 builds through the real app against the fake
+GitHub API, once with the registry and once with a registry that fetches
+the repository on every lookup (as each call site used to). Then checks
+the registry's other duties directly:
+
+- after the TTL, lookups revalidate with a conditional GET and get a 304
+- two task ids that sanitize to the same name ("Same_Task", "same-task")
+  get separate repositories, and round 2 of each updates its own
+- a deleted repository is not served from the cache
+
+Exits non-zero if the registry saves no repo GETs or any check fails.
+
+    python -m benchmarks.bench_repo_registry --builds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import httpx
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from app.repo_registry import RepoRegistry, repo_name
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+
+class UncachedRegistry(RepoRegistry):
+    """Every lookup is a full GET"""
+
+    async def get(self, login: str, name: str) -> dict:
+        self.stats["fetched"] += 1
+        return await self.client.get(f"/repos/{login}/{name}")
+
+
+def github_manager(fake_github: FakeGitHub) -> GitHubManager:
+    return GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+
+
+async def build(client: httpx.AsyncClient, task: str, round_num: int, eval_url: str, timeout: float = 30) -> bool:
+    request = dict(build_request(task, eval_url), round=round_num, nonce=f"nonce-{task}-{round_num}",
+                   brief="Create a counter app" if round_num == 1 else "Add a reset button")
+    (await client.post("/api/build", json=request)).raise_for_status()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = job_status.get(task, round_num)
+        if status and status["state"] in ("completed", "failed"):
+            return status["state"] == "completed"
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def build_rounds(prefix: str, registry_class, builds: int, eval_url: str, client: httpx.AsyncClient) -> dict:
+    fake_github = FakeGitHub()
+    main.github_mgr = github_manager(fake_github)
+    main.github_mgr.repos = registry_class(main.github_mgr.client)
+    main.github_provider.adopt(main.github_mgr)
+    await main.github_mgr.authenticate()
+    results = {}
+    for round_num in (1, 2):
+        gets, calls = fake_github.repo_gets, fake_github.calls
+        completed = [await build(client, f"{prefix}-{i}", round_num, eval_url) for i in range(builds)]
+        results[round_num] = {
+            "completed": sum(completed),
+            "repo_gets": (fake_github.repo_gets - gets) / builds,
+            "calls": (fake_github.calls - calls) / builds,
+        }
+    return results
+
+
+async def check_registry() -> list:
+    problems = []
+    fake_github = FakeGitHub()
+    mgr = github_manager(fake_github)
+    mgr.repos.ttl = 0.2
+
+    # Revalidation after the TTL (the entry recorded at creation has no ETag, so the first refresh is a full GET)
+    await mgr.create_repo_from_code("reval", {"index.html": "<p>1</p>"}, "brief")
+    for _ in range(2):
+        await asyncio.sleep(0.3)
+        await mgr.get_repo_url("reval")
+        await mgr.get_repo_url("reval")
+    snapshot = await mgr.repos.snapshot()
+    print(f"   after TTL: registry={snapshot}  304s={fake_github.not_modified}")
+    if fake_github.not_modified != 1:
+        problems.append("an expired entry was not revalidated with a conditional GET")
+
+    # Name collisions
+    first = await mgr.create_repo_from_code("Same_Task", {"index.html": "<p>first</p>"}, "brief")
+    second = await mgr.create_repo_from_code("same-task", {"index.html": "<p>second</p>"}, "brief")
+    again = await mgr.update_repo(await mgr.get_repo_url("same-task"), {"index.html": "<p>second v2</p>"}, "brief")
+    first_files = await mgr.get_files(first["repo_url"], ["index.html"])
+    print(f"   collision: {repo_name('Same_Task')} -> {first['repo_url'].split('/')[-1]}, {second['repo_url'].split('/')[-1]}")
+    if first["repo_url"] == second["repo_url"] or again["repo_url"] != second["repo_url"]:
+        problems.append("colliding task ids share a repository")
+    if first_files.get("index.html") != "<p>first</p>":
+        problems.append("round 2 of one task overwrote the other task's repository")
+
+    # Deletion
+    await mgr.delete_repo("reval")
+    if await mgr.repo_exists("reval"):
+        problems.append("a deleted repository was still served from the cache")
+    return problems
+
+
+async def run(args) -> int:
+    problems = []
+    evaluation = StubEvaluation()
+    main.llm_gen = StubLLM(delay=0.01)
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            uncached = await build_rounds("uncached", UncachedRegistry, args.builds, eval_url, client)
+            cached = await build_rounds("cached", RepoRegistry, args.builds, eval_url, client)
+
+    print(f"\n📊 {args.builds} builds per round, GET /repos/{{owner}}/{{repo}} and all API calls per build")
+    for round_num in (1, 2):
+        before, after = uncached[round_num], cached[round_num]
+        print(f"   round {round_num}: repo GETs {before['repo_gets']:.1f} -> {after['repo_gets']:.1f}"
+              f"   API calls {before['calls']:.1f} -> {after['calls']:.1f}")
+        if after["completed"] != args.builds or before["completed"] != args.builds:
+            problems.append(f"round {round_num} builds failed")
+    if cached[2]["repo_gets"] >= uncached[2]["repo_gets"]:
+        problems.append("the registry saved no repo GETs in round 2")
+    problems += await check_registry()
+
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=10)
+    sys.exit(asyncio.run(run(parser.parse_args())))
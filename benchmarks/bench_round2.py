@@ -0,0 +1,88 @@
+# benchmarks/bench_round2.py
+"""Round 2 revisions: local keyword transformers vs. LLM regeneration.
+
+Builds an app in round 1, then sends round 2 briefs that the keyword
+transformers recognize (dark mode, search, favorites, charts) and ones
+they must leave to the LLM: a brief they don't cover, one that only
+mentions a keyword in passing, and one whose checks name an element the
+transformer doesn't add. Reports build time and LLM calls per revision;
+exits non-zero if a revision took the wrong path.
+
+    python -m benchmarks.bench_round2 --llm-delay 3.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import httpx
+from app import main
+from app.evaluation_outbox import EvaluationOutbox
+from app.github_client import AsyncGitHubClient
+from app.github_manager import GitHubManager
+from app.idempotency import IdempotencyStore
+from app.job_queue import JobQueue
+from app.job_status import job_status
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, StubLLM
+
+# (brief, checks, handled locally)
+REVISIONS = (
+    ("Add a dark mode toggle", [], True),
+    ("Add search to filter the page", [], True),
+    ("Let users bookmark favorite items", [], True),
+    ("Show the counts as a bar chart", [], True),
+    ("Support keyboard shortcuts for every button", [], False),
+    ("Save nothing between visits; show the sum in #totals", ["Page has a #totals element"], False),
+    ("Add a dark mode toggle next to a #themeLabel", ["Page has a #themeLabel element"], False),
+)
+
+
+async def build(client: httpx.AsyncClient, request: dict) -> dict:
+    response = await client.post("/api/build", json=request)
+    response.raise_for_status()
+    while True:
+        status = job_status.get(request["task"], request["round"])
+        if status and status["state"] in ("completed", "failed"):
+            return status
+        await asyncio.sleep(0.02)
+
+
+async def run(args) -> int:
+    fake_github = FakeGitHub()
+    llm = StubLLM(delay=args.llm_delay)
+    main.llm_gen = llm
+    main.github_mgr = GitHubManager(client=AsyncGitHubClient("stub-token", "http://github.local", httpx.ASGITransport(app=fake_github.app)))
+    db_path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    main.job_queue = JobQueue(main.process_build_request, db_path=db_path)
+    main.idempotency = IdempotencyStore(db_path=db_path)
+    main.outbox = EvaluationOutbox(db_path=db_path, on_result=main.record_evaluation_result)
+
+    failures = 0
+    evaluation = StubEvaluation()
+    with BackgroundServer(evaluation.app) as eval_server, BackgroundServer(main.app) as api:
+        eval_url = f"{eval_server.url}/notify"
+        async with httpx.AsyncClient(base_url=api.url, timeout=60) as client:
+            print(f"\n📊 Round 2 revisions with a {args.llm_delay}s LLM")
+            for i, (brief, checks, local) in enumerate(REVISIONS):
+                task = f"revise-{i}"
+                await build(client, build_request(task, eval_url) | {"brief": "Create a counter app"})
+                calls_before = llm.calls
+                request = build_request(task, eval_url) | {"round": 2, "brief": brief, "nonce": f"{task}-r2", "checks": checks}
+                status = await build(client, request)
+                elapsed = status["updated_at"] - status["created_at"]
+                llm_calls = llm.calls - calls_before
+                path = "LLM" if llm_calls else "local"
+                print(f"   {brief:<56} {path:<6} {elapsed:6.2f}s  LLM calls={llm_calls}  state={status['state']}")
+                if local != (not llm_calls) or status["state"] != "completed":
+                    failures += 1
+
+    if failures:
+        print("💥 revisions took the wrong path (local transformer vs. LLM) or failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-delay", type=float, default=3.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,152 @@
+# benchmarks/bench_startup.py
+"""Cold start: import time, time to live and ready, and booting during a GitHub outage.
+
+Starts the real app under uvicorn in a subprocess, as a deployment would,
+with GitHub pointed at the fake API (answering after `--github-latency`)
+and an OpenAI backend configured with a dummy key. Measures:
+
+- import time of app.main, and with openai imported eagerly as it used to be
+- time from process start until /health/live and /health/ready answer 200
+- booting while GitHub answers 503: the app must come up live, report not
+  ready, park a build, then become ready and finish it once GitHub is back
+  (previously GitHub stayed disabled for the life of the process)
+
+Exits non-zero if the app isn't live before GitHub is initialized, never
+becomes ready after the outage, or the parked build doesn't complete.
+
+    python -m benchmarks.bench_startup --github-latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.bench_build_latency import build_request
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation, free_port
+
+
+def import_time(statement: str, runs: int = 3) -> float:
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    env = dict(os.environ, GITHUB_TOKEN="stub-token")
+    return min(
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True).stdout.split()[-1])
+        for _ in range(runs)
+    )
+
+
+class App:
+    """The app in a uvicorn subprocess, with its own data directory.
+
+    With `workers` it is started through run.py, as a multi-worker deployment would be.
+    """
+
+    def __init__(self, github_url: str, log_path: str, workers: int = None, **env):
+        self.workers = workers
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        data_dir = tempfile.mkdtemp()
+        self.env = dict(
+            os.environ,
+            GITHUB_TOKEN="stub-token", GITHUB_API_URL=github_url, OPENAI_API_KEY="sk-bench",
+            DATA_DIR=data_dir, JOB_DB_PATH=os.path.join(data_dir, "jobs.db"),
+            PROVIDER_RETRY_BASE="0.5", PROVIDER_RETRY_MAX="1", BREAKER_PROBE_WAIT="0.5",
+            PAGES_WAIT_FOR_SITE="false", PAGES_READY_TIMEOUT="1",
+        )
+        self.env.update(env)
+        self.log_path = log_path
+
+    def __enter__(self):
+        self.log = open(self.log_path, "w")
+        self.started = time.perf_counter()
+        if self.workers:
+            command = [sys.executable, "run.py", "--host", "127.0.0.1", "--port", str(self.port),
+                       "--workers", str(self.workers), "--log-level", "warning"]
+        else:
+            command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"]
+        self.process = subprocess.Popen(command, env=self.env, stdout=self.log, stderr=subprocess.STDOUT)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+        self.log.close()
+
+    async def wait_for(self, client: httpx.AsyncClient, path: str, timeout: float = 30):
+        """Seconds since process start until `path` answers 200 (None on timeout)"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            try:
+                if (await client.get(f"{self.url}{path}")).status_code == 200:
+                    return time.perf_counter() - self.started
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.01)
+        return None
+
+
+async def run(args) -> int:
+    problems = []
+    lazy = import_time("import app.main")
+    eager = import_time("import openai, app.main")
+
+    fake_github = FakeGitHub(latency=args.github_latency)
+    evaluation = StubEvaluation()
+    with BackgroundServer(fake_github.app) as github, BackgroundServer(evaluation.app) as eval_server:
+        async with httpx.AsyncClient(timeout=30) as client:
+            with App(github.url, "/tmp/bench_startup_app.log") as app:
+                live = await app.wait_for(client, "/health/live")
+                ready = await app.wait_for(client, "/health/ready")
+
+            fake_github.down = True
+            with App(github.url, "/tmp/bench_startup_outage.log") as app:
+                outage_live = await app.wait_for(client, "/health/live")
+                await asyncio.sleep(args.outage)
+                during = (await client.get(f"{app.url}/health/ready")).json()
+                response = await client.post(f"{app.url}/api/build", json=build_request("boot-outage", f"{eval_server.url}/notify"))
+                # The build waits for the GitHub attempt in flight, then parks when it fails
+                deadline = time.monotonic() + 10
+                job = {}
+                while time.monotonic() < deadline and job.get("state") != "parked":
+                    await asyncio.sleep(0.1)
+                    job = (await client.get(f"{app.url}/api/jobs/boot-outage/1")).json()
+                parked = job.get("state")
+                fake_github.down = False
+                back = time.perf_counter()
+                recovered = await app.wait_for(client, "/health/ready")
+                recovered = recovered and recovered - (back - app.started)
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline and job.get("state") != "completed":
+                    await asyncio.sleep(0.1)
+                    job = (await client.get(f"{app.url}/api/jobs/boot-outage/1")).json()
+
+    print(f"\n📊 Startup, GitHub answering after {args.github_latency:.1f}s")
+    print(f"   import app.main:           {lazy * 1000:6.0f}ms  (with openai imported eagerly: {eager * 1000:.0f}ms)")
+    print(f"   live after:                {live:6.2f}s")
+    print(f"   ready after:               {ready:6.2f}s  (GitHub login and LLM router initialized concurrently)")
+    print(f"   boot during GitHub outage: live after {outage_live:.2f}s, ready={during['status']},"
+          f" github={during['providers']['GitHub']['state']}, build {response.status_code} -> {parked}")
+    print(f"   GitHub back:               ready {recovered:.2f}s later, parked build {job.get('state')}")
+
+    if live is None or ready is None or live >= ready:
+        problems.append("the app was not live before its dependencies were initialized")
+    if during["status"] == "ready" or during["providers"]["GitHub"]["state"] != "retrying":
+        problems.append("readiness didn't report GitHub failing at boot")
+    if parked != "parked":
+        problems.append("the build submitted during the outage was not parked")
+    if not recovered:
+        problems.append("GitHub was not re-initialized after the outage")
+    if job.get("state") != "completed":
+        problems.append("the build submitted during the outage did not complete")
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--github-latency", type=float, default=1.0)
+    parser.add_argument("--outage", type=float, default=2.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
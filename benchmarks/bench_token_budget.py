@@ -0,0 +1,78 @@
+# benchmarks/bench_token_budget.py
+"""Prompt budgeting and token accounting for LLMCodeGenerator.
+
+Sends normal and oversized inputs (a huge brief, hundreds of checks, a long
+attachment list) through generate_app against a stub OpenAI client and
+reports the prompt size, the max_tokens requested and whether the call fits
+the model's context window. Then runs a batch of generations and prints the
+aggregated token, cost and throughput counters.
+
+Exits non-zero if any request would overflow the context window.
+
+    python -m benchmarks.bench_token_budget --model gpt-3.5-turbo
+"""
+import argparse
+import asyncio
+import sys
+import time
+from app.llm_generator import LLMCodeGenerator
+from app.token_budget import TIKTOKEN_AVAILABLE, message_tokens, model_limits, token_usage
+from app.utils import Config
+from benchmarks.stubs import StubOpenAI
+
+BRIEF = "Create a counter app with +1, -1 and reset buttons."
+CHECKS = ["Page has a #count element", "Clicking #increment adds 1"]
+SCENARIOS = (
+    ("normal", BRIEF, CHECKS, []),
+    ("huge brief", BRIEF + " Also handle this requirement carefully." * 20000, CHECKS, []),
+    ("800 checks", BRIEF, [f"Element #item-{i} shows row {i} of the table" for i in range(800)], []),
+    ("600 attachments", BRIEF, CHECKS, [{"name": f"sample-data-{i}.csv"} for i in range(600)]),
+)
+
+
+async def run(args) -> int:
+    Config.OPENAI_API_KEY = Config.OPENAI_API_KEY or "stub-key"
+    Config.LLM_MODEL = args.model
+    Config.LLM_STREAMING = False
+    context, max_output = model_limits(args.model)
+    gen = LLMCodeGenerator()
+    stub = gen.client = StubOpenAI(delay=args.llm_delay)
+
+    print(f"\n📊 {args.model}: {context} token context, {max_output} max output"
+          f" ({'tiktoken' if TIKTOKEN_AVAILABLE else 'estimated'} counts)")
+    overflows = 0
+    for name, brief, checks, attachments in SCENARIOS:
+        start = time.perf_counter()
+        await gen.generate_app(brief, attachments, checks, use_cache=False)
+        elapsed = time.perf_counter() - start - args.llm_delay
+        request = stub.last_request
+        prompt = message_tokens(request["messages"], args.model)
+        fits = prompt + request["max_tokens"] <= context
+        overflows += not fits
+        raw = len(brief) + sum(map(len, checks)) + sum(len(a["name"]) for a in attachments)
+        print(f"   {name:<16} input={raw:>8} chars  prompt={prompt:>6} tokens  max_tokens={request['max_tokens']:>5}"
+              f"  fits={fits}  budgeting={elapsed * 1000:6.1f}ms")
+
+    before = token_usage.snapshot()
+    start = time.perf_counter()
+    await asyncio.gather(*[gen.generate_app(f"{BRIEF} #{i}", [], CHECKS, use_cache=False) for i in range(args.jobs)])
+    elapsed = time.perf_counter() - start
+    after = token_usage.snapshot()
+    calls = after["calls"] - before["calls"]
+    cost = after["cost_usd"] - before["cost_usd"]
+    completion = after["completion_tokens"] - before["completion_tokens"]
+    print(f"   {args.jobs} concurrent jobs: {calls} calls, {after['prompt_tokens'] - before['prompt_tokens']} prompt"
+          f" + {completion} completion tokens, ${cost:.4f} (${cost / calls:.5f}/job),"
+          f" {completion / elapsed:.0f} completion tokens/s overall")
+
+    if overflows:
+        print("💥 prompts overflowed the context window")
+    return 1 if overflows else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    parser.add_argument("--llm-delay", type=float, default=0.2)
+    parser.add_argument("--jobs", type=int, default=20)
+    sys.exit(asyncio.run(run(parser.parse_args())))
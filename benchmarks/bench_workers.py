@@ -0,0 +1,164 @@
+# benchmarks/bench_workers.py
+"""Throughput with 1..N worker processes sharing state through SQLite.
+
+For each worker count, starts the app with run.py and STATE_BACKEND=sqlite
+(plus one worker with the in-memory default as the baseline), pointed at
+the fake GitHub API and a mock LLM backend that answers after
+`--llm-latency`. Per-process concurrency caps are raised so they don't hide
+how the processes themselves scale. Measures:
+
+- /api/build requests accepted per second from `--concurrency` clients
+  (secret check, idempotency claim, enqueue and job status for each)
+- builds completed per second, from the first request to the last callback
+- GET /api/jobs/{task}/1 answered per second
+
+and checks what separate processes with in-memory state got wrong:
+
+- every job status is found whichever worker answers (no 404s)
+- a duplicate of each request, sent on a new connection, attaches to the first job
+- every build runs once: one evaluation callback per task, and as many
+  pushes per repository as with a single in-memory worker
+
+Gains stop at the number of CPU cores, which the report prints; the fake
+GitHub API and the load generator share those cores with the workers.
+Exits non-zero if a check fails for any worker count.
+
+    python -m benchmarks.bench_workers --max-workers 4 --builds 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+import httpx
+from benchmarks.bench_build_latency import build_request
+from benchmarks.bench_startup import App
+from benchmarks.stubs import BackgroundServer, FakeGitHub, StubEvaluation
+
+CLOSE = {"Connection": "close"}
+
+
+async def wait_for_workers(app: App, workers: int, timeout: float = 60) -> set:
+    """Worker ids seen ready on new connections (the kernel hands each to one of the processes)"""
+    seen, deadline = set(), time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=10) as client:
+        while len(seen) < workers and time.monotonic() < deadline:
+            try:
+                health = (await client.get(f"{app.url}/health", headers=CLOSE)).json()
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+                continue
+            if all(provider["state"] == "ready" for provider in health["providers"].values()):
+                seen.add(health["worker"]["id"])
+            else:
+                await asyncio.sleep(0.05)
+    return seen
+
+
+async def run_workers(workers: int, backend: str, args, github: BackgroundServer, fake_github: FakeGitHub,
+                      eval_server: BackgroundServer, evaluation: StubEvaluation) -> dict:
+    prefix = f"w{workers}{backend}"
+    tasks = [f"{prefix}-{i}" for i in range(args.builds)]
+    eval_url = f"{eval_server.url}/notify"
+    requests = [dict(build_request(task, eval_url), bypass_cache=True) for task in tasks]
+    llm = [{"name": "mock", "provider": "mock", "latency": args.llm_latency, "jitter": 0}]
+    limits = {name: str(args.concurrency) for name in ("JOB_WORKERS", "LLM_CONCURRENCY", "GITHUB_CONCURRENCY")}
+    result = {"workers": workers, "backend": backend, "problems": []}
+
+    with App(github.url, f"/tmp/bench_workers_{prefix}.log", workers=workers, LLM_BACKENDS=json.dumps(llm),
+             STATE_BACKEND=backend, JOB_QUEUE_MAX=str(args.builds * 2), **limits) as app:
+        result["seen"] = len(await wait_for_workers(app, workers))
+        pool = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=app.url, timeout=60, limits=pool) as client:
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def submit(request: dict, headers: dict = None) -> dict:
+                async with gate:
+                    response = await client.post("/api/build", json=request, headers=headers)
+                    response.raise_for_status()
+                    return response.json()
+
+            start = time.perf_counter()
+            accepted = await asyncio.gather(*(submit(request) for request in requests))
+            result["accepted_per_second"] = len(accepted) / (time.perf_counter() - start)
+
+            duplicates = await asyncio.gather(*(submit(request, CLOSE) for request in requests))
+            if any(not d.get("duplicate") or d["job_id"] != a["job_id"] for a, d in zip(accepted, duplicates)):
+                result["problems"].append("a duplicate request started a second job")
+
+            deadline = time.monotonic() + args.timeout
+            while time.monotonic() < deadline:
+                if sum(payload["task"].startswith(f"{prefix}-") for payload in evaluation.received) >= len(tasks):
+                    break
+                await asyncio.sleep(0.05)
+            result["builds_per_second"] = len(tasks) / (time.perf_counter() - start)
+
+            reads, missing, states = 0, 0, Counter()
+
+            async def read(task: str):
+                nonlocal reads, missing
+                async with gate:
+                    response = await client.get(f"/api/jobs/{task}/1")
+                reads += 1
+                if response.status_code == 404:
+                    missing += 1
+                else:
+                    states[response.json()["state"]] += 1
+
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.read_seconds:
+                await asyncio.gather(*(read(task) for task in tasks))
+            result["reads_per_second"] = reads / (time.perf_counter() - start)
+
+    callbacks = Counter(payload["task"] for payload in evaluation.received if payload["task"].startswith(f"{prefix}-"))
+    result["pushes"] = Counter(
+        len(repo["pushes"]) for name, repo in fake_github.repos.items() if name.startswith(f"task-{prefix}-")
+    )
+    if result["seen"] < workers:
+        result["problems"].append(f"only {result['seen']} of {workers} workers answered")
+    if missing:
+        result["problems"].append(f"{missing} job status reads got a 404")
+    if states["completed"] != reads - missing:
+        result["problems"].append(f"job states other than completed: {dict(states)}")
+    if len(callbacks) != len(tasks) or any(count != 1 for count in callbacks.values()):
+        result["problems"].append(f"{len(callbacks)} of {len(tasks)} tasks called back, {sum(callbacks.values())} callbacks")
+    return result
+
+
+async def run(args) -> int:
+    fake_github = FakeGitHub(latency=args.github_latency)
+    evaluation = StubEvaluation()
+    results = []
+    with BackgroundServer(fake_github.app) as github, BackgroundServer(evaluation.app) as eval_server:
+        runs = [(1, "memory")] + [(workers, "sqlite") for workers in range(1, args.max_workers + 1)]
+        for workers, backend in runs:
+            results.append(await run_workers(workers, backend, args, github, fake_github, eval_server, evaluation))
+
+    print(f"\n📊 {args.builds} builds, {args.concurrency} concurrent clients, LLM {args.llm_latency:.1f}s,"
+          f" GitHub {args.github_latency * 1000:.0f}ms per call; {os.cpu_count()} CPU core(s)")
+    print("   workers  state    accepted/s   builds/s   status reads/s")
+    base = results[0]
+    for result in results:
+        print(f"   {result['workers']:7d}  {result['backend']:7s}  {result['accepted_per_second']:10.1f}"
+              f"   {result['builds_per_second']:8.2f}   {result['reads_per_second']:14.1f}"
+              f"   (x{result['builds_per_second'] / base['builds_per_second']:.2f} builds)")
+        if result["pushes"] != base["pushes"]:
+            result["problems"].append(f"pushes per repository {dict(result['pushes'])}, {dict(base['pushes'])} with one worker")
+    problems = [f"{result['workers']} worker(s), {result['backend']}: {problem}" for result in results for problem in result["problems"]]
+    for problem in problems:
+        print(f"💥 {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--builds", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--github-latency", type=float, default=0.01)
+    parser.add_argument("--read-seconds", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    sys.exit(asyncio.run(run(parser.parse_args())))
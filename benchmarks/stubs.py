@@ -0,0 +1,515 @@
+# benchmarks/stubs.py - local stand-ins for OpenAI, GitHub and the evaluation server
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from app.simple_generator import SimpleCodeGenerator
+
+
+class StubLLM:
+    """Drop-in replacement for LLMCodeGenerator with a fixed, configurable latency"""
+
+    def __init__(self, delay: float = 0.5, blocking: bool = False):
+        self.delay = delay
+        self.blocking = blocking
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._simple = SimpleCodeGenerator()
+
+    async def generate_app(self, brief: str, attachments: list, checks: list, use_cache: bool = True) -> dict:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if self.blocking:
+                time.sleep(self.delay)  # Simulates the old synchronous OpenAI client
+            else:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return self._simple.generate_from_brief(brief)
+
+    async def revise_app(self, existing_files: dict, brief: str, checks: list,
+                         attachments: list = None, use_cache: bool = True) -> dict:
+        await self.generate_app(brief, attachments or [], checks, use_cache)
+        return self._simple.update_existing_app(existing_files, brief)
+
+    async def aclose(self):
+        pass
+
+
+class StubOpenAI:
+    """Stands in for openai.AsyncOpenAI: chat.completions.create returns canned app JSON.
+
+    `responses` is the sequence of completion texts returned by successive
+    calls (the last one repeats). With stream=True the text is delivered in
+    chunks spread over `delay` seconds, and `chars_generated` counts what was
+    produced before the consumer closed the stream. With `chars_per_second`
+    set, latency instead grows with the length of the completion, as it does
+    for real token-by-token generation.
+    """
+
+    def __init__(self, delay: float = 0.5, content: str = None, responses: list = None, chunk_size: int = 40,
+                 chars_per_second: float = None):
+        self.delay = delay
+        self.chars_per_second = chars_per_second
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.chars_generated = 0
+        default = content or json.dumps(SimpleCodeGenerator()._generate_counter() | {"style.css": "body { margin: 0; }"})
+        self.responses = responses or [default]
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        content = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        self.last_request = kwargs
+        usage = SimpleNamespace(prompt_tokens=len(json.dumps(kwargs["messages"])) // 4, completion_tokens=len(content) // 4)
+        if kwargs.get("stream"):
+            return _StubStream(self, content, usage)
+        await asyncio.sleep(len(content) / self.chars_per_second if self.chars_per_second else self.delay)
+        self.chars_generated += len(content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+class _StubStream:
+    def __init__(self, owner: StubOpenAI, content: str, usage):
+        self.owner = owner
+        self.content = content
+        self.usage = usage
+        self.closed = False
+
+    async def __aiter__(self):
+        chunks = [self.content[i:i + self.owner.chunk_size] for i in range(0, len(self.content), self.owner.chunk_size)]
+        for text in chunks:
+            if self.closed:
+                return
+            await asyncio.sleep(self.owner.delay / len(chunks))
+            self.owner.chars_generated += len(text)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        yield SimpleNamespace(choices=[], usage=self.usage)
+
+    async def close(self):
+        self.closed = True
+
+
+def git_blob_sha(data: bytes) -> str:
+    """SHA-1 of a git blob object, as GitHub reports it"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _sha(data: str) -> str:
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+class FakeGitHub:
+    """In-memory GitHub REST API covering the endpoints GitHubManager talks to.
+
+    With `rate_limit` set, each token gets that many calls per `window`
+    seconds; responses carry X-RateLimit-* headers and calls over the limit
+    get GitHub's 403 "API rate limit exceeded". While `down` is set every
+    call gets a 503, as during a GitHub outage; `fail_next` fails just the
+    next that many calls with a 502.
+
+    Pages builds take `pages_build_time` seconds from each push to the
+    default branch; requests to https://{login}.github.io/{repo}/ through the
+    same transport are served from the last built commit (404 before that)
+    and don't count as API calls.
+    """
+
+    def __init__(self, login: str = "stub-user", latency: float = 0.0, rate_limit: int = None, window: float = 3600.0,
+                 pages_build_time: float = 0.0):
+        self.login = login
+        self.pages_build_time = pages_build_time
+        self.site_requests = 0
+        self.site_misses = 0
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.down = False
+        self.fail_next = 0
+        self.repo_gets = 0
+        self.not_modified = 0
+        self.repos = {}
+        self.calls = 0
+        self.rejected = 0
+        self.token_calls = Counter()
+        self._windows = {}
+        self.app = self._build_app()
+
+    def _rate_limit_headers(self, window: dict) -> dict:
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(self.rate_limit - window["used"]),
+            "X-RateLimit-Reset": str(math.ceil(window["reset"])),
+            "X-RateLimit-Used": str(window["used"]),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def _repo(self, owner: str, name: str) -> dict:
+        if owner != self.login or name not in self.repos:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return self.repos[name]
+
+    def _write_tree(self, repo: dict, entries: dict) -> str:
+        sha = _sha(repr(sorted(entries.items())))
+        repo["trees"][sha] = dict(entries)
+        return sha
+
+    def _write_commit(self, repo: dict, tree_sha: str, parents: list, message: str) -> str:
+        sha = _sha(f"{tree_sha}:{parents}:{message}:{len(repo['commits'])}")
+        repo["commits"][sha] = {"sha": sha, "tree": tree_sha, "parents": parents, "message": message}
+        return sha
+
+    def _head_files(self, repo: dict) -> dict:
+        head = repo["refs"].get(f"heads/{repo['default_branch']}")
+        return dict(repo["trees"][repo["commits"][head]["tree"]]) if head else {}
+
+    def _log(self, repo: dict) -> list:
+        """Commits reachable from the default branch, newest first"""
+        log, sha = [], repo["refs"].get(f"heads/{repo['default_branch']}")
+        while sha:
+            commit = repo["commits"][sha]
+            log.append({"sha": sha, "commit": {"message": commit["message"]}})
+            sha = commit["parents"][0] if commit["parents"] else None
+        return log
+
+    def _move_ref(self, repo: dict, ref: str, sha: str):
+        repo["refs"][ref] = sha
+        if ref == f"heads/{repo['default_branch']}":
+            repo["pushes"].append((time.time(), sha))
+
+    def _pages_build(self, repo: dict):
+        """(status, commit) of the latest Pages build, None before the first push after enabling"""
+        pushes = [push for push in repo["pushes"] if push[0] >= repo["pages_since"]] if repo["has_pages"] else []
+        if not pushes:
+            return None
+        pushed_at, sha = pushes[-1]
+        return ("built" if time.time() - pushed_at >= self.pages_build_time else "building"), sha
+
+    def _site_commit(self, repo: dict):
+        """Newest commit whose Pages build has finished"""
+        if not repo["has_pages"]:
+            return None
+        built = [
+            sha for pushed_at, sha in repo["pushes"]
+            if pushed_at >= repo["pages_since"] and time.time() - pushed_at >= self.pages_build_time
+        ]
+        return built[-1] if built else None
+
+    def _serve_site(self, request: Request) -> Response:
+        self.site_requests += 1
+        name, _, path = request.url.path.lstrip("/").partition("/")
+        repo = self.repos.get(name) if request.url.hostname == f"{self.login}.github.io" else None
+        sha = self._site_commit(repo) if repo else None
+        files = repo["trees"][repo["commits"][sha]["tree"]] if sha else {}
+        blob_sha = files.get(path or "index.html")
+        if blob_sha is None:
+            self.site_misses += 1
+            return Response("Site not found", status_code=404)
+        return Response(repo["blobs"][blob_sha], media_type="text/html" if (path or "index.html").endswith(".html") else None)
+
+    def _commit_file(self, repo: dict, path: str, data: bytes, message: str) -> str:
+        blob_sha = git_blob_sha(data)
+        repo["blobs"][blob_sha] = data
+        files = self._head_files(repo)
+        files[path] = blob_sha
+        branch = f"heads/{repo['default_branch']}"
+        parents = [repo["refs"][branch]] if branch in repo["refs"] else []
+        sha = self._write_commit(repo, self._write_tree(repo, files), parents, message)
+        self._move_ref(repo, branch, sha)
+        return sha
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.exception_handler(HTTPException)
+        async def github_error(request: Request, exc: HTTPException):
+            return JSONResponse({"message": exc.detail}, status_code=exc.status_code)
+
+        @app.middleware("http")
+        async def count_calls(request: Request, call_next):
+            if request.url.hostname.endswith(".github.io"):
+                return self._serve_site(request)
+            self.calls += 1
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.down:
+                return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return JSONResponse({"message": "Bad Gateway"}, status_code=502)
+            if not self.rate_limit or request.url.path == "/rate_limit":
+                return await call_next(request)
+
+            token = request.headers.get("authorization", "").removeprefix("token ")
+            window = self._windows.get(token)
+            if window is None or time.time() >= window["reset"]:
+                window = self._windows[token] = {"used": 0, "reset": time.time() + self.window}
+            if window["used"] >= self.rate_limit:
+                self.rejected += 1
+                return JSONResponse({"message": "API rate limit exceeded"}, status_code=403, headers=self._rate_limit_headers(window))
+            window["used"] += 1
+            self.token_calls[token] += 1
+            response = await call_next(request)
+            response.headers.update(self._rate_limit_headers(window))
+            return response
+
+        @app.get("/user")
+        async def get_user():
+            return {"login": self.login}
+
+        @app.get("/rate_limit")
+        async def rate_limit():
+            return {"resources": {"core": {"limit": 5000, "remaining": 5000}}}
+
+        @app.post("/user/repos", status_code=201)
+        async def create_repo(body: dict):
+            name = body["name"]
+            if name in self.repos:
+                raise HTTPException(status_code=422, detail="name already exists on this account")
+            repo = self.repos[name] = {
+                "name": name,
+                "html_url": f"https://github.com/{self.login}/{name}",
+                "description": body.get("description"),
+                "default_branch": "main",
+                "has_pages": False, "pages_since": 0.0, "pushes": [],
+                "blobs": {}, "trees": {}, "commits": {}, "refs": {},
+            }
+            if body.get("auto_init"):
+                self._commit_file(repo, "README.md", f"# {name}\n".encode(), "Initial commit")
+            return {"name": name, "html_url": repo["html_url"], "description": repo["description"], "default_branch": "main"}
+
+        @app.get("/repos/{owner}/{name}")
+        async def get_repo(owner: str, name: str, request: Request):
+            self.repo_gets += 1
+            repo = self._repo(owner, name)
+            info = {
+                "name": name, "html_url": repo["html_url"], "description": repo["description"],
+                "default_branch": repo["default_branch"], "has_pages": repo["has_pages"],
+            }
+            etag = f'"{_sha(json.dumps(info, sort_keys=True))}"'
+            if request.headers.get("if-none-match") == etag:
+                self.not_modified += 1
+                return Response(status_code=304, headers={"ETag": etag})
+            return JSONResponse(info, headers={"ETag": etag})
+
+        @app.delete("/repos/{owner}/{name}", status_code=204)
+        async def delete_repo(owner: str, name: str):
+            self._repo(owner, name)
+            del self.repos[name]
+            return Response(status_code=204)
+
+        @app.patch("/repos/{owner}/{name}")
+        async def edit_repo(owner: str, name: str, body: dict):
+            repo = self._repo(owner, name)
+            repo["has_pages"] = body.get("has_pages", repo["has_pages"])
+            return {"name": name, "html_url": repo["html_url"]}
+
+        def pages_info(name: str, repo: dict) -> dict:
+            build = self._pages_build(repo)
+            return {
+                "url": f"https://api.github.com/repos/{self.login}/{name}/pages",
+                "status": build[0] if build else None,
+                "html_url": f"https://{self.login}.github.io/{name}/",
+                "source": {"branch": repo["default_branch"], "path": "/"},
+            }
+
+        @app.post("/repos/{owner}/{name}/pages", status_code=201)
+        async def create_pages(owner: str, name: str, body: dict):
+            repo = self._repo(owner, name)
+            if repo["has_pages"]:
+                raise HTTPException(status_code=409, detail="GitHub Pages is already enabled.")
+            repo["has_pages"] = True
+            # Enabling Pages builds the current head
+            repo["pages_since"] = time.time()
+            head = repo["refs"].get(f"heads/{repo['default_branch']}")
+            if head:
+                repo["pushes"].append((repo["pages_since"], head))
+            return pages_info(name, repo)
+
+        @app.get("/repos/{owner}/{name}/pages")
+        async def get_pages(owner: str, name: str):
+            repo = self._repo(owner, name)
+            if not repo["has_pages"]:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return pages_info(name, repo)
+
+        @app.get("/repos/{owner}/{name}/pages/builds/latest")
+        async def latest_pages_build(owner: str, name: str):
+            build = self._pages_build(self._repo(owner, name))
+            if build is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return {"status": build[0], "commit": build[1], "error": {"message": None}}
+
+        @app.get("/repos/{owner}/{name}/contents/{path:path}")
+        async def get_contents(owner: str, name: str, path: str):
+            files = self._head_files(self._repo(owner, name))
+            if path not in files:
+                raise HTTPException(status_code=404, detail="Not Found")
+            data = self.repos[name]["blobs"][files[path]]
+            return {"path": path, "sha": files[path], "content": base64.b64encode(data).decode()}
+
+        @app.put("/repos/{owner}/{name}/contents/{path:path}")
+        async def put_contents(owner: str, name: str, path: str, body: dict):
+            repo = self._repo(owner, name)
+            files = self._head_files(repo)
+            if path in files and body.get("sha") != files[path]:
+                raise HTTPException(status_code=409, detail="sha mismatch")
+            sha = self._commit_file(repo, path, base64.b64decode(body["content"]), body["message"])
+            return {"commit": {"sha": sha}}
+
+        @app.get("/repos/{owner}/{name}/commits")
+        async def list_commits(owner: str, name: str, per_page: int = 30, page: int = 1):
+            log = self._log(self._repo(owner, name))
+            start = (page - 1) * per_page
+            return log[start:start + per_page]
+
+        @app.post("/repos/{owner}/{name}/git/blobs", status_code=201)
+        async def create_blob(owner: str, name: str, body: dict):
+            repo = self._repo(owner, name)
+            data = base64.b64decode(body["content"]) if body.get("encoding") == "base64" else body["content"].encode()
+            sha = git_blob_sha(data)
+            repo["blobs"][sha] = data
+            return {"sha": sha}
+
+        @app.post("/repos/{owner}/{name}/git/trees", status_code=201)
+        async def create_tree(owner: str, name: str, body: dict):
+            repo = self._repo(owner, name)
+            entries = dict(repo["trees"][body["base_tree"]]) if body.get("base_tree") else {}
+            for entry in body["tree"]:
+                if "content" in entry:
+                    data = entry["content"].encode()
+                    repo["blobs"][git_blob_sha(data)] = data
+                    entries[entry["path"]] = git_blob_sha(data)
+                else:
+                    entries[entry["path"]] = entry["sha"]
+            return {"sha": self._write_tree(repo, entries)}
+
+        @app.get("/repos/{owner}/{name}/git/trees/{sha}")
+        async def get_tree(owner: str, name: str, sha: str):
+            repo = self._repo(owner, name)
+            tree_sha = repo["commits"][sha]["tree"] if sha in repo["commits"] else sha
+            if tree_sha not in repo["trees"]:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return {"sha": tree_sha, "tree": [
+                {"path": path, "mode": "100644", "type": "blob", "sha": blob_sha, "size": len(repo["blobs"][blob_sha])}
+                for path, blob_sha in sorted(repo["trees"][tree_sha].items())
+            ], "truncated": False}
+
+        @app.post("/repos/{owner}/{name}/git/commits", status_code=201)
+        async def create_commit(owner: str, name: str, body: dict):
+            repo = self._repo(owner, name)
+            return {"sha": self._write_commit(repo, body["tree"], body["parents"], body["message"])}
+
+        @app.get("/repos/{owner}/{name}/git/commits/{sha}")
+        async def get_commit(owner: str, name: str, sha: str):
+            repo = self._repo(owner, name)
+            if sha not in repo["commits"]:
+                raise HTTPException(status_code=404, detail="Not Found")
+            commit = repo["commits"][sha]
+            return {"sha": sha, "tree": {"sha": commit["tree"]}, "parents": [{"sha": p} for p in commit["parents"]]}
+
+        @app.get("/repos/{owner}/{name}/git/ref/{ref:path}")
+        async def get_ref(owner: str, name: str, ref: str):
+            repo = self._repo(owner, name)
+            if ref not in repo["refs"]:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return {"ref": f"refs/{ref}", "object": {"sha": repo["refs"][ref], "type": "commit"}}
+
+        @app.patch("/repos/{owner}/{name}/git/refs/{ref:path}")
+        async def update_ref(owner: str, name: str, ref: str, body: dict):
+            repo = self._repo(owner, name)
+            if ref not in repo["refs"]:
+                raise HTTPException(status_code=422, detail="Reference does not exist")
+            if not body.get("force") and repo["refs"][ref] not in repo["commits"][body["sha"]]["parents"]:
+                raise HTTPException(status_code=422, detail="Update is not a fast forward")
+            self._move_ref(repo, ref, body["sha"])
+            return {"ref": f"refs/{ref}", "object": {"sha": body["sha"], "type": "commit"}}
+
+        return app
+
+
+class StubEvaluation:
+    """Evaluation endpoint that records every payload it receives"""
+
+    def __init__(self):
+        self.received = []
+        self.app = FastAPI()
+
+        @self.app.post("/notify")
+        async def notify(payload: dict):
+            self.received.append(payload)
+            return {"status": "ok"}
+
+
+class FlakyEvaluation:
+    """Evaluation endpoint that answers 503 to a random `fail_rate` share of callbacks"""
+
+    def __init__(self, fail_rate: float = 0.5, latency: float = 0.02, seed: int = 7):
+        self.fail_rate = fail_rate
+        self.received = []
+        self.attempts = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._random = random.Random(seed)
+        self.app = FastAPI()
+
+        @self.app.post("/notify")
+        async def notify(payload: dict):
+            self.attempts += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(latency)
+            finally:
+                self.in_flight -= 1
+            if self._random.random() < self.fail_rate:
+                return JSONResponse({"status": "unavailable"}, status_code=503)
+            self.received.append(payload)
+            return {"status": "ok"}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app under uvicorn in a daemon thread"""
+
+    def __init__(self, app, port: int = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
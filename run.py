@@ -0,0 +1,41 @@
+# run.py - start the API in one or several worker processes
+"""Start the API.
+
+    python run.py                          # one process
+    python run.py --workers 4              # uvicorn's process manager
+    python run.py --workers 4 --gunicorn   # gunicorn with uvicorn workers (pip install gunicorn)
+
+`--workers` defaults to WEB_CONCURRENCY and is passed on to the workers in
+it, so they switch to the shared SQLite state backend (see app/shared_state.py).
+"""
+import argparse
+import os
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--gunicorn", action="store_true", help="run the workers under gunicorn instead of uvicorn")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Read by app.utils.Config in every worker; app isn't imported here so it is set in time
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    if args.workers > 1 and os.getenv("STATE_BACKEND") == "memory":
+        parser.error("STATE_BACKEND=memory keeps state per process; use a shared backend with more than one worker")
+
+    if args.gunicorn:
+        os.execvp("gunicorn", [
+            "gunicorn", "app.main:app", "--worker-class", "uvicorn.workers.UvicornWorker",
+            "--workers", str(args.workers), "--bind", f"{args.host}:{args.port}", "--log-level", args.log_level,
+        ])
+
+    import uvicorn
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    sys.exit(main())